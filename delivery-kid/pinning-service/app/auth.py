@@ -3,7 +3,9 @@
 import hashlib
 import hmac
 import logging
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Optional
 
@@ -60,6 +62,55 @@ def verify_upload_token(token: str, username: str, timestamp: int, settings: Set
     return True
 
 
+PREVIEW_TOKEN_PREFIX = "v1."
+
+
+def _preview_key(api_key: str) -> bytes:
+    """Signing key for preview tokens, derived so it isn't shared with other api_key uses."""
+    return hmac.new(api_key.encode(), b"preview-token-v1", hashlib.sha256).digest()
+
+
+def _preview_signature(api_key: str, draft_id: str, path: str, expires: int) -> str:
+    message = f"preview:{draft_id}:{path}:{expires}"
+    return hmac.new(_preview_key(api_key), message.encode(), hashlib.sha256).hexdigest()
+
+
+def create_preview_token(api_key: str, draft_id: str, path: str, expires: int) -> str:
+    """Create a self-verifying token granting read access to one staged file.
+
+    Args:
+        api_key: Signing secret.
+        draft_id: Draft the file belongs to.
+        path: File path within the draft directory, e.g. "upload/video.mp4".
+        expires: Unix time (seconds) after which the token is refused.
+
+    Returns "v1.{expires}.{hmac}". Checking it needs no draft state, so
+    every range request Coconut or a <video> element makes is verified
+    in memory.
+    """
+    return f"{PREVIEW_TOKEN_PREFIX}{expires}.{_preview_signature(api_key, draft_id, path, expires)}"
+
+
+def is_signed_preview_token(token: str) -> bool:
+    """Signed tokens vs. the older random per-draft tokens (which never contain '.')."""
+    return token.startswith(PREVIEW_TOKEN_PREFIX)
+
+
+def verify_preview_token(token: str, draft_id: str, path: str, settings: Settings) -> bool:
+    """Verify a create_preview_token token for draft_id/path (constant time, no I/O)."""
+    if not settings.api_key or not is_signed_preview_token(token):
+        return False
+    try:
+        expires_str, signature = token[len(PREVIEW_TOKEN_PREFIX):].split(".", 1)
+        expires = int(expires_str)
+    except ValueError:
+        return False
+    expected = _preview_signature(settings.api_key, draft_id, path, expires)
+    if not hmac.compare_digest(signature, expected):
+        return False
+    return time.time() < expires
+
+
 @dataclass
 class AuthResult:
     valid: bool
@@ -72,6 +123,38 @@ def create_auth_message(timestamp: int) -> str:
     return f"Authorize Blue Railroad pinning\nTimestamp: {timestamp}"
 
 
+# Clients sign one timestamp and send the same X-Signature/X-Timestamp on
+# every request until it drifts out of the window, so recovered signers
+# are cached: (signature, timestamp) -> (address, unix ms the entry is
+# useless after). Only successful recoveries are stored. Least recently
+# used entries are evicted first. Sync dependencies run in the threadpool,
+# so the dict is only touched under the lock (recovery itself runs outside).
+_RECOVERED_MAX_ENTRIES = 4096
+_recovered: OrderedDict[tuple[str, int], tuple[str, int]] = OrderedDict()
+_recovered_lock = threading.Lock()
+
+
+def _recover_signer(signature: str, timestamp: int, expires_ms: int, now_ms: int) -> str:
+    """Address that signed the auth message for timestamp (cached). Raises if invalid."""
+    key = (signature, timestamp)
+    with _recovered_lock:
+        cached = _recovered.get(key)
+        if cached is not None:
+            if cached[1] >= now_ms:
+                _recovered.move_to_end(key)
+                return cached[0]
+            del _recovered[key]
+
+    message_hash = encode_defunct(text=create_auth_message(timestamp))
+    address = Account.recover_message(message_hash, signature=signature)
+
+    with _recovered_lock:
+        _recovered[key] = (address, expires_ms)
+        while len(_recovered) > _RECOVERED_MAX_ENTRIES:
+            _recovered.popitem(last=False)
+    return address
+
+
 def verify_signature(signature: str, timestamp: int, settings: Settings) -> AuthResult:
     """
     Verify a signed authorization message.
@@ -94,11 +177,9 @@ def verify_signature(signature: str, timestamp: int, settings: Settings) -> Auth
             error=f"Timestamp too old or too far in future (drift: {drift_ms // 1000}s, max: {settings.max_timestamp_drift_seconds}s)"
         )
 
-    # Recover signer address from signature
-    message = create_auth_message(timestamp)
+    # Recover signer address from signature (cached until it drifts out of the window)
     try:
-        message_hash = encode_defunct(text=message)
-        address = Account.recover_message(message_hash, signature=signature)
+        address = _recover_signer(signature, timestamp, timestamp + max_drift_ms, now_ms)
     except Exception as e:
         return AuthResult(valid=False, error=f"Invalid signature: {e}")
 
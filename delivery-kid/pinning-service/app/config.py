@@ -1,10 +1,17 @@
 """Configuration settings loaded from environment variables."""
 
 import os
+from typing import Literal, get_args
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
 
+# Local HLS segment layouts (what each writes is described in services/transcode.py).
+# Settings, ContentFinalizeRequest and the transcoder all validate against this.
+HlsLayout = Literal["ts", "fmp4", "fmp4_single"]
+HLS_LAYOUTS: tuple[str, ...] = get_args(HlsLayout)
+
+
 class Settings(BaseSettings):
     # Service identity
     node_name: str = "delivery-kid"
@@ -28,6 +35,16 @@ class Settings(BaseSettings):
 
     # Coconut.co cloud transcoding
     coconut_api_key: str = ""
+    coconut_download_concurrency: int = 8  # Parallel segment downloads when fetching outputs
+    coconut_stream_to_ipfs: bool = True  # Pipe outputs into kubo instead of staging them on disk
+    webhook_worker_concurrency: int = 2  # Coconut jobs processed at once after their webhook
+
+    # Local HLS segment layout: "ts", "fmp4", or "fmp4_single" (byte-range, one file per rendition)
+    hls_layout: HlsLayout = "ts"
+
+    # Local proxy preview (poster, storyboard, 360p proxy) right after a single-video upload
+    local_preview_enabled: bool = True
+    local_preview_proxy_seconds: int = 60  # Length of the 360p proxy clip; 0 = whole video
 
     # Auth settings
     max_timestamp_drift_seconds: int = 3600  # 1 hour — token generated at page load, user may browse before uploading
@@ -41,6 +58,34 @@ class Settings(BaseSettings):
     draft_ttl_hours: int = 24  # How long drafts live before auto-cleanup
     max_staging_size_gb: int = 10  # Maximum total size of staging directory
 
+    # Album finalize pipeline: tracks encoded / added to IPFS at once (0 = one encode per CPU)
+    album_transcode_concurrency: int = 0
+    album_ipfs_add_concurrency: int = 4
+
+    # Threads for blocking work off the event loop
+    # (0 = default: 8 for io, one per CPU for cpu, 4 for serving staged downloads)
+    io_worker_threads: int = 0
+    cpu_worker_threads: int = 0
+    serve_worker_threads: int = 0
+
+    # Event loop lag monitor: heartbeat interval, and the lag that counts as a stall
+    # (logged with the blocking stack). loop_debug also turns on asyncio debug mode.
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_ms: int = 100
+    loop_stall_threshold_ms: int = 250
+    loop_debug: bool = False
+
+    # Staging file serving: total send budget and per-client cap for bulk (preview_token)
+    # fetches, in megabits/s (0 = unlimited). Interactive requests always go first.
+    staging_serve_max_mbps: float = 0
+    staging_serve_bulk_client_mbps: float = 0
+
+    # /local-pins cache: rebuilt on our own pin/unpin, and at least this often
+    local_pins_refresh_seconds: int = 300
+
+    # Transcode output cache (staging_dir/cache/transcode), LRU-evicted; 0 disables
+    transcode_cache_max_gb: float = 2.0
+
     # CORS
     cors_origins: list[str] = [
         "https://cryptograss.live",
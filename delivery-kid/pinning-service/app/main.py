@@ -3,15 +3,23 @@
 import asyncio
 import logging
 from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import get_settings
-from .routes import health, albums, drafts, content, enrich, torrent, coconut, staging
+from .routes import health, albums, drafts, content, enrich, torrent, coconut, staging, debug
 from .services import cleanup
+from .services.coconut import pending_webhook_job_ids
+from .services.finalize_jobs import stop_finalize_jobs
+from .services.loop_monitor import init_loop_monitor, stop_loop_monitor
+from .services.media_server import init_bandwidth_shaper
+from .services.pin_index import init_pin_index, stop_pin_index
 from .services.seeder import init_seeder, stop_seeder
+from .services.webhook_worker import init_webhook_worker, stop_webhook_worker
+from .services.workers import init_worker_pools, stop_worker_pools
 
 # Configure logging
 logging.basicConfig(
@@ -27,11 +35,21 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for startup/shutdown tasks.
 
     On startup:
+    - Start the event loop lag monitor
+    - Start the worker pools for blocking filesystem and CPU work
+    - Set up bandwidth shaping for staged file downloads
+    - Set up the staging space budget and measure staging usage
     - Run initial cleanup of expired drafts
+    - Start the draft expiry scheduler
+    - Start the /local-pins refresher
     - Start periodic cleanup background task
+    - Start the webhook worker and re-queue webhooks accepted before a restart
 
     On shutdown:
+    - Cancel running finalizes, which log the interruption
+    - Stop the webhook worker, the expiry scheduler and the pin refresher
     - Cancel background cleanup task
+    - Shut down the worker pools and the loop monitor
     """
     settings = get_settings()
     staging_dir = Path(settings.staging_dir)
@@ -40,8 +58,34 @@ async def lifespan(app: FastAPI):
     staging_dir.mkdir(parents=True, exist_ok=True)
     (staging_dir / "drafts").mkdir(exist_ok=True)
 
+    # Watch for callbacks that block the loop
+    if settings.loop_monitor_enabled:
+        init_loop_monitor(
+            settings.loop_monitor_interval_ms / 1000,
+            settings.loop_stall_threshold_ms / 1000,
+            asyncio_debug=settings.loop_debug,
+        )
+
+    # Blocking filesystem / hashing work runs here, not on the event loop
+    init_worker_pools(
+        settings.io_worker_threads, settings.cpu_worker_threads, settings.serve_worker_threads
+    )
+
+    # Staged file downloads: interactive seeks ahead of bulk fetches
+    init_bandwidth_shaper(settings.staging_serve_max_mbps, settings.staging_serve_bulk_client_mbps)
+
+    # Enforce the staging size budget on uploads; load the byte ledger
+    space = cleanup.init_staging_space(staging_dir, settings.max_staging_size_gb, Path(settings.seeding_dir))
+    await space.reconcile()
+
     # Run startup cleanup
-    cleanup.startup_cleanup(staging_dir)
+    await cleanup.startup_cleanup(staging_dir)
+
+    # Remove each remaining draft exactly when it expires
+    cleanup.init_expiry_scheduler(staging_dir)
+
+    # Keep the /local-pins listing warm
+    init_pin_index(settings.local_pins_refresh_seconds)
 
     # Start periodic cleanup task
     cleanup_task = asyncio.create_task(
@@ -51,11 +95,24 @@ async def lifespan(app: FastAPI):
     # Start BitTorrent seeder
     init_seeder(settings.seeding_dir)
 
+    # Process accepted Coconut webhooks off the request path
+    webhook_worker = init_webhook_worker(
+        partial(coconut.process_webhook_event, settings),
+        concurrency=settings.webhook_worker_concurrency,
+    )
+    for job_id in pending_webhook_job_ids(staging_dir):
+        logger.info("[%s] Re-queueing unprocessed webhook", job_id)
+        webhook_worker.enqueue(job_id)
+
     logger.info("Delivery Kid pinning service started")
     yield
 
     # Shutdown: stop seeder first
     stop_seeder()
+    await stop_finalize_jobs()
+    await stop_webhook_worker()
+    await cleanup.stop_expiry_scheduler()
+    await stop_pin_index()
 
     # Cancel cleanup task
     cleanup_task.cancel()
@@ -63,6 +120,8 @@ async def lifespan(app: FastAPI):
         await cleanup_task
     except asyncio.CancelledError:
         pass
+    stop_worker_pools()
+    await stop_loop_monitor()
     logger.info("Delivery Kid pinning service stopped")
 
 
@@ -94,6 +153,7 @@ app.include_router(enrich.router)
 app.include_router(torrent.router)
 app.include_router(coconut.router)
 app.include_router(staging.router)
+app.include_router(debug.router)
 
 
 @app.get("/")
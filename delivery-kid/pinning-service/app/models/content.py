@@ -5,6 +5,8 @@ from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field
 
+from ..config import HlsLayout
+
 
 class ContentFile(BaseModel):
     """Analyzed file information returned after upload."""
@@ -43,6 +45,12 @@ class ContentDraftState(BaseModel):
     preview_job_id: Optional[str] = Field(default=None, description="Coconut job ID for preview transcode")
     preview_cid: Optional[str] = Field(default=None, description="IPFS CID of AV1 HLS output")
     preview_mp4_cid: Optional[str] = Field(default=None, description="IPFS CID of 480p H.264 preview MP4")
+    # Local proxy preview (generated on this node right after upload)
+    local_preview_status: str = Field(default="none", description="none, processing, ready, failed")
+    local_preview_files: dict[str, str] = Field(
+        default_factory=dict,
+        description="Kind (poster, storyboard, storyboard_vtt, proxy) -> filename under /staging/drafts/{id}/preview/"
+    )
 
 
 class ContentDraftResponse(BaseModel):
@@ -56,6 +64,11 @@ class ContentDraftResponse(BaseModel):
     preview_status: str = Field(default="none", description="none, pending, processing, ready, failed")
     preview_cid: Optional[str] = Field(default=None, description="IPFS CID of AV1 HLS output")
     preview_mp4_cid: Optional[str] = Field(default=None, description="IPFS CID of 480p preview MP4")
+    local_preview_status: str = Field(default="none", description="none, processing, ready, failed")
+    local_preview_files: dict[str, str] = Field(
+        default_factory=dict,
+        description="Kind (poster, storyboard, storyboard_vtt, proxy) -> filename under /staging/drafts/{id}/preview/"
+    )
 
 
 class ContentFinalizeRequest(BaseModel):
@@ -75,12 +88,24 @@ class ContentFinalizeRequest(BaseModel):
         description="Output video heights for HLS transcoding, e.g. [1080, 720, 480]. "
                     "Default [720, 480]. Common values: 2160 (4K), 1080, 720, 480, 360."
     )
+    hls_layout: Optional[HlsLayout] = Field(
+        default=None,
+        description="Local HLS segment layout: 'ts', 'fmp4', or 'fmp4_single' "
+                    "(one byte-range file per rendition). Default: server setting."
+    )
     trim_start_seconds: Optional[float] = Field(
         default=None, description="Start time in seconds for trimming the video"
     )
     trim_end_seconds: Optional[float] = Field(
         default=None, description="End time in seconds for trimming the video"
     )
+    trim_keyframe_tolerance_seconds: float = Field(
+        default=1.0,
+        description="How far (seconds) trim points may move to land on a keyframe. When both fit, "
+                    "the source is H.264/AAC and transcoding_qualities leave only the source "
+                    "height, the trim is a stream-copy remux (one rendition) instead of a "
+                    "re-encode. A multi-rendition ladder is never dropped. 0 always re-encodes."
+    )
     preserve_original: bool = Field(
         default=False, description="Save the original source file to permanent storage instead of deleting it"
     )
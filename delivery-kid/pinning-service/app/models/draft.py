@@ -17,6 +17,14 @@ class DraftFile(BaseModel):
     size_bytes: int
 
 
+class StageCheckpoint(BaseModel):
+    """Album finalize stage progress, recorded file by file so a retry can skip finished work."""
+    completed_at: datetime = Field(description="When the stage last recorded an output")
+    outputs: dict[str, str] = Field(default_factory=dict, description="Album-relative path -> SHA-256 of the file written")
+    cids: dict[str, str] = Field(default_factory=dict, description="Album-relative path -> CID of the file added to IPFS")
+    result: dict = Field(default_factory=dict, description="Stage result with no file output (e.g. the pinned CID)")
+
+
 class DraftState(BaseModel):
     """Internal state of a draft album, saved to disk as draft.json."""
     draft_id: str
@@ -24,6 +32,8 @@ class DraftState(BaseModel):
     expires_at: datetime
     uploaded_by: str = Field(description="Wallet address that created the draft")
     files: list[DraftFile]
+    finalize_request_hash: Optional[str] = Field(default=None, description="SHA-256 of the FinalizeRequest the checkpoints belong to")
+    finalize_checkpoints: dict[str, StageCheckpoint] = Field(default_factory=dict)
 
 
 class DraftResponse(BaseModel):
@@ -1,20 +1,30 @@
 """Album and pin management routes."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 
 from ..auth import require_wallet_auth
 from ..services import ipfs
+from ..services.pin_index import get_pin_index
 
 router = APIRouter()
 
 
 @router.get("/local-pins")
-async def list_local_pins():
-    """List all locally pinned CIDs. Public endpoint for build-time fetching."""
-    cids = await ipfs.get_local_pins()
-    # Return as objects with 'cid' property for arthel compatibility
-    pins = [{"cid": cid} for cid in cids]
-    return {"pins": pins, "count": len(pins), "node": "delivery-kid"}
+async def list_local_pins(if_none_match: Optional[str] = Header(None)):
+    """
+    List all locally pinned CIDs. Public endpoint for build-time fetching.
+
+    Served from the cached pin index; builds that send back the ETag get
+    a 304 until the pin set changes.
+    """
+    snapshot = await get_pin_index().get()
+    headers = {"ETag": snapshot.etag, "Cache-Control": "public, no-cache"}
+    if snapshot.matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    # Pins are objects with a 'cid' property for arthel compatibility
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 
 @router.delete("/unpin/{cid}")
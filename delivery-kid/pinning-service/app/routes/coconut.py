@@ -1,19 +1,25 @@
 """Coconut.co cloud transcoding routes.
 
 POST /transcode-coconut  — submit a video for AV1 HLS transcoding
-POST /webhook/coconut     — receive completion/failure from Coconut
+POST /webhook/coconut     — accept completion/failure from Coconut (processed in background)
 GET  /job/{job_id}        — check job status
-GET  /jobs                — list recent jobs
+GET  /job/{job_id}/events — stream job status (SSE)
+GET  /job/{job_id}/wait   — long-poll job status
+GET  /jobs                — list jobs (cursor-paginated)
 """
 
+import asyncio
+import hashlib
 import json
 import logging
 import time
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile, HTTPException, Query, Request
 from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
 
 from ..auth import require_auth
 from ..config import get_settings, Settings
@@ -23,24 +29,31 @@ from ..services.coconut import (
     submit_to_coconut,
     save_job,
     load_job,
-    list_jobs,
+    list_jobs_page,
     process_completed_job,
+    discard_job_download,
+    public_job,
 )
+from ..services.cleanup import account_staging, forget_staging
+from ..services.draft_store import get_draft_store
+from ..services.events import get_event_hub, job_topic, draft_topic, stream_topic
+from ..services.webhook_worker import get_webhook_worker
+from ..services.workers import run_io
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["coconut"])
 
 
-def _update_draft_preview(staging_dir: Path, job: dict) -> None:
+def _preview_fields(draft: dict) -> dict:
+    return {key: draft.get(key) for key in ("preview_status", "preview_cid", "preview_mp4_cid")}
+
+
+async def _update_draft_preview(staging_dir: Path, job: dict) -> None:
     """Update a content draft's preview state after Coconut webhook."""
     draft_id = job["draftId"]
-    draft_json = staging_dir / "drafts" / draft_id / "draft.json"
-    if not draft_json.exists():
-        logger.warning("[%s] Preview draft not found: %s", job["id"], draft_id)
-        return
-    try:
-        data = json.loads(draft_json.read_text())
+
+    def apply(data: dict) -> None:
         if job["status"] == "complete" and job.get("hlsCid"):
             data["preview_status"] = "ready"
             data["preview_cid"] = job["hlsCid"]
@@ -52,7 +65,13 @@ def _update_draft_preview(staging_dir: Path, job: dict) -> None:
         else:
             data["preview_status"] = "failed"
             logger.warning("[%s] Draft %s preview failed", job["id"], draft_id[:8])
-        draft_json.write_text(json.dumps(data, indent=2, default=str))
+
+    try:
+        data = await get_draft_store().update(staging_dir / "drafts" / draft_id, apply)
+        if data is None:
+            logger.warning("[%s] Preview draft not found: %s", job["id"], draft_id)
+            return
+        get_event_hub().publish(draft_topic(draft_id), "preview", _preview_fields(data))
     except Exception as e:
         logger.error("[%s] Failed to update draft preview state: %s", job["id"], e)
 
@@ -96,6 +115,7 @@ async def transcode_coconut(
 
         content = await video.read()
         video_path.write_bytes(content)
+        account_staging(video_dir, len(content))
 
         # Pin source to IPFS so Coconut can fetch it via gateway
         logger.info("[%s] Pinning source video to IPFS...", job_id)
@@ -141,7 +161,8 @@ async def transcode_coconut(
 
         # Clean up temp video file (source is on IPFS now)
         import shutil
-        shutil.rmtree(video_dir, ignore_errors=True)
+        await run_io(shutil.rmtree, video_dir, ignore_errors=True)
+        forget_staging(video_dir)
 
         return TranscodeResponse(
             jobId=job_id,
@@ -158,22 +179,67 @@ async def transcode_coconut(
         raise HTTPException(500, str(e))
 
 
-@router.post("/webhook/coconut")
-async def webhook_coconut(request: Request, settings: Settings = Depends(get_settings)):
-    """Receive completion/failure webhook from Coconut.co."""
-    job_id = request.query_params.get("job_id")
-    if not job_id:
-        raise HTTPException(400, "Missing job_id")
+# Events that finish a job; anything else is acknowledged and ignored
+_ACTIONABLE_EVENTS = ("job.completed", "job.failed")
+_TERMINAL_STATUSES = ("complete", "failed")
+# Idempotency keys remembered per job (Coconut retries a handful of times at most)
+_MAX_WEBHOOK_KEYS = 20
+# A completed job whose outputs can't be fetched/pinned is retried with
+# backoff (30s, 60s, 120s) before it is marked failed. Coconut's own
+# redeliveries can't serve as retries: the webhook was already acknowledged.
+_MAX_PROCESSING_ATTEMPTS = 4
+_RETRY_BASE_SECONDS = 30
+
+_retry_tasks: set[asyncio.Task] = set()
 
+
+def _webhook_idempotency_key(request: Request, job_id: str, body: bytes) -> str:
+    """Explicit Idempotency-Key header, else a digest of the delivery itself."""
+    explicit = request.headers.get("idempotency-key")
+    if explicit:
+        return explicit
+    return hashlib.sha256(job_id.encode() + b"\0" + body).hexdigest()
+
+
+def _retry_later(settings: Settings, job_id: str, delay: float) -> None:
+    worker = get_webhook_worker()
+    if worker:
+        worker.retry_later(job_id, delay)
+        return
+
+    async def retry():
+        await asyncio.sleep(delay)
+        await process_webhook_event(settings, job_id)
+
+    task = asyncio.create_task(retry())
+    _retry_tasks.add(task)
+    task.add_done_callback(_retry_tasks.discard)
+
+
+async def process_webhook_event(settings: Settings, job_id: str) -> None:
+    """Apply a job's persisted webhook event: download, pin, update state.
+
+    Runs on the webhook worker (or as a background task), never inside the
+    webhook request. Safe to call repeatedly: a job without a pending event,
+    or one that already reached a terminal status, is left alone. If the
+    outputs of a completed job can't be fetched or pinned, the event stays
+    pending and is retried; the job only fails once the attempts run out.
+    """
     staging_dir = Path(settings.staging_dir)
     job = load_job(staging_dir, job_id)
-    if not job:
-        raise HTTPException(404, "Job not found")
+    if not job or not job.get("pendingEvent"):
+        return
 
-    event = await request.json()
+    event = job["pendingEvent"]
     event_type = event.get("event", "unknown")
-    logger.info("[%s] Coconut webhook: %s", job_id, event_type)
 
+    if job.get("status") in _TERMINAL_STATUSES:
+        logger.info("[%s] Already %s, dropping %s", job_id, job["status"], event_type)
+        job.pop("pendingEvent", None)
+        save_job(staging_dir, job_id, job)
+        return
+
+    error = None
     try:
         if event_type == "job.completed":
             outputs = event.get("outputs", {})
@@ -183,6 +249,8 @@ async def webhook_coconut(request: Request, settings: Settings = Depends(get_set
                 staging_dir=staging_dir,
                 ipfs_api_url=settings.ipfs_api_url,
                 pinata_jwt=settings.pinata_jwt,
+                download_concurrency=settings.coconut_download_concurrency,
+                stream_to_ipfs=settings.coconut_stream_to_ipfs,
             )
 
             if hls_cid:
@@ -191,8 +259,7 @@ async def webhook_coconut(request: Request, settings: Settings = Depends(get_set
                 job["completedAt"] = datetime.now(timezone.utc).isoformat()
                 logger.info("[%s] Job complete! HLS CID: %s", job_id, hls_cid)
             else:
-                job["status"] = "failed"
-                job["error"] = "Failed to pin HLS output to IPFS"
+                error = "Failed to pin HLS output to IPFS"
 
         elif event_type == "job.failed":
             logger.error("[%s] Coconut job failed: %s", job_id, event.get("error"))
@@ -200,19 +267,89 @@ async def webhook_coconut(request: Request, settings: Settings = Depends(get_set
             job["error"] = event.get("error", "Unknown error")
             job["failedAt"] = datetime.now(timezone.utc).isoformat()
 
-        save_job(staging_dir, job_id, job)
-
-        # If this is a preview job, update the draft state
-        if job.get("isPreview") and job.get("draftId"):
-            _update_draft_preview(staging_dir, job)
-        return {"received": True}
-
     except Exception as e:
         logger.error("[%s] Webhook processing error: %s", job_id, e)
+        error = str(e)
+
+    if error is not None:
+        attempts = job.get("processingAttempts", 0) + 1
+        job["processingAttempts"] = attempts
+        if attempts < _MAX_PROCESSING_ATTEMPTS:
+            delay = _RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            logger.warning(
+                "[%s] Processing attempt %d/%d failed, retrying in %ds: %s",
+                job_id, attempts, _MAX_PROCESSING_ATTEMPTS, delay, error
+            )
+            job["lastError"] = error
+            save_job(staging_dir, job_id, job)  # pendingEvent kept
+            _retry_later(settings, job_id, delay)
+            return
         job["status"] = "failed"
-        job["error"] = str(e)
-        save_job(staging_dir, job_id, job)
-        raise HTTPException(500, str(e))
+        job["error"] = error
+
+    job.pop("pendingEvent", None)
+    if job["status"] == "failed":
+        job.pop("relayedOutputs", None)
+    save_job(staging_dir, job_id, job)
+    if job["status"] == "failed":
+        # Nothing will resume a partial download any more
+        await discard_job_download(staging_dir, job_id)
+
+    # If this is a preview job, update the draft state
+    if job.get("isPreview") and job.get("draftId"):
+        await _update_draft_preview(staging_dir, job)
+
+
+@router.post("/webhook/coconut", status_code=202)
+async def webhook_coconut(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    settings: Settings = Depends(get_settings),
+):
+    """Receive completion/failure webhook from Coconut.co.
+
+    The event is persisted on the job record and 202 is returned straight
+    away; downloading and pinning happen on the webhook worker. Redelivered
+    webhooks (same Idempotency-Key, or same body) and events for jobs that
+    already finished are acknowledged without being processed again.
+    """
+    job_id = request.query_params.get("job_id")
+    if not job_id:
+        raise HTTPException(400, "Missing job_id")
+
+    staging_dir = Path(settings.staging_dir)
+    job = load_job(staging_dir, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+
+    body = await request.body()
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(400, "Invalid JSON body")
+    event_type = event.get("event", "unknown")
+    key = _webhook_idempotency_key(request, job_id, body)
+    logger.info("[%s] Coconut webhook: %s (key %s)", job_id, event_type, key[:12])
+
+    seen_keys = job.get("webhookKeys", [])
+    if key in seen_keys or job.get("status") in _TERMINAL_STATUSES or job.get("pendingEvent"):
+        logger.info("[%s] Duplicate webhook delivery, ignoring", job_id)
+        return {"received": True, "duplicate": True}
+
+    job["webhookKeys"] = (seen_keys + [key])[-_MAX_WEBHOOK_KEYS:]
+    if event_type in _ACTIONABLE_EVENTS:
+        job["pendingEvent"] = event
+        job["webhookReceivedAt"] = datetime.now(timezone.utc).isoformat()
+    save_job(staging_dir, job_id, job)
+
+    if event_type in _ACTIONABLE_EVENTS:
+        worker = get_webhook_worker()
+        if worker:
+            worker.enqueue(job_id)
+        else:
+            background_tasks.add_task(process_webhook_event, settings, job_id)
+
+    return {"received": True, "duplicate": False}
 
 
 @router.get("/job/{job_id}")
@@ -224,14 +361,84 @@ async def get_job_status(
     job = load_job(Path(settings.staging_dir), job_id)
     if not job:
         raise HTTPException(404, "Job not found")
-    return job
+    return public_job(job)
+
+
+def _is_job_final(event: str, data: dict) -> bool:
+    return event == "job" and data.get("status") in _TERMINAL_STATUSES
+
+
+@router.get("/job/{job_id}/events")
+async def stream_job_status(
+    job_id: str,
+    settings: Settings = Depends(get_settings),
+):
+    """Stream job state via Server-Sent Events until it completes or fails.
+
+    The first event is the current job; each later one is sent as soon as
+    the job changes.
+    """
+    staging_dir = Path(settings.staging_dir)
+    if load_job(staging_dir, job_id) is None:
+        raise HTTPException(404, "Job not found")
+
+    def snapshot():
+        job = load_job(staging_dir, job_id)
+        return ("job", public_job(job)) if job else None
+
+    return EventSourceResponse(
+        stream_topic(job_topic(job_id), snapshot, _is_job_final),
+        media_type="text/event-stream"
+    )
+
+
+@router.get("/job/{job_id}/wait")
+async def wait_job_status(
+    job_id: str,
+    since: Optional[int] = None,
+    timeout: float = Query(25.0, ge=0, le=60),
+    settings: Settings = Depends(get_settings),
+):
+    """Long-poll job status.
+
+    Returns as soon as the job's version differs from `since` (or at once
+    without `since`), otherwise after `timeout` seconds. Pass the returned
+    version back as `since` on the next call.
+    """
+    staging_dir = Path(settings.staging_dir)
+    if load_job(staging_dir, job_id) is None:
+        raise HTTPException(404, "Job not found")
+
+    version, _ = await get_event_hub().wait_for_change(job_topic(job_id), since, timeout)
+    job = load_job(staging_dir, job_id)
+    return {"version": version, "changed": version != since, "job": public_job(job) if job else None}
 
 
 @router.get("/jobs")
 async def get_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    draft_id: Optional[str] = None,
+    mine: bool = False,
     identity: str = Depends(require_auth),
     settings: Settings = Depends(get_settings),
 ):
-    """List recent transcoding jobs."""
-    jobs = list_jobs(Path(settings.staging_dir))
-    return {"jobs": jobs}
+    """List transcoding jobs, newest first.
+
+    Pass the returned nextCursor back as ?cursor= for the next page.
+    Optional filters: status, draft_id, and mine=true for jobs submitted
+    by the caller.
+    """
+    try:
+        jobs, next_cursor = list_jobs_page(
+            Path(settings.staging_dir),
+            limit=limit,
+            cursor=cursor,
+            status=status,
+            identity=identity if mine else None,
+            draft_id=draft_id,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"jobs": [public_job(job) for job in jobs], "nextCursor": next_cursor}
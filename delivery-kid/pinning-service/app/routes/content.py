@@ -8,17 +8,27 @@ import time
 import uuid
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, Header, UploadFile, HTTPException, Query
 from sse_starlette.sse import EventSourceResponse
 
-from ..auth import require_auth, require_finalize_auth
+from ..auth import create_preview_token, require_auth, require_finalize_auth
 from ..config import get_settings, get_commit, Settings
 from ..models.content import (
     ContentFile, ContentDraftState, ContentDraftResponse, ContentFinalizeRequest
 )
-from ..services import analyze, ipfs, transcode
+from ..services import analyze, hls_pipeline, ipfs, transcode
 from ..services.coconut import submit_to_coconut, save_job, load_job
+from ..services.cleanup import (
+    StagingFullError, account_staging, account_staging_tree, admit_upload, remeasure_staging,
+    remove_draft_dir, schedule_draft_expiry,
+)
+from ..services.events import get_event_hub, draft_topic, stream_topic
+from ..services.draft_store import get_draft_store
+from ..services.placement import place_file
+from ..services.workers import run_io
+from ..services.finalize_jobs import find_finalize_job, parse_last_event_id, start_finalize_job
 
 logger = logging.getLogger(__name__)
 
@@ -34,25 +44,22 @@ def get_draft_dir(staging_dir: Path, draft_id: str) -> Path:
     return staging_dir / "drafts" / draft_id
 
 
-def load_draft_state(draft_dir: Path) -> ContentDraftState | None:
-    draft_json = draft_dir / "draft.json"
-    if not draft_json.exists():
+def _content_state(data: dict | None) -> ContentDraftState | None:
+    # Only load content drafts, not album drafts
+    if data is None or data.get("draft_type") != "content":
         return None
     try:
-        with open(draft_json) as f:
-            data = json.load(f)
-        # Only load content drafts, not album drafts
-        if data.get("draft_type") != "content":
-            return None
         return ContentDraftState(**data)
-    except (json.JSONDecodeError, ValueError):
+    except ValueError:
         return None
 
 
+def load_draft_state(draft_dir: Path) -> ContentDraftState | None:
+    return _content_state(get_draft_store().read(draft_dir))
+
+
 def save_draft_state(draft_dir: Path, state: ContentDraftState) -> None:
-    draft_json = draft_dir / "draft.json"
-    with open(draft_json, "w") as f:
-        json.dump(state.model_dump(mode="json"), f, indent=2, default=str)
+    get_draft_store().write(draft_dir, state.model_dump(mode="json"))
 
 
 def is_draft_expired(state: ContentDraftState) -> bool:
@@ -83,15 +90,23 @@ async def create_content_draft(
                 detail=f"Invalid file type: {file.filename}. Allowed extensions: {sorted(ALLOWED_EXTENSIONS)}"
             )
 
-    # Check total size
+    # Check total size (admission below reserves it, so it must be known)
+    if any(file.size is None for file in files):
+        raise HTTPException(status_code=411, detail="Upload size unknown: send each file with its size")
     max_size = settings.max_file_size_mb * 1024 * 1024
-    total_size = sum(file.size or 0 for file in files)
+    total_size = sum(file.size for file in files)
     if total_size > max_size:
         raise HTTPException(
             status_code=400,
             detail=f"Total upload size exceeds {settings.max_file_size_mb}MB limit"
         )
 
+    # Reserve staging space (evicting caches / expired drafts if needed)
+    try:
+        reservation = await admit_upload(total_size)
+    except StagingFullError as e:
+        raise HTTPException(status_code=507, detail=str(e), headers={"Retry-After": "300"})
+
     # Create draft directory
     draft_id = str(uuid.uuid4())
     staging_dir = Path(settings.staging_dir)
@@ -101,11 +116,17 @@ async def create_content_draft(
 
     try:
         # Save uploaded files
-        for file in files:
-            file_path = upload_dir / file.filename
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+        try:
+            written = 0
+            for file in files:
+                file_path = upload_dir / file.filename
+                with open(file_path, "wb") as f:
+                    content = await file.read()
+                    f.write(content)
+                written += len(content)
+            account_staging(draft_dir, written)
+        finally:
+            reservation.release()
 
         # Analyze all media files
         analyses = await analyze.analyze_media_directory(upload_dir)
@@ -132,7 +153,7 @@ async def create_content_draft(
                 ))
 
         if not draft_files:
-            shutil.rmtree(draft_dir)
+            await remove_draft_dir(draft_dir)
             raise HTTPException(
                 status_code=400,
                 detail="No valid media files found in upload"
@@ -144,7 +165,9 @@ async def create_content_draft(
 
         # Determine if this is a single-video upload that should get a preview
         video_files = [f for f in draft_files if f.media_type == "video"]
-        should_preview = len(draft_files) == 1 and len(video_files) == 1 and settings.coconut_api_key
+        is_single_video = len(draft_files) == 1 and len(video_files) == 1
+        should_preview = is_single_video and settings.coconut_api_key
+        should_local_preview = is_single_video and settings.local_preview_enabled
 
         state = ContentDraftState(
             draft_id=draft_id,
@@ -154,28 +177,27 @@ async def create_content_draft(
             uploaded_by=wallet_address,
             files=draft_files,
             preview_status="pending" if should_preview else "none",
+            local_preview_status="processing" if should_local_preview else "none",
         )
         save_draft_state(draft_dir, state)
+        schedule_draft_expiry(draft_id, expires_at)
 
-        # Kick off background preview transcoding for video uploads
+        # Kick off background preview transcoding for video uploads:
+        # a quick local proxy first, the Coconut AV1 HLS preview alongside
+        if should_local_preview:
+            asyncio.create_task(_generate_local_preview(draft_id, settings))
         if should_preview:
             asyncio.create_task(
                 _submit_preview_transcode(draft_id, state, settings)
             )
 
-        return ContentDraftResponse(
-            draft_id=draft_id,
-            expires_at=expires_at,
-            files=draft_files,
-            commit=get_commit(),
-            preview_status=state.preview_status,
-        )
+        return _draft_response(state)
 
     except HTTPException:
         raise
     except Exception as e:
         if draft_dir.exists():
-            shutil.rmtree(draft_dir)
+            await remove_draft_dir(draft_dir)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -197,9 +219,13 @@ async def get_content_draft(
         raise HTTPException(status_code=403, detail="Not your draft")
 
     if is_draft_expired(state):
-        shutil.rmtree(draft_dir)
+        await remove_draft_dir(draft_dir)
         raise HTTPException(status_code=410, detail="Draft has expired")
 
+    return _draft_response(state)
+
+
+def _draft_response(state: ContentDraftState) -> ContentDraftResponse:
     return ContentDraftResponse(
         draft_id=state.draft_id,
         expires_at=state.expires_at,
@@ -209,9 +235,100 @@ async def get_content_draft(
         preview_status=state.preview_status,
         preview_cid=state.preview_cid,
         preview_mp4_cid=state.preview_mp4_cid,
+        local_preview_status=state.local_preview_status,
+        local_preview_files=state.local_preview_files,
+    )
+
+
+def _preview_fields(state: ContentDraftState) -> dict:
+    return {
+        "preview_status": state.preview_status,
+        "preview_cid": state.preview_cid,
+        "preview_mp4_cid": state.preview_mp4_cid,
+        "local_preview_status": state.local_preview_status,
+        "local_preview_files": state.local_preview_files,
+    }
+
+
+async def _update_draft_state(draft_id: str, draft_dir: Path, event: str = "preview", **fields) -> None:
+    """
+    Set fields on the on-disk draft state and notify subscribers.
+
+    Updates under the draft's lock, from the current draft.json, so
+    concurrent background tasks (local preview, Coconut submission,
+    the Coconut webhook) don't overwrite each other's fields.
+    No-op if the draft has gone (deleted or finalized meanwhile).
+    """
+    data = await get_draft_store().update(draft_dir, lambda data: data.update(fields))
+    state = _content_state(data)
+    if state is None:
+        return
+    get_event_hub().publish(draft_topic(draft_id), event, _preview_fields(state))
+
+
+def _load_own_draft(staging_dir: Path, draft_id: str, wallet_address: str) -> ContentDraftState:
+    state = load_draft_state(get_draft_dir(staging_dir, draft_id))
+    if state is None:
+        raise HTTPException(status_code=404, detail="Content draft not found")
+    if state.uploaded_by.lower() != wallet_address.lower():
+        raise HTTPException(status_code=403, detail="Not your draft")
+    return state
+
+
+@router.get("/{draft_id}/events")
+async def stream_content_draft(
+    draft_id: str,
+    wallet_address: str = Depends(require_auth),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Stream draft changes via Server-Sent Events.
+
+    Starts with a "preview" event holding the current preview fields, then
+    forwards "preview" updates from the Coconut webhook and the progress /
+    complete / error events of any running finalize. Ends after "complete".
+    """
+    staging_dir = Path(settings.staging_dir)
+    _load_own_draft(staging_dir, draft_id, wallet_address)
+
+    def snapshot():
+        state = load_draft_state(get_draft_dir(staging_dir, draft_id))
+        return ("preview", _preview_fields(state)) if state else None
+
+    return EventSourceResponse(
+        stream_topic(draft_topic(draft_id), snapshot, lambda event, data: event == "complete"),
+        media_type="text/event-stream"
     )
 
 
+@router.get("/{draft_id}/wait")
+async def wait_content_draft(
+    draft_id: str,
+    since: Optional[int] = None,
+    timeout: float = Query(25.0, ge=0, le=60),
+    wallet_address: str = Depends(require_auth),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Long-poll draft state.
+
+    Returns as soon as the draft's version differs from `since` (or at
+    once without `since`), otherwise after `timeout` seconds. Pass the
+    returned version back as `since` on the next call.
+    """
+    staging_dir = Path(settings.staging_dir)
+    _load_own_draft(staging_dir, draft_id, wallet_address)
+
+    version, message = await get_event_hub().wait_for_change(draft_topic(draft_id), since, timeout)
+    state = load_draft_state(get_draft_dir(staging_dir, draft_id))
+    return {
+        "version": version,
+        "changed": version != since,
+        "last_event": message,
+        "draft": _draft_response(state) if state else None,
+    }
+
+
 @router.delete("/{draft_id}")
 async def delete_content_draft(
     draft_id: str,
@@ -229,10 +346,26 @@ async def delete_content_draft(
     if state.uploaded_by.lower() != wallet_address.lower():
         raise HTTPException(status_code=403, detail="Not your draft")
 
-    shutil.rmtree(draft_dir)
+    await remove_draft_dir(draft_dir)
     return {"message": "Draft deleted", "draft_id": draft_id}
 
 
+def _staging_source_url(settings: Settings, draft_id: str, state: ContentDraftState, filename: str) -> str:
+    """
+    URL Coconut fetches an uploaded file from, authorized by a preview
+    token signed for that file and valid until the draft expires (the
+    draft's stored random token if no signing key is configured).
+    """
+    base_url = settings.ipfs_gateway_url.replace("ipfs.", "", 1)
+    if settings.api_key:
+        token = create_preview_token(
+            settings.api_key, draft_id, f"upload/{filename}", int(state.expires_at.timestamp())
+        )
+    else:
+        token = state.preview_token
+    return f"{base_url}/staging/drafts/{draft_id}/{filename}?preview_token={token}"
+
+
 async def _submit_preview_transcode(
     draft_id: str, state: ContentDraftState, settings: Settings
 ) -> None:
@@ -251,10 +384,7 @@ async def _submit_preview_transcode(
         # Build the source URL: Coconut will fetch from our staging endpoint
         # using the preview_token for auth (no IPFS pin of the original needed)
         base_url = settings.ipfs_gateway_url.replace("ipfs.", "", 1)
-        source_url = (
-            f"{base_url}/staging/drafts/{draft_id}/{video_file.original_filename}"
-            f"?preview_token={state.preview_token}"
-        )
+        source_url = _staging_source_url(settings, draft_id, state, video_file.original_filename)
 
         # Build webhook URL — reuses existing /webhook/coconut handler
         job_id = f"preview-{draft_id[:12]}-{int(time.time())}"
@@ -284,19 +414,80 @@ async def _submit_preview_transcode(
         save_job(staging_dir, job_id, job_state)
 
         # Update draft state
-        state.preview_status = "processing"
-        state.preview_job_id = job_id
-        save_draft_state(draft_dir, state)
+        await _update_draft_state(draft_id, draft_dir, preview_status="processing", preview_job_id=job_id)
 
     except Exception as e:
         logger.error("[preview:%s] Failed to submit preview: %s", draft_id[:8], e)
         try:
-            state.preview_status = "failed"
-            save_draft_state(draft_dir, state)
+            await _update_draft_state(draft_id, draft_dir, preview_status="failed")
         except Exception:
             pass
 
 
+async def _generate_local_preview(draft_id: str, settings: Settings) -> None:
+    """Background task: poster frame, storyboard sprite and 360p proxy clip.
+
+    Runs on this node right after upload so the ReleaseDraft page has
+    something to show within seconds; each asset is recorded in
+    local_preview_files (and pushed to /draft-content/{id}/events) as soon
+    as it exists. Files are served from /staging/drafts/{id}/preview/.
+    """
+    staging_dir = Path(settings.staging_dir)
+    draft_dir = get_draft_dir(staging_dir, draft_id)
+    state = load_draft_state(draft_dir)
+    if state is None:
+        return
+
+    video_file = state.files[0]
+    source = draft_dir / "upload" / video_file.original_filename
+    preview_dir = draft_dir / "preview"
+    produced: dict[str, str] = {}
+
+    async def record(**files: str) -> None:
+        produced.update(files)
+        await _update_draft_state(draft_id, draft_dir, event="local-preview", local_preview_files=dict(produced))
+
+    async def storyboard() -> bool:
+        result = await transcode.make_storyboard(
+            source, preview_dir / "storyboard.jpg", preview_dir / "storyboard.vtt",
+            video_file.duration_seconds, video_file.width, video_file.height,
+        )
+        if result.success:
+            await record(storyboard="storyboard.jpg", storyboard_vtt="storyboard.vtt")
+        return result.success
+
+    async def proxy() -> bool:
+        result = await transcode.make_proxy(
+            source, preview_dir / "proxy.mp4",
+            settings.local_preview_proxy_seconds or None,
+            has_audio=video_file.audio_codec is not None,
+        )
+        if result.success:
+            await record(proxy="proxy.mp4")
+        return result.success
+
+    try:
+        preview_dir.mkdir(exist_ok=True)
+        # Poster first — it's a single seek + decode and shows up fastest
+        poster = await transcode.make_poster(source, preview_dir / "poster.jpg", video_file.duration_seconds)
+        if poster.success:
+            await record(poster="poster.jpg")
+        await asyncio.gather(storyboard(), proxy())
+        status = "ready" if produced else "failed"
+        logger.info("[preview:%s] Local preview %s: %s", draft_id[:8], status, sorted(produced))
+    except Exception as e:
+        logger.error("[preview:%s] Local preview failed: %s", draft_id[:8], e)
+        status = "ready" if produced else "failed"
+
+    try:
+        # Preview files count against the staging budget like the upload
+        await account_staging_tree(preview_dir)
+    except Exception as e:
+        logger.warning("[preview:%s] Failed to account preview files: %s", draft_id[:8], e)
+
+    await _update_draft_state(draft_id, draft_dir, event="local-preview", local_preview_status=status)
+
+
 def _should_use_coconut(request: ContentFinalizeRequest, settings: Settings) -> bool:
     """Determine if we should try Coconut cloud transcoding."""
     strategy = request.transcoding_strategy
@@ -333,18 +524,36 @@ async def finalize_sse_generator(
     Fast path: if preview transcoding already produced an HLS CID and no trim
     is requested, finalization is instant — just emit the existing CID.
 
+    Trim of an H.264/AAC source whose cut points are within
+    trim_keyframe_tolerance_seconds of keyframes: stream-copy remux to HLS,
+    no re-encode. The remux is a single rendition at the source height, so
+    it is only used when transcoding_qualities would give just that rung;
+    a multi-rendition ladder always goes to Coconut or local ffmpeg.
+
     Slow path (trim requested or no preview): Coconut cloud transcoding first,
     local ffmpeg fallback. Coconut fetches source from staging via preview_token.
     """
+    completed = False
+
     async def send_event(event: str, data: dict):
+        nonlocal completed
+        completed = completed or event == "complete"
+        # Mirror to /draft-content/{id}/events subscribers
+        get_event_hub().publish(draft_topic(draft_id), event, data)
         return {"event": event, "data": json.dumps(data)}
 
     has_trim = request.trim_start_seconds is not None or request.trim_end_seconds is not None
+    pinner = None
 
     try:
         upload_dir = draft_dir / "upload"
         output_dir = draft_dir / "output"
-        output_dir.mkdir(parents=True, exist_ok=True)
+        if output_dir.exists():
+            # Left by a failed attempt (the draft is kept for a retry):
+            # start empty so none of it is pinned with this attempt's output
+            await run_io(shutil.rmtree, output_dir)
+            await remeasure_staging(draft_dir)
+        output_dir.mkdir(parents=True)
 
         yield await send_event("progress", {
             "stage": "prepare",
@@ -359,11 +568,12 @@ async def finalize_sse_generator(
             for f in state.files:
                 src = upload_dir / f.original_filename
                 if src.exists():
-                    shutil.copy2(src, originals_dir / f.original_filename)
+                    await run_io(place_file, src, originals_dir / f.original_filename)
             logger.info("[content:%s] Original files preserved to %s", draft_id[:8], originals_dir)
 
         video_files = [f for f in state.files if f.media_type == "video"]
         wants_transcode = len(state.files) == 1 and video_files and _should_transcode_video(request)
+        pin_path = None  # Set early if the stream-copy trim fast path succeeds
 
         # === Fast path: preview already done, no trim ===
         if wants_transcode and state.preview_cid and not has_trim:
@@ -385,17 +595,51 @@ async def finalize_sse_generator(
             })
             return
 
+        # === Stream-copy trim: keyframe-aligned cuts of an H.264/AAC source ===
+        video_file = video_files[0] if video_files else None
+        if (
+            wants_transcode and has_trim
+            and request.transcoding_strategy in ("auto", "local")
+            and request.trim_keyframe_tolerance_seconds > 0
+            and transcode.can_stream_copy(video_file.video_codec, video_file.audio_codec)
+            # A remux is one source-height rendition: never at the cost of a requested ladder
+            and transcode.is_source_only_ladder(request.transcoding_qualities, video_file.height)
+        ):
+            yield await send_event("progress", {
+                "stage": "transcode",
+                "message": "Trimming at keyframes without re-encoding...",
+                "progress": 20
+            })
+
+            hls_dir = output_dir / "hls"
+            result = await transcode.remux_trim_to_hls(
+                upload_dir / video_file.original_filename, hls_dir,
+                trim_start=request.trim_start_seconds,
+                trim_end=request.trim_end_seconds,
+                tolerance=request.trim_keyframe_tolerance_seconds,
+                source_height=video_file.height,
+                has_audio=video_file.audio_codec is not None,
+                layout=request.hls_layout or settings.hls_layout,
+            )
+            if result.success:
+                pin_path = hls_dir
+                yield await send_event("progress", {
+                    "stage": "transcode",
+                    "message": "Trim complete",
+                    "progress": 60
+                })
+            else:
+                logger.info("[content:%s] Stream-copy trim not possible: %s", draft_id[:8], result.error)
+                await run_io(shutil.rmtree, hls_dir, ignore_errors=True)
+
         # === Coconut cloud transcoding (with trim, or no preview available) ===
-        if wants_transcode and _should_use_coconut(request, settings):
+        if pin_path is None and wants_transcode and _should_use_coconut(request, settings):
             video_file = video_files[0]
             src_path = upload_dir / video_file.original_filename
 
             # Build source URL — Coconut fetches from staging via preview_token
             base_url = settings.ipfs_gateway_url.replace("ipfs.", "", 1)
-            source_url = (
-                f"{base_url}/staging/drafts/{draft_id}/{video_file.original_filename}"
-                f"?preview_token={state.preview_token}"
-            )
+            source_url = _staging_source_url(settings, draft_id, state, video_file.original_filename)
 
             trim_msg = ""
             if has_trim:
@@ -461,23 +705,47 @@ async def finalize_sse_generator(
                     "progress": 15
                 })
 
-        if wants_transcode:
+        if wants_transcode and pin_path is None:
             # === Local ffmpeg transcoding path (sync) ===
             video_file = video_files[0]
             src_path = upload_dir / video_file.original_filename
 
+            ladder = transcode.select_ladder(request.transcoding_qualities, video_file.height)
             yield await send_event("progress", {
                 "stage": "transcode",
-                "message": f"Transcoding {video_file.original_filename} to HLS...",
+                "message": f"Transcoding {video_file.original_filename} to HLS "
+                           f"({', '.join(f'{q}p' for q in ladder)})...",
                 "progress": 10
             })
 
             hls_dir = output_dir / "hls"
-            result = await transcode.transcode_video_to_hls(
+
+            # Add finished segments to IPFS while ffmpeg keeps encoding
+            pinner = hls_pipeline.SegmentPinner(hls_dir)
+            pinner.start()
+            transcode_task = asyncio.create_task(transcode.transcode_video_to_hls(
                 src_path, hls_dir,
                 trim_start=request.trim_start_seconds,
                 trim_end=request.trim_end_seconds,
-            )
+                qualities=request.transcoding_qualities,
+                source_height=video_file.height,
+                has_audio=video_file.audio_codec is not None,
+                layout=request.hls_layout or settings.hls_layout,
+            ))
+            try:
+                while not transcode_task.done():
+                    await asyncio.wait({transcode_task}, timeout=5)
+                    if not transcode_task.done() and pinner.added_count:
+                        yield await send_event("progress", {
+                            "stage": "transcode",
+                            "message": f"Transcoding... {pinner.added_count} segments already on IPFS",
+                            "progress": 40
+                        })
+                result = transcode_task.result()
+            finally:
+                if not transcode_task.done():
+                    transcode_task.cancel()
+                await pinner.stop()
 
             if not result.success:
                 yield await send_event("error", {
@@ -493,12 +761,12 @@ async def finalize_sse_generator(
                 "progress": 60
             })
 
-        else:
-            # No transcode needed — copy files to output and pin as-is
+        elif not wants_transcode:
+            # No transcode needed — link files into output and pin as-is
             for f in state.files:
                 src = upload_dir / f.original_filename
                 if src.exists():
-                    shutil.copy2(src, output_dir / f.original_filename)
+                    await run_io(place_file, src, output_dir / f.original_filename)
 
             pin_path = output_dir
 
@@ -508,6 +776,10 @@ async def finalize_sse_generator(
                 "progress": 20
             })
 
+        if pin_path != output_dir:
+            # Transcode output written into the draft
+            await account_staging_tree(pin_path)
+
         # Write metadata.json into the pin directory
         metadata = {
             "title": request.title,
@@ -529,7 +801,17 @@ async def finalize_sse_generator(
             "progress": 70
         })
 
-        result = await ipfs.add_directory(pin_path)
+        result = None
+        if pinner is not None:
+            result = await pinner.finish()
+            if not result.success:
+                logger.warning(
+                    "[content:%s] Pipelined pin failed, re-adding directory: %s",
+                    draft_id[:8], result.error
+                )
+                result = None
+        if result is None:
+            result = await ipfs.add_directory(pin_path)
 
         if not result.success:
             yield await send_event("error", {
@@ -558,28 +840,50 @@ async def finalize_sse_generator(
         yield await send_event("error", {"message": str(e)})
 
     finally:
-        try:
-            if draft_dir.exists():
-                shutil.rmtree(draft_dir)
-        except Exception:
-            pass
+        if pinner is not None:
+            await pinner.close()
+        # Only a successful finalize consumes the draft; after an error the
+        # staged files stay (until expiry) so the user can simply retry.
+        if completed:
+            try:
+                if draft_dir.exists():
+                    await remove_draft_dir(draft_dir)
+            except Exception:
+                pass
 
 
 @router.post("/{draft_id}/finalize")
 async def finalize_content_draft(
     draft_id: str,
     request: ContentFinalizeRequest,
+    last_event_id: Optional[str] = Header(None),
     wallet_address: str = Depends(require_finalize_auth),
     settings: Settings = Depends(get_settings)
 ):
     """
     Finalize a content draft — optionally transcode, then pin to IPFS.
 
-    Progress is streamed via Server-Sent Events.
+    Runs as a detached job; progress is streamed via Server-Sent Events
+    from its event log. If the draft is already finalizing (or finished
+    finalizing), this attaches to that job instead of starting another,
+    replaying from Last-Event-ID when the client sends one.
+
+    A keyframe-aligned trim of an H.264/AAC source is stream-copied
+    without re-encoding only when transcoding_qualities leave just the
+    source height: the copy has that one rendition and no ladder.
     """
     staging_dir = Path(settings.staging_dir)
     draft_dir = get_draft_dir(staging_dir, draft_id)
 
+    job = find_finalize_job(staging_dir, draft_id)
+    if job is not None and (job.running or job.completed):
+        if job.identity.lower() != wallet_address.lower():
+            raise HTTPException(status_code=403, detail="Not your draft")
+        return EventSourceResponse(
+            job.tail(parse_last_event_id(last_event_id)),
+            media_type="text/event-stream"
+        )
+
     state = load_draft_state(draft_dir)
     if state is None:
         raise HTTPException(status_code=404, detail="Content draft not found")
@@ -588,10 +892,36 @@ async def finalize_content_draft(
         raise HTTPException(status_code=403, detail="Not your draft")
 
     if is_draft_expired(state):
-        shutil.rmtree(draft_dir)
+        await remove_draft_dir(draft_dir)
         raise HTTPException(status_code=410, detail="Draft has expired")
 
-    return EventSourceResponse(
+    job = start_finalize_job(
+        staging_dir, draft_id, wallet_address,
         finalize_sse_generator(draft_id, request, draft_dir, state, settings),
+    )
+    return EventSourceResponse(job.tail(), media_type="text/event-stream")
+
+
+@router.get("/{draft_id}/finalize/events")
+async def stream_content_finalize(
+    draft_id: str,
+    last_event_id: Optional[str] = Header(None),
+    wallet_address: str = Depends(require_auth),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Tail a finalize job's event log via Server-Sent Events.
+
+    Replays every event after Last-Event-ID, then follows the job live
+    until it ends. Works after the job has finished (and the draft has
+    been removed) for as long as the log is kept.
+    """
+    job = find_finalize_job(Path(settings.staging_dir), draft_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No finalize for this draft")
+    if job.identity.lower() != wallet_address.lower():
+        raise HTTPException(status_code=403, detail="Not your draft")
+    return EventSourceResponse(
+        job.tail(parse_last_event_id(last_event_id)),
         media_type="text/event-stream"
     )
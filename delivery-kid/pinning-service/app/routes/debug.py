@@ -0,0 +1,24 @@
+"""Diagnostics endpoints.
+
+Requires auth (stall reports include stack traces of service code).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..auth import require_auth
+from ..services.loop_monitor import get_loop_monitor
+from ..services.workers import worker_pools_status
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/loop")
+async def loop_status(identity: str = Depends(require_auth)):
+    """Event loop lag percentiles and recent stalls with the stacks that caused them."""
+    monitor = get_loop_monitor()
+    if monitor is None:
+        raise HTTPException(status_code=404, detail="Loop monitor is disabled")
+    return {
+        "loop": monitor.status(include_stalls=True),
+        "workers": worker_pools_status(),
+    }
@@ -1,19 +1,31 @@
 """Multi-step album upload draft routes."""
 
 import asyncio
+import hashlib
 import json
+import os
 import shutil
 import uuid
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, Header, UploadFile, HTTPException
 from sse_starlette.sse import EventSourceResponse
 
 from ..auth import require_auth, require_finalize_auth
 from ..config import get_settings, get_commit, Settings
-from ..models.draft import DraftFile, DraftState, DraftResponse, FinalizeRequest
+from ..models.draft import DraftFile, DraftState, DraftResponse, FinalizeRequest, StageCheckpoint
 from ..services import analyze, ipfs, transcode
+from ..services.cleanup import (
+    StagingFullError, account_staging, admit_upload, remove_draft_dir, schedule_draft_expiry,
+)
+from ..services.events import get_event_hub, draft_topic, stream_topic
+from ..services.draft_store import get_draft_store
+from ..services.placement import place_file
+from ..services.transcode_cache import file_sha256
+from ..services.workers import run_io
+from ..services.finalize_jobs import find_finalize_job, parse_last_event_id, start_finalize_job
 
 router = APIRouter(prefix="/draft-album", tags=["drafts"])
 
@@ -24,23 +36,19 @@ def get_draft_dir(staging_dir: Path, draft_id: str) -> Path:
 
 
 def load_draft_state(draft_dir: Path) -> DraftState | None:
-    """Load draft state from disk."""
-    draft_json = draft_dir / "draft.json"
-    if not draft_json.exists():
+    """Load draft state (cached; re-read when draft.json changes)."""
+    data = get_draft_store().read(draft_dir)
+    if data is None:
         return None
     try:
-        with open(draft_json) as f:
-            data = json.load(f)
         return DraftState(**data)
-    except (json.JSONDecodeError, ValueError):
+    except ValueError:
         return None
 
 
 def save_draft_state(draft_dir: Path, state: DraftState) -> None:
-    """Save draft state to disk."""
-    draft_json = draft_dir / "draft.json"
-    with open(draft_json, "w") as f:
-        json.dump(state.model_dump(mode="json"), f, indent=2, default=str)
+    """Save draft state to disk (atomically)."""
+    get_draft_store().write(draft_dir, state.model_dump(mode="json"))
 
 
 def is_draft_expired(state: DraftState) -> bool:
@@ -77,15 +85,23 @@ async def create_draft(
                 detail=f"Invalid file type: {file.filename}. Allowed: {allowed_extensions}"
             )
 
-    # Check total size
+    # Check total size (admission below reserves it, so it must be known)
+    if any(file.size is None for file in files):
+        raise HTTPException(status_code=411, detail="Upload size unknown: send each file with its size")
     max_size = settings.max_file_size_mb * 1024 * 1024
-    total_size = sum(file.size or 0 for file in files)
+    total_size = sum(file.size for file in files)
     if total_size > max_size:
         raise HTTPException(
             status_code=400,
             detail=f"Total upload size exceeds {settings.max_file_size_mb}MB limit"
         )
 
+    # Reserve staging space (evicting caches / expired drafts if needed)
+    try:
+        reservation = await admit_upload(total_size)
+    except StagingFullError as e:
+        raise HTTPException(status_code=507, detail=str(e), headers={"Retry-After": "300"})
+
     # Create draft directory
     draft_id = str(uuid.uuid4())
     staging_dir = Path(settings.staging_dir)
@@ -95,11 +111,17 @@ async def create_draft(
 
     try:
         # Save uploaded files
-        for file in files:
-            file_path = upload_dir / file.filename
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+        try:
+            written = 0
+            for file in files:
+                file_path = upload_dir / file.filename
+                with open(file_path, "wb") as f:
+                    content = await file.read()
+                    f.write(content)
+                written += len(content)
+            account_staging(draft_dir, written)
+        finally:
+            reservation.release()
 
         # Analyze audio files
         analyses = await analyze.analyze_directory(upload_dir)
@@ -121,7 +143,7 @@ async def create_draft(
 
         if not draft_files:
             # Cleanup if no valid audio files
-            shutil.rmtree(draft_dir)
+            await remove_draft_dir(draft_dir)
             raise HTTPException(
                 status_code=400,
                 detail="No valid audio files found in upload"
@@ -139,6 +161,7 @@ async def create_draft(
             files=draft_files
         )
         save_draft_state(draft_dir, state)
+        schedule_draft_expiry(draft_id, expires_at)
 
         return DraftResponse(
             draft_id=draft_id,
@@ -152,7 +175,7 @@ async def create_draft(
     except Exception as e:
         # Cleanup on error
         if draft_dir.exists():
-            shutil.rmtree(draft_dir)
+            await remove_draft_dir(draft_dir)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -181,7 +204,7 @@ async def get_draft(
     # Check expiration
     if is_draft_expired(state):
         # Cleanup expired draft
-        shutil.rmtree(draft_dir)
+        await remove_draft_dir(draft_dir)
         raise HTTPException(status_code=410, detail="Draft has expired")
 
     return DraftResponse(
@@ -192,6 +215,36 @@ async def get_draft(
     )
 
 
+@router.get("/{draft_id}/events")
+async def stream_draft(
+    draft_id: str,
+    wallet_address: str = Depends(require_auth),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Stream finalize progress via Server-Sent Events.
+
+    Lets a second tab (or a reloaded page) follow a finalize started
+    elsewhere. Starts with a "state" event listing the draft's files,
+    then forwards progress / warning / complete / error events. Ends
+    after "complete".
+    """
+    staging_dir = Path(settings.staging_dir)
+    state = load_draft_state(get_draft_dir(staging_dir, draft_id))
+    if state is None:
+        raise HTTPException(status_code=404, detail="Draft not found")
+    if state.uploaded_by.lower() != wallet_address.lower():
+        raise HTTPException(status_code=403, detail="Not your draft")
+
+    def snapshot():
+        return ("state", {"draft_id": draft_id, "files": len(state.files)})
+
+    return EventSourceResponse(
+        stream_topic(draft_topic(draft_id), snapshot, lambda event, data: event == "complete"),
+        media_type="text/event-stream"
+    )
+
+
 @router.delete("/{draft_id}")
 async def delete_draft(
     draft_id: str,
@@ -215,11 +268,31 @@ async def delete_draft(
         raise HTTPException(status_code=403, detail="Not your draft")
 
     # Cleanup
-    shutil.rmtree(draft_dir)
+    await remove_draft_dir(draft_dir)
 
     return {"message": "Draft deleted", "draft_id": draft_id}
 
 
+# Album finalize stages: organize (placing uploads), wav_convert, transcode,
+# metadata and pin. Every file a stage produces is checkpointed in
+# draft.json with its SHA-256 and IPFS CID, so a retry after a failure
+# (typically IPFS) reuses each file that still verifies.
+
+
+def finalize_request_hash(request: FinalizeRequest) -> str:
+    """Checkpoints are only reused for an identical finalize request."""
+    return hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+
+
+def _entries_hash(entries: dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(entries, sort_keys=True).encode()).hexdigest()
+
+
+def _safe_title(title: str) -> str:
+    """Title reduced to something safe for a filename."""
+    return "".join(c if c.isalnum() or c in " -_" else "" for c in title).strip()[:50]
+
+
 async def finalize_sse_generator(
     draft_id: str,
     request: FinalizeRequest,
@@ -231,248 +304,276 @@ async def finalize_sse_generator(
     Generator for SSE progress updates during album finalization.
 
     Transcodes files to OGG, creates album structure, pins to IPFS.
+
+    Each track runs its own place -> encode -> IPFS add pipeline as soon as
+    its source is there (encodes bounded by album_transcode_concurrency),
+    so the album takes about as long as its slowest track instead of the
+    sum of all stages. Files are added to IPFS unpinned as they finish,
+    linked straight into a scratch MFS tree (which keeps GC off them),
+    and the tree is pinned at the end.
+
+    A retry with the same request reuses every checkpointed file whose
+    hash still verifies, and the pin itself if nothing changed. The MFS
+    tree is named after the draft and kept until the finalize succeeds,
+    so checkpointed CIDs stay referenced between attempts; a checkpointed
+    file the kept tree no longer holds is added again from disk (not
+    re-encoded), since its blocks may have been garbage collected.
     """
 
+    completed = False
+
     async def send_event(event: str, data: dict):
+        nonlocal completed
+        completed = completed or event == "complete"
+        # Mirror to /draft-album/{id}/events subscribers
+        get_event_hub().publish(draft_topic(draft_id), event, data)
         return {"event": event, "data": json.dumps(data)}
 
-    try:
-        upload_dir = draft_dir / "upload"
-        album_dir = draft_dir / "album"
-        flac_dir = album_dir / "flac"
-        ogg_dir = album_dir / "ogg"
+    upload_dir = draft_dir / "upload"
+    album_dir = draft_dir / "album"
+    flac_dir = album_dir / "flac"
+    ogg_dir = album_dir / "ogg"
+
+    encode_slots = asyncio.Semaphore(settings.album_transcode_concurrency or os.cpu_count() or 1)
+    add_slots = asyncio.Semaphore(settings.album_ipfs_add_concurrency)
+    events: asyncio.Queue = asyncio.Queue()
+    entries: dict[str, str] = {}  # Album-relative path -> CID
+    assembly_name = f"draft-{draft_id}"
+    assembly = ipfs.DirectoryAssembly(name=assembly_name)
+    held: dict[str, str] = {}  # Checkpointed path -> CID the kept tree still links
+    progress = {"done": 0, "total": 0}
+
+    async def reusable_cid(stage: str, path: Path) -> Optional[str]:
+        """CID of a checkpointed output that is still on disk unchanged."""
+        checkpoint = state.finalize_checkpoints.get(stage)
+        rel_path = str(path.relative_to(album_dir))
+        if checkpoint is None or rel_path not in checkpoint.cids:
+            return None
+        if not path.is_file() or await file_sha256(path) != checkpoint.outputs.get(rel_path):
+            return None
+        return checkpoint.cids[rel_path]
+
+    async def record(stage: str, path: Path, cid: str) -> None:
+        rel_path = str(path.relative_to(album_dir))
+        digest = await file_sha256(path)
+        checkpoint = state.finalize_checkpoints.setdefault(
+            stage, StageCheckpoint(completed_at=datetime.now(timezone.utc))
+        )
+        checkpoint.outputs[rel_path] = digest
+        checkpoint.cids[rel_path] = cid
+        checkpoint.completed_at = datetime.now(timezone.utc)
+        save_draft_state(draft_dir, state)
 
+    async def produce(stage: str, path: Path, make) -> None:
+        """
+        Make one album file and add it to IPFS, unless a checkpoint has it.
+
+        make() writes the file and returns an error message or None; a
+        failed encode is a warning (the file is left out), as before.
+        """
+        rel_path = str(path.relative_to(album_dir))
+        cid = await reusable_cid(stage, path)
+        resumed = cid is not None
+        if not resumed:
+            # May be a hardlink into the transcode cache; never write through it
+            path.unlink(missing_ok=True)
+            error = await make()
+            if error:
+                events.put_nowait(("warning", {"message": error}))
+                progress["done"] += 1
+                return
+            st = path.stat()
+            if st.st_nlink == 1:
+                # Hardlinks (placed uploads, cache restores) are already counted
+                account_staging(draft_dir, st.st_size)
+        if not resumed or held.get(rel_path) != cid:
+            # New, or checkpointed but lost from the kept tree (maybe GC'd)
+            async with add_slots:
+                added = await ipfs.add_file(path, pin=False)
+            if not added.success:
+                raise RuntimeError(f"IPFS add failed for {rel_path}: {added.error}")
+            cid = added.cid
+            await record(stage, path, cid)
+            await assembly.link(rel_path, cid)
+        entries[rel_path] = cid
+        progress["done"] += 1
+        event = {
+            "stage": stage,
+            "message": f"{rel_path} ready",
+            "progress": 10 + int(progress["done"] / progress["total"] * 75),
+            "track": path.name,
+        }
+        if resumed:
+            event["resumed"] = True
+        events.put_nowait(("progress", event))
+
+    def place(src: Path, dest: Path):
+        async def make():
+            await run_io(place_file, src, dest)
+        return make
+
+    def encode(convert, src: Path, dest: Path, label: str, **kwargs):
+        async def make():
+            async with encode_slots:
+                events.put_nowait(("progress", {
+                    "stage": "transcode",
+                    "message": f"{label}...",
+                    "progress": 10 + int(progress["done"] / progress["total"] * 75),
+                    "track": src.name,
+                }))
+                result = await convert(src, dest, **kwargs)
+            if not result.success:
+                return f"Failed: {label}: {(result.error or '')[:200]}"
+        return make
+
+    tasks: list[asyncio.Task] = []
+    try:
         yield await send_event("progress", {
             "stage": "prepare",
             "message": "Preparing album structure...",
             "progress": 5
         })
 
+        request_hash = finalize_request_hash(request)
+        if state.finalize_request_hash != request_hash:
+            # New or changed request: earlier outputs (and their tree) don't apply
+            if album_dir.exists():
+                await run_io(shutil.rmtree, album_dir)
+            if state.finalize_checkpoints:
+                await ipfs.discard_assembly(assembly_name)
+            state.finalize_request_hash = request_hash
+            state.finalize_checkpoints = {}
+            save_draft_state(draft_dir, state)
+        else:
+            held = await assembly.resume({
+                rel_path: cid
+                for checkpoint in state.finalize_checkpoints.values()
+                for rel_path, cid in checkpoint.cids.items()
+            })
+
         # Create album structure
         album_dir.mkdir(parents=True, exist_ok=True)
         flac_dir.mkdir(exist_ok=True)
         ogg_dir.mkdir(exist_ok=True)
 
-        # Build track mapping from request order (includes title and per-track tags)
-        track_map = {t.filename: t for t in request.tracks}
-        ordered_files = [t.filename for t in request.tracks]
-
-        yield await send_event("progress", {
-            "stage": "organize",
-            "message": "Organizing tracks...",
-            "progress": 10
-        })
-
-        # Copy and rename files according to track order
-        # Also build mapping from new filename to track info for transcoding
-        has_flac = False  # True if user uploaded FLAC files (need FLAC→OGG)
-        has_wav = False   # True if user uploaded WAV files (need WAV→FLAC and WAV→OGG)
-        flac_to_track_info = {}  # Maps new FLAC filename -> FinalizeTrack
-        wav_to_convert = []  # List of (src_wav, dest_flac, dest_ogg, track_info) tuples
-        for idx, filename in enumerate(ordered_files, start=1):
-            src_path = upload_dir / filename
+        # Plan each track's outputs, named by request order. Encodes read the
+        # upload directly, so they don't wait for the FLAC archive copy.
+        jobs = []
+        for idx, track in enumerate(request.tracks, start=1):
+            src_path = upload_dir / track.filename
             if not src_path.exists():
                 yield await send_event("error", {
-                    "message": f"File not found: {filename}"
+                    "message": f"File not found: {track.filename}"
                 })
                 return
 
             ext = src_path.suffix.lower()
             track_num = f"{idx:02d}"
-            track_info = track_map.get(filename)
-            title = track_info.title if track_info else filename
-
-            # Sanitize title for filename
-            safe_title = "".join(c if c.isalnum() or c in " -_" else "" for c in title)
-            safe_title = safe_title.strip()[:50]  # Limit length
+            safe_title = _safe_title(track.title)
+            stem = f"{track_num}-{safe_title}"
+
+            track_metadata = {
+                "ARTIST": request.artist,
+                "ALBUM": request.album_title,
+                "TITLE": safe_title,
+                "TRACKNUMBER": track_num,
+            }
+            if request.year:
+                track_metadata["DATE"] = request.year
+            if track.tags:
+                track_metadata.update(track.tags)
 
             if ext == ".flac":
-                has_flac = True
-                dest_name = f"{track_num}-{safe_title}.flac"
-                shutil.copy2(src_path, flac_dir / dest_name)
-                flac_to_track_info[dest_name] = track_info
+                jobs.append(("organize", flac_dir / f"{stem}.flac", place(src_path, flac_dir / f"{stem}.flac")))
+                jobs.append(("transcode", ogg_dir / f"{stem}.ogg", encode(
+                    transcode.transcode_flac_to_ogg, src_path, ogg_dir / f"{stem}.ogg",
+                    f"Transcoding {src_path.name} to OGG", metadata=track_metadata,
+                )))
             elif ext == ".wav":
                 # WAV files: convert to FLAC (archive) and OGG (streaming) directly
-                has_wav = True
-                flac_dest = f"{track_num}-{safe_title}.flac"
-                ogg_dest = f"{track_num}-{safe_title}.ogg"
-                wav_to_convert.append((src_path, flac_dir / flac_dest, ogg_dir / ogg_dest, track_info))
+                jobs.append(("wav_convert", flac_dir / f"{stem}.flac", encode(
+                    transcode.transcode_to_flac, src_path, flac_dir / f"{stem}.flac",
+                    f"Converting {src_path.name} to FLAC",
+                )))
+                jobs.append(("wav_convert", ogg_dir / f"{stem}.ogg", encode(
+                    transcode.transcode_flac_to_ogg, src_path, ogg_dir / f"{stem}.ogg",
+                    f"Converting {src_path.name} to OGG", metadata=track_metadata,
+                )))
             elif ext in {".jpg", ".jpeg", ".png", ".webp"}:
                 # Cover art goes to album root
-                shutil.copy2(src_path, album_dir / "cover" + ext)
+                jobs.append(("organize", album_dir / f"cover{ext}", place(src_path, album_dir / f"cover{ext}")))
             else:
                 # Other audio formats go directly to OGG dir
-                dest_name = f"{track_num}-{safe_title}{ext}"
-                shutil.copy2(src_path, ogg_dir / dest_name)
-
-        # Convert WAV files to FLAC (archive) and OGG (streaming) directly
-        if wav_to_convert:
-            yield await send_event("progress", {
-                "stage": "wav_convert",
-                "message": "Converting WAV files...",
-                "progress": 10
-            })
-
-            for i, (wav_path, flac_path, ogg_path, track_info) in enumerate(wav_to_convert):
-                base_progress = 10 + int((i / len(wav_to_convert)) * 25)
-
-                # Extract track number from filename for metadata
-                track_num_str = flac_path.stem.split("-")[0] if "-" in flac_path.stem else str(i + 1)
-                track_title = "-".join(flac_path.stem.split("-")[1:]) if "-" in flac_path.stem else flac_path.stem
-
-                # Build metadata for this track
-                track_metadata = {
-                    "ARTIST": request.artist,
-                    "ALBUM": request.album_title,
-                    "TITLE": track_title,
-                    "TRACKNUMBER": track_num_str,
-                }
-                if request.year:
-                    track_metadata["DATE"] = request.year
-                if track_info and track_info.tags:
-                    track_metadata.update(track_info.tags)
-
-                # Convert WAV to FLAC (lossless archive)
-                yield await send_event("progress", {
-                    "stage": "wav_convert",
-                    "message": f"Converting {wav_path.name} to FLAC...",
-                    "progress": base_progress,
-                    "track": wav_path.name
-                })
-
-                flac_cmd = [
-                    "ffmpeg", "-y", "-i", str(wav_path),
-                    "-c:a", "flac",
-                    "-compression_level", "8",
-                    str(flac_path)
-                ]
-                proc = await asyncio.create_subprocess_exec(
-                    *flac_cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                _, stderr = await proc.communicate()
-
-                if proc.returncode != 0:
-                    yield await send_event("warning", {
-                        "message": f"Failed to convert {wav_path.name} to FLAC: {stderr.decode()[:200]}"
-                    })
-
-                # Convert WAV to OGG directly (with metadata)
-                yield await send_event("progress", {
-                    "stage": "wav_convert",
-                    "message": f"Converting {wav_path.name} to OGG...",
-                    "progress": base_progress + 5,
-                    "track": wav_path.name
-                })
-
-                ogg_cmd = ["ffmpeg", "-y", "-i", str(wav_path), "-c:a", "libvorbis", "-q:a", "6"]
-                for key, value in track_metadata.items():
-                    ogg_cmd.extend(["-metadata", f"{key}={value}"])
-                ogg_cmd.append(str(ogg_path))
-
-                proc = await asyncio.create_subprocess_exec(
-                    *ogg_cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                _, stderr = await proc.communicate()
-
-                if proc.returncode != 0:
-                    yield await send_event("warning", {
-                        "message": f"Failed to convert {wav_path.name} to OGG: {stderr.decode()[:200]}"
-                    })
-
-        # Transcode FLAC files to OGG
-        if has_flac:
-            yield await send_event("progress", {
-                "stage": "transcode",
-                "message": "Transcoding FLAC to OGG...",
-                "progress": 20
-            })
-
-            flac_files = sorted(flac_dir.glob("*.flac"))
-            total_flac = len(flac_files)
-
-            for i, flac_path in enumerate(flac_files):
-                ogg_name = flac_path.stem + ".ogg"
-                ogg_path = ogg_dir / ogg_name
-
-                # Skip if OGG already exists (e.g., from WAV→OGG conversion)
-                if ogg_path.exists():
-                    continue
-
-                # Extract track number and title from filename (format: "01-Title.flac")
-                track_num_str = flac_path.stem.split("-")[0] if "-" in flac_path.stem else str(i + 1)
-                track_title = "-".join(flac_path.stem.split("-")[1:]) if "-" in flac_path.stem else flac_path.stem
-
-                # Get per-track info for tags
-                this_track_info = flac_to_track_info.get(flac_path.name)
-
-                # Build metadata for this track
-                track_metadata = {
-                    "ARTIST": request.artist,
-                    "ALBUM": request.album_title,
-                    "TITLE": track_title,
-                    "TRACKNUMBER": track_num_str,
-                }
-                if request.year:
-                    track_metadata["DATE"] = request.year
-                # Add per-track custom tags
-                if this_track_info and this_track_info.tags:
-                    track_metadata.update(this_track_info.tags)
-
-                yield await send_event("progress", {
-                    "stage": "transcode",
-                    "message": f"Transcoding {flac_path.name}...",
-                    "progress": 20 + int((i / total_flac) * 40),
-                    "track": flac_path.name
-                })
+                dest = ogg_dir / f"{stem}{ext}"
+                jobs.append(("organize", dest, place(src_path, dest)))
+
+        metadata_path = album_dir / "metadata.json"
+
+        async def write_metadata():
+            metadata = {
+                "album_title": request.album_title,
+                "artist": request.artist,
+                "year": request.year,
+                "description": request.description,
+                "tracks": [
+                    {"track_number": i + 1, "title": t.title, "original_filename": t.filename}
+                    for i, t in enumerate(request.tracks)
+                ],
+                "uploaded_by": state.uploaded_by,
+                "created_at": datetime.now(timezone.utc).isoformat()
+            }
+            with open(metadata_path, "w") as f:
+                json.dump(metadata, f, indent=2)
+
+        jobs.append(("metadata", metadata_path, write_metadata))
+        progress["total"] = len(jobs)
 
-                result = await transcode.transcode_flac_to_ogg(flac_path, ogg_path, metadata=track_metadata)
-
-                if not result.success:
-                    yield await send_event("warning", {
-                        "message": f"Failed to transcode {flac_path.name}: {result.error}"
-                    })
-
-        # Create metadata.json
         yield await send_event("progress", {
-            "stage": "metadata",
-            "message": "Writing metadata...",
-            "progress": 65
+            "stage": "organize",
+            "message": f"Processing {len(request.tracks)} tracks...",
+            "progress": 10
         })
 
-        metadata = {
-            "album_title": request.album_title,
-            "artist": request.artist,
-            "year": request.year,
-            "description": request.description,
-            "tracks": [
-                {"track_number": i + 1, "title": t.title, "original_filename": t.filename}
-                for i, t in enumerate(request.tracks)
-            ],
-            "uploaded_by": state.uploaded_by,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-
-        with open(album_dir / "metadata.json", "w") as f:
-            json.dump(metadata, f, indent=2)
-
-        # Pin to IPFS
+        tasks = [asyncio.create_task(produce(stage, path, make)) for stage, path, make in jobs]
+        all_done = asyncio.gather(*tasks)
+        while True:
+            next_event = asyncio.create_task(events.get())
+            await asyncio.wait({next_event, all_done}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield await send_event(*next_event.result())
+                continue
+            next_event.cancel()
+            break
+        while not events.empty():
+            yield await send_event(*events.get_nowait())
+        all_done.result()  # Re-raise the first failure, if any
+
+        # Pin: assemble the album directory from the per-file CIDs
         yield await send_event("progress", {
             "stage": "ipfs",
             "message": "Pinning to IPFS...",
-            "progress": 70
+            "progress": 85
         })
 
-        result = await ipfs.add_directory(album_dir)
+        pinned = state.finalize_checkpoints.get("pin")
+        if pinned and pinned.result.get("entries") == _entries_hash(entries):
+            result = ipfs.PinResult(
+                success=True, cid=pinned.result["cid"], pinata_success=pinned.result.get("pinata", False)
+            )
+        else:
+            result = await assembly.pin()
 
-        if not result.success:
-            yield await send_event("error", {
-                "message": f"IPFS pinning failed: {result.error}"
-            })
-            return
+            if not result.success:
+                yield await send_event("error", {
+                    "message": f"IPFS pinning failed: {result.error}"
+                })
+                return
+
+            state.finalize_checkpoints["pin"] = StageCheckpoint(
+                completed_at=datetime.now(timezone.utc),
+                result={"cid": result.cid, "pinata": result.pinata_success, "entries": _entries_hash(entries)},
+            )
+            save_draft_state(draft_dir, state)
 
         yield await send_event("progress", {
             "stage": "ipfs",
@@ -499,18 +600,28 @@ async def finalize_sse_generator(
         yield await send_event("error", {"message": str(e)})
 
     finally:
-        # Cleanup draft directory after finalization
-        try:
-            if draft_dir.exists():
-                shutil.rmtree(draft_dir)
-        except Exception:
-            pass
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        # Kept after a failure, so a retry's checkpointed CIDs stay out of GC
+        await assembly.close(keep=not completed)
+
+        # Cleanup draft directory after a successful finalization; after an
+        # error the files stay (until expiry) so the finalize can be retried.
+        if completed:
+            try:
+                if draft_dir.exists():
+                    await remove_draft_dir(draft_dir)
+            except Exception:
+                pass
 
 
 @router.post("/{draft_id}/finalize")
 async def finalize_draft(
     draft_id: str,
     request: FinalizeRequest,
+    last_event_id: Optional[str] = Header(None),
     wallet_address: str = Depends(require_finalize_auth),
     settings: Settings = Depends(get_settings)
 ):
@@ -520,11 +631,22 @@ async def finalize_draft(
     Transcodes files to OGG, creates album structure with both FLAC and OGG,
     pins to IPFS, and returns the CID.
 
-    Progress is streamed via Server-Sent Events.
+    Runs as a detached job; progress is streamed via Server-Sent Events.
+    A repeated finalize attaches to the running (or finished) job and
+    replays from Last-Event-ID instead of starting a second one.
     """
     staging_dir = Path(settings.staging_dir)
     draft_dir = get_draft_dir(staging_dir, draft_id)
 
+    job = find_finalize_job(staging_dir, draft_id)
+    if job is not None and (job.running or job.completed):
+        if job.identity.lower() != wallet_address.lower():
+            raise HTTPException(status_code=403, detail="Not your draft")
+        return EventSourceResponse(
+            job.tail(parse_last_event_id(last_event_id)),
+            media_type="text/event-stream"
+        )
+
     state = load_draft_state(draft_dir)
     if state is None:
         raise HTTPException(status_code=404, detail="Draft not found")
@@ -535,7 +657,7 @@ async def finalize_draft(
 
     # Check expiration
     if is_draft_expired(state):
-        shutil.rmtree(draft_dir)
+        await remove_draft_dir(draft_dir)
         raise HTTPException(status_code=410, detail="Draft has expired")
 
     # Validate all requested files exist in draft
@@ -547,7 +669,32 @@ async def finalize_draft(
                 detail=f"File not in draft: {track.filename}"
             )
 
-    return EventSourceResponse(
+    job = start_finalize_job(
+        staging_dir, draft_id, wallet_address,
         finalize_sse_generator(draft_id, request, draft_dir, state, settings),
+    )
+    return EventSourceResponse(job.tail(), media_type="text/event-stream")
+
+
+@router.get("/{draft_id}/finalize/events")
+async def stream_draft_finalize(
+    draft_id: str,
+    last_event_id: Optional[str] = Header(None),
+    wallet_address: str = Depends(require_auth),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Tail an album finalize job's event log via Server-Sent Events.
+
+    Replays every event after Last-Event-ID, then follows the job live
+    until it ends.
+    """
+    job = find_finalize_job(Path(settings.staging_dir), draft_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No finalize for this draft")
+    if job.identity.lower() != wallet_address.lower():
+        raise HTTPException(status_code=403, detail="Not your draft")
+    return EventSourceResponse(
+        job.tail(parse_last_event_id(last_event_id)),
         media_type="text/event-stream"
     )
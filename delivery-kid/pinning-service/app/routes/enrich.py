@@ -21,7 +21,9 @@ from pydantic import BaseModel
 from ..auth import require_auth
 from ..config import get_settings, Settings
 from ..services.torrent import create_torrent, DEFAULT_TRACKERS
+from ..services.cleanup import account_staging_tree
 from ..services.seeder import get_seeder
+from ..services.workers import run_cpu, run_io
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +48,33 @@ class TorrentResponse(BaseModel):
     error: str | None = None
 
 
+def _unpack_archive(tmpdir: Path, archive: bytes) -> Path | None:
+    """Extract an `ipfs get --archive` tar into tmpdir; blocking (io pool)."""
+    tar_path = tmpdir / "archive.tar"
+    tar_path.write_bytes(archive)
+    subprocess.run(
+        ["tar", "xf", str(tar_path), "-C", str(tmpdir)],
+        capture_output=True, check=True,
+    )
+    tar_path.unlink()
+
+    # Find extracted content — could be a directory or a single file
+    children = list(tmpdir.iterdir())
+    if not children:
+        shutil.rmtree(tmpdir)
+        return None
+
+    child = children[0]
+    if child.is_dir():
+        return child
+
+    # Single file — wrap in a directory for create_torrent
+    wrapper = tmpdir / "content"
+    wrapper.mkdir()
+    child.rename(wrapper / child.name)
+    return wrapper
+
+
 async def fetch_ipfs_content(cid: str, ipfs_api_url: str) -> Path | None:
     """Fetch a CID from local IPFS to a temp dir.
 
@@ -61,36 +90,13 @@ async def fetch_ipfs_content(cid: str, ipfs_api_url: str) -> Path | None:
             )
             if r.status_code != 200:
                 logger.warning("IPFS get failed for %s: %s", cid, r.status_code)
-                shutil.rmtree(tmpdir)
+                await run_io(shutil.rmtree, tmpdir)
                 return None
 
-        # Write and extract tar
-        tar_path = tmpdir / "archive.tar"
-        tar_path.write_bytes(r.content)
-        subprocess.run(
-            ["tar", "xf", str(tar_path), "-C", str(tmpdir)],
-            capture_output=True, check=True,
-        )
-        tar_path.unlink()
-
-        # Find extracted content — could be a directory or a single file
-        children = list(tmpdir.iterdir())
-        if not children:
-            shutil.rmtree(tmpdir)
-            return None
-
-        child = children[0]
-        if child.is_dir():
-            return child
-
-        # Single file — wrap in a directory for create_torrent
-        wrapper = tmpdir / "content"
-        wrapper.mkdir()
-        child.rename(wrapper / child.name)
-        return wrapper
+        return await run_io(_unpack_archive, tmpdir, r.content)
     except Exception as e:
         logger.error("Error fetching %s: %s", cid, e)
-        shutil.rmtree(tmpdir, ignore_errors=True)
+        await run_io(shutil.rmtree, tmpdir, ignore_errors=True)
         return None
 
 
@@ -123,7 +129,9 @@ async def generate_torrent(
     try:
         torrent_name = req.name or cid
         base_url = settings.ipfs_gateway_url.replace("ipfs.", "", 1)
-        result = create_torrent(
+        # Piece hashing reads every byte of the album
+        result = await run_cpu(
+            create_torrent,
             directory=album_dir,
             name=torrent_name,
             # Multi-file: Caddy rewrites /webseed/{cid}/{name}/{file} → /ipfs/{cid}/{file}
@@ -147,7 +155,10 @@ async def generate_torrent(
         torrent_url = None
         seeder = get_seeder()
         if seeder and result.torrent_bytes:
-            infohash_added = seeder.add_torrent(cid, result.torrent_bytes, album_dir)
+            cid_dir = seeder.seeding_dir / cid
+            await account_staging_tree(cid_dir, removing=True)  # Replaced if already seeding
+            infohash_added = await run_io(seeder.add_torrent, cid, result.torrent_bytes, album_dir)
+            await account_staging_tree(cid_dir / "data")
             if infohash_added:
                 base_url = settings.ipfs_gateway_url.replace("ipfs.", "", 1)
                 torrent_url = f"{base_url}/torrent/{result.infohash}.torrent"
@@ -169,4 +180,4 @@ async def generate_torrent(
 
     finally:
         parent = album_dir.parent
-        shutil.rmtree(parent, ignore_errors=True)
+        await run_io(shutil.rmtree, parent, ignore_errors=True)
@@ -4,6 +4,10 @@ import httpx
 from fastapi import APIRouter
 
 from ..config import get_settings
+from ..services.cleanup import get_staging_space
+from ..services.loop_monitor import get_loop_monitor
+from ..services.pin_index import get_pin_index
+from ..services.workers import worker_pools_status
 
 router = APIRouter()
 
@@ -24,12 +28,33 @@ async def health_check():
     except Exception:
         ipfs_ok = False
 
-    return {
+    response = {
         "status": "ok" if ipfs_ok else "degraded",
         "node": settings.node_name,
         "ipfs": "connected" if ipfs_ok else "disconnected"
     }
 
+    # Staging disk budget and headroom
+    space = get_staging_space()
+    if space is not None:
+        staging = space.status()
+        response["staging"] = staging
+        if staging["headroom_gb"] is not None and staging["headroom_gb"] <= 0:
+            response["status"] = "degraded"
+
+    # Blocking-work pools: queue wait and run time per operation
+    response["workers"] = worker_pools_status()
+
+    # Event loop lag (details and stall stacks at /debug/loop)
+    monitor = get_loop_monitor()
+    if monitor is not None:
+        response["loop"] = monitor.status()
+
+    # Cached /local-pins listing
+    response["local_pins"] = get_pin_index().status()
+
+    return response
+
 
 @router.get("/version")
 async def version():
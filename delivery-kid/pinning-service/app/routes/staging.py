@@ -1,26 +1,45 @@
 """Serve staged draft files for preview (e.g., video embed on ReleaseDraft pages).
 
 Files are served from the staging directory at /drafts/{draft_id}/upload/{filename}.
+Local preview assets (poster, storyboard, 360p proxy) are served from
+/drafts/{draft_id}/preview/{filename} via /staging/drafts/{draft_id}/preview/{filename}.
 Requires a valid upload token (any logged-in wiki user). Does NOT check draft
 ownership — the unguessable UUID is sufficient access control for preview.
 
-Supports HTTP range requests for video seeking via FastAPI's FileResponse.
+Files are sent by services.media_server: strong ETags and conditional
+requests, single and multi-range requests for video seeking, and
+bandwidth shaping in which a person's player (interactive) goes ahead
+of machine fetches via preview_token (bulk, e.g. Coconut).
 
 Auth can be provided via headers (standard require_auth flow) OR via query
 parameters (?token=...&user=...&timestamp=...) so that <video src="...">
 tags work without JavaScript fetch gymnastics.
+
+Coconut (and anything else given a source URL) authenticates with
+?preview_token=. Tokens minted now are signed for one file and carry
+their expiry (auth.create_preview_token), so each of Coconut's parallel
+range requests is checked without touching disk. The older random
+per-draft token stored in draft.json is still accepted.
 """
 
 import mimetypes
+from dataclasses import asdict
 from pathlib import Path
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from fastapi.responses import FileResponse
 
-from ..auth import require_auth, verify_upload_token
+from ..auth import is_signed_preview_token, require_auth, verify_preview_token, verify_upload_token
 from ..config import get_settings, Settings
 from ..models.content import ContentDraftState
+from ..services.draft_store import get_draft_store
+from ..services.media_server import (
+    BULK,
+    INTERACTIVE,
+    StagingFileResponse,
+    get_bandwidth_shaper,
+    get_transfer_ledger,
+)
 
 router = APIRouter(prefix="/staging", tags=["staging"])
 
@@ -32,68 +51,71 @@ _MEDIA_TYPES = {
     ".mov": "video/quicktime",
     ".flac": "audio/flac",
     ".ogg": "audio/ogg",
+    ".vtt": "text/vtt",
 }
 for _ext, _mime in _MEDIA_TYPES.items():
     mimetypes.add_type(_mime, _ext)
 
 
 def _check_preview_token(draft_id: str, preview_token: str, settings: Settings) -> bool:
-    """Validate a preview_token against the draft state on disk."""
-    import json
-    draft_json = Path(settings.staging_dir) / "drafts" / draft_id / "draft.json"
-    if not draft_json.exists():
-        return False
-    try:
-        data = json.loads(draft_json.read_text())
-        return data.get("preview_token") == preview_token and preview_token
-    except (json.JSONDecodeError, OSError):
+    """Validate a legacy (random, per-draft) preview_token against the draft state."""
+    data = get_draft_store().read(Path(settings.staging_dir) / "drafts" / draft_id)
+    if data is None:
         return False
+    return bool(preview_token) and data.get("preview_token") == preview_token
 
 
-
-@router.get("/drafts/{draft_id}/{filename}")
-async def get_staging_file(
-    draft_id: str,
-    filename: str,
+async def _authenticate(
     request: Request,
-    token: Optional[str] = Query(None),
-    user: Optional[str] = Query(None),
-    timestamp: Optional[str] = Query(None),
-    preview_token: Optional[str] = Query(None),
-    settings: Settings = Depends(get_settings),
-):
-    """Serve a file from a staging draft for preview.
-
-    Used by the ReleaseDraft page to embed video/audio players.
-    Also used by Coconut to fetch source video for transcoding (via preview_token).
-
-    Auth: HMAC headers, HMAC query params, or preview_token query param.
+    draft_id: str,
+    path: str,
+    token: Optional[str],
+    user: Optional[str],
+    timestamp: Optional[str],
+    preview_token: Optional[str],
+    settings: Settings,
+) -> str:
     """
-    # Sanitize path components to prevent traversal
-    if ".." in draft_id or "/" in draft_id or ".." in filename or "/" in filename:
-        raise HTTPException(status_code=400, detail="Invalid path")
+    Auth: preview_token (for Coconut), then headers, then HMAC query params.
 
-    # Auth: preview_token (for Coconut), then headers, then HMAC query params
-    authenticated = False
-    if preview_token and _check_preview_token(draft_id, preview_token, settings):
-        authenticated = True
-    if not authenticated:
-        try:
-            await require_auth(request, settings)
-            authenticated = True
-        except HTTPException:
-            pass
-    if not authenticated and token and user and timestamp:
+    Returns the transfer priority: bulk for preview_token fetches,
+    interactive for a user's own requests.
+    """
+    if preview_token:
+        if is_signed_preview_token(preview_token):
+            # Signed for this file: checked in memory
+            if verify_preview_token(preview_token, draft_id, path, settings):
+                return BULK
+        elif _check_preview_token(draft_id, preview_token, settings):
+            return BULK
+    try:
+        await require_auth(request, settings)
+        return INTERACTIVE
+    except HTTPException:
+        pass
+    if token and user and timestamp:
         try:
             ts = int(timestamp)
         except (ValueError, TypeError):
             raise HTTPException(status_code=401, detail="Invalid timestamp")
         if verify_upload_token(token, user, ts, settings, action="upload"):
-            authenticated = True
-    if not authenticated:
-        raise HTTPException(status_code=401, detail="Authentication required")
+            return INTERACTIVE
+    raise HTTPException(status_code=401, detail="Authentication required")
+
+
+def _serve(
+    settings: Settings,
+    request: Request,
+    draft_id: str,
+    subdir: str,
+    filename: str,
+    priority: str,
+) -> StagingFileResponse:
+    # Sanitize path components to prevent traversal
+    if ".." in draft_id or "/" in draft_id or ".." in filename or "/" in filename:
+        raise HTTPException(status_code=400, detail="Invalid path")
 
-    file_path = Path(settings.staging_dir) / "drafts" / draft_id / "upload" / filename
+    file_path = Path(settings.staging_dir) / "drafts" / draft_id / subdir / filename
 
     if not file_path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
@@ -106,8 +128,84 @@ async def get_staging_file(
 
     content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
 
-    return FileResponse(
-        path=file_path,
+    return StagingFileResponse(
+        file_path,
+        request,
+        draft_id=draft_id,
+        priority=priority,
         media_type=content_type,
         filename=filename,
+        shaper=get_bandwidth_shaper(),
+        ledger=get_transfer_ledger(),
+    )
+
+
+@router.get("/transfers")
+async def get_transfers(
+    draft_id: Optional[str] = Query(None),
+    identity: str = Depends(require_auth),
+):
+    """Bytes and requests served per draft, and the bandwidth shaper's state."""
+    ledger = get_transfer_ledger()
+    if draft_id is not None:
+        entry = ledger.get(draft_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="No transfers for draft")
+        return {"draft_id": draft_id, **asdict(entry)}
+    shaper = get_bandwidth_shaper()
+    return {
+        "shaper": shaper.status() if shaper else None,
+        "drafts": {key: asdict(entry) for key, entry in ledger.drafts.items()},
+    }
+
+
+@router.api_route("/drafts/{draft_id}/preview/{filename}", methods=["GET", "HEAD"])
+async def get_local_preview_file(
+    draft_id: str,
+    filename: str,
+    request: Request,
+    token: Optional[str] = Query(None),
+    user: Optional[str] = Query(None),
+    timestamp: Optional[str] = Query(None),
+    preview_token: Optional[str] = Query(None),
+    settings: Settings = Depends(get_settings),
+):
+    """Serve a local preview asset (poster, storyboard sprite/VTT, 360p proxy).
+
+    Filenames are listed in the draft's local_preview_files. Same auth as
+    the uploaded files.
+    """
+    if ".." in draft_id or "/" in draft_id:
+        raise HTTPException(status_code=400, detail="Invalid path")
+    priority = await _authenticate(
+        request, draft_id, f"preview/{filename}", token, user, timestamp, preview_token, settings
+    )
+    return _serve(settings, request, draft_id, "preview", filename, priority)
+
+
+@router.api_route("/drafts/{draft_id}/{filename}", methods=["GET", "HEAD"])
+async def get_staging_file(
+    draft_id: str,
+    filename: str,
+    request: Request,
+    token: Optional[str] = Query(None),
+    user: Optional[str] = Query(None),
+    timestamp: Optional[str] = Query(None),
+    preview_token: Optional[str] = Query(None),
+    settings: Settings = Depends(get_settings),
+):
+    """Serve a file from a staging draft for preview.
+
+    Used by the ReleaseDraft page to embed video/audio players.
+    Also used by Coconut to fetch source video for transcoding (via preview_token).
+
+    Auth: HMAC headers, HMAC query params, or preview_token query param.
+    """
+    # Sanitize path components to prevent traversal
+    if ".." in draft_id or "/" in draft_id or ".." in filename or "/" in filename:
+        raise HTTPException(status_code=400, detail="Invalid path")
+
+    priority = await _authenticate(
+        request, draft_id, f"upload/{filename}", token, user, timestamp, preview_token, settings
     )
+    return _serve(settings, request, draft_id, "upload", filename, priority)
@@ -429,3 +429,61 @@ async def analyze_media_directory(directory: Path) -> list[MediaAnalysis]:
     ])
 
     return list(results)
+
+
+async def probe_keyframe_times(
+    file_path: Path,
+    intervals: Optional[list[tuple[float, float]]] = None,
+) -> list[float]:
+    """
+    List the presentation times (seconds) of video keyframes.
+
+    Only packet headers are read — nothing is decoded. Pass intervals as
+    (start, end) pairs to limit the scan to the regions around cut points;
+    ffprobe seeks to each start, so a long file isn't read end to end.
+
+    Returns an empty list if the file can't be probed.
+    """
+    if not shutil.which("ffprobe"):
+        return []
+
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0",
+    ]
+    if intervals:
+        cmd.extend([
+            "-read_intervals",
+            ",".join(f"{max(start, 0.0)}%{end}" for start, end in intervals),
+        ])
+    cmd.append(str(file_path))
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            return []
+        return parse_keyframe_packets(stdout.decode())
+    except Exception:
+        return []
+
+
+def parse_keyframe_packets(csv_text: str) -> list[float]:
+    """Parse ffprobe "pts_time,flags" CSV lines into sorted keyframe times."""
+    times = set()
+    for line in csv_text.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            times.add(float(parts[0]))
+        except ValueError:
+            continue  # pts_time can be N/A
+    return sorted(times)
@@ -1,13 +1,30 @@
-"""Draft cleanup service - removes expired drafts and manages staging space."""
+"""Draft cleanup service - removes expired drafts and manages staging space.
+
+StagingSpace enforces Settings.max_staging_size_gb: uploads reserve their
+size before anything is written, and when the budget would be exceeded
+space is freed first from the transcode cache (least recently used) and
+then from expired and orphaned drafts. Only if that isn't enough is the
+upload refused. The seeding directory is persistent storage, not staging
+working space, and is never counted or touched.
+"""
 
 import asyncio
-import json
+import heapq
 import logging
+import os
 import shutil
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from . import ipfs
+from .draft_store import get_draft_store
+from .finalize_jobs import cleanup_finalize_logs, is_finalizing
+from .transcode_cache import get_transcode_cache
+from .workers import run_io
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,48 +34,48 @@ def get_draft_expiry(draft_dir: Path) -> Optional[datetime]:
 
     Returns None if the file doesn't exist or can't be parsed.
     """
-    draft_json = draft_dir / "draft.json"
-    if not draft_json.exists():
+    data = get_draft_store().read(draft_dir)
+    if data is None:
         return None
 
     try:
-        with open(draft_json) as f:
-            data = json.load(f)
         expires_str = data.get("expires_at")
         if expires_str:
             # Handle both ISO format with and without timezone
             if expires_str.endswith("Z"):
                 expires_str = expires_str[:-1] + "+00:00"
             return datetime.fromisoformat(expires_str)
-    except (json.JSONDecodeError, ValueError, KeyError) as e:
+    except (ValueError, KeyError, AttributeError) as e:
         logger.warning(f"Could not parse draft.json in {draft_dir}: {e}")
 
     return None
 
 
-def cleanup_expired_drafts(staging_dir: Path) -> tuple[int, int]:
+def find_expired_drafts(staging_dir: Path) -> tuple[int, list[Path]]:
     """
-    Remove all expired drafts from the staging directory.
+    Find expired and orphaned drafts in the staging directory.
 
-    Returns tuple of (drafts_checked, drafts_removed).
+    Returns tuple of (drafts_checked, draft dirs to remove). Blocking:
+    call via run_io from async code.
     """
     drafts_dir = staging_dir / "drafts"
     if not drafts_dir.exists():
-        return (0, 0)
+        return (0, [])
 
     now = datetime.now(timezone.utc)
     checked = 0
-    removed = 0
+    expired = []
 
     for draft_dir in drafts_dir.iterdir():
         if not draft_dir.is_dir():
             continue
 
         checked += 1
+        if is_finalizing(draft_dir.name):
+            continue  # Never pull files out from under a running finalize
         expires_at = get_draft_expiry(draft_dir)
 
         # Remove if expired or if we can't determine expiry (orphaned draft)
-        should_remove = False
         if expires_at is None:
             # No valid draft.json - this is an orphaned directory
             # Check if it's old (created more than 24 hours ago based on mtime)
@@ -66,41 +83,594 @@ def cleanup_expired_drafts(staging_dir: Path) -> tuple[int, int]:
                 mtime = datetime.fromtimestamp(draft_dir.stat().st_mtime, tz=timezone.utc)
                 age_hours = (now - mtime).total_seconds() / 3600
                 if age_hours > 24:
-                    should_remove = True
+                    expired.append(draft_dir)
                     logger.info(f"Removing orphaned draft: {draft_dir.name} (age: {age_hours:.1f}h)")
             except OSError:
                 pass
         elif expires_at < now:
-            should_remove = True
+            expired.append(draft_dir)
             logger.info(f"Removing expired draft: {draft_dir.name}")
 
-        if should_remove:
-            try:
-                shutil.rmtree(draft_dir)
-                removed += 1
-            except OSError as e:
-                logger.error(f"Failed to remove draft {draft_dir.name}: {e}")
+    return (checked, expired)
+
+
+async def cleanup_expired_drafts(staging_dir: Path) -> tuple[int, int]:
+    """
+    Remove all expired drafts from the staging directory.
+
+    Returns tuple of (drafts_checked, drafts_removed).
+    """
+    checked, expired = await run_io(find_expired_drafts, staging_dir)
+    removed = 0
+    for draft_dir in expired:
+        if is_finalizing(draft_dir.name):
+            continue  # Started since the scan
+        try:
+            await remove_draft_dir(draft_dir)
+            removed += 1
+        except OSError as e:
+            logger.error(f"Failed to remove draft {draft_dir.name}: {e}")
 
     return (checked, removed)
 
 
-def get_staging_size_gb(staging_dir: Path) -> float:
+# A directory whose mtime hasn't changed for this long is assumed to hold
+# the same files at the same sizes as when last scanned (staging files are
+# written once, right after they're created)
+_SCAN_SETTLE_SECONDS = 120
+
+
+@dataclass
+class _DirScan:
+    mtime_ns: int
+    own_bytes: int  # Files with a single link
+    linked: dict[tuple[int, int], int]  # (dev, inode) -> size, for hardlinked files
+    subdirs: list[str]
+
+
+def _scan_dir(path: str, cache: dict[str, _DirScan], fresh: dict[str, _DirScan],
+              seen: set[tuple[int, int]], now: float) -> int:
+    """Bytes under path via os.scandir, reusing settled directories' cached totals."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0
+    scan = cache.get(path)
+    if scan is None or scan.mtime_ns != st.st_mtime_ns or now - st.st_mtime < _SCAN_SETTLE_SECONDS:
+        scan = _DirScan(st.st_mtime_ns, 0, {}, [])
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            scan.subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            est = entry.stat(follow_symlinks=False)
+                            if est.st_nlink > 1:
+                                scan.linked[(est.st_dev, est.st_ino)] = est.st_size
+                            else:
+                                scan.own_bytes += est.st_size
+                    except OSError:
+                        continue
+        except OSError:
+            return 0
+    fresh[path] = scan
+
+    total = scan.own_bytes
+    for inode, size in scan.linked.items():
+        if inode not in seen:
+            seen.add(inode)
+            total += size
+    for subdir in scan.subdirs:
+        total += _scan_dir(subdir, cache, fresh, seen, now)
+    return total
+
+
+def _entry_bytes(path: Path, cache: dict[str, _DirScan], fresh: dict[str, _DirScan],
+                 seen: set[tuple[int, int]], now: float) -> int:
+    try:
+        if path.is_dir() and not path.is_symlink():
+            return _scan_dir(str(path), cache, fresh, seen, now)
+        return path.lstat().st_size
+    except OSError:
+        return 0
+
+
+def scan_staging(staging_dir: Path, cache: Optional[dict[str, _DirScan]] = None) -> tuple[dict[str, int], dict[str, _DirScan]]:
     """
-    Calculate total size of the staging directory in gigabytes.
+    Measure the staging dir, one total per ledger key.
+
+    Keys are "drafts/<id>" for drafts and the top-level entry name for
+    everything else. Hardlinked files are counted once: the transcode cache
+    is measured first, so outputs restored from it into drafts count only
+    as cache. Returns the totals and the per-directory scan cache to pass
+    to the next call.
     """
-    total_bytes = 0
+    cache = cache or {}
+    fresh: dict[str, _DirScan] = {}
+    seen: set[tuple[int, int]] = set()
+    now = time.time()
+    totals: dict[str, int] = {}
     try:
-        for path in staging_dir.rglob("*"):
-            if path.is_file():
-                total_bytes += path.stat().st_size
+        top = sorted(staging_dir.iterdir(), key=lambda entry: entry.name != "cache")
     except OSError:
-        pass
-    return total_bytes / (1024 ** 3)
+        return totals, fresh
+    for entry in top:
+        if entry.name == "drafts" and entry.is_dir():
+            try:
+                drafts = list(entry.iterdir())
+            except OSError:
+                continue
+            for draft_dir in drafts:
+                totals[f"drafts/{draft_dir.name}"] = _entry_bytes(draft_dir, cache, fresh, seen, now)
+        else:
+            totals[entry.name] = _entry_bytes(entry, cache, fresh, seen, now)
+    return totals, fresh
+
+
+async def get_staging_size_gb(staging_dir: Path) -> float:
+    """
+    Total size of the staging directory in gigabytes.
+
+    O(1) from the staging ledger (read on the loop) once init_staging_space
+    has run (the budgeted total, excluding seeding); otherwise a one-off
+    scan in a worker thread.
+    """
+    space = get_staging_space()
+    if space is not None and space.staging_dir == staging_dir:
+        return space.usage().total_bytes / (1024 ** 3)
+    totals, _ = await run_io(scan_staging, staging_dir)
+    return sum(totals.values()) / (1024 ** 3)
+
+
+def _category(key: str) -> str:
+    if key.startswith("drafts/"):
+        return "drafts"
+    if key.startswith(("hls-", "coconut-src-")):
+        return "jobs"
+    if key in ("cache", "originals", "seeding"):
+        return key
+    return "other"
+
+
+@dataclass
+class StagingUsage:
+    """Bytes on the staging disk, by what they belong to."""
+    categories: dict[str, int] = field(default_factory=dict)  # drafts / jobs / cache / originals / other
+    drafts: dict[str, int] = field(default_factory=dict)  # draft_id -> bytes
+    excluded_bytes: int = 0  # Seeding: reported, but outside the budget
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.categories.values())
+
+
+class StagingFullError(Exception):
+    """Not enough staging space for an upload, even after eviction."""
+
+    def __init__(self, needed: int, headroom: int):
+        super().__init__(f"Staging space exhausted: need {needed} bytes, {headroom} available")
+        self.needed = needed
+        self.headroom = headroom
+
+
+class Reservation:
+    """Space held for an upload until its files are on disk."""
+
+    def __init__(self, space: Optional["StagingSpace"], nbytes: int):
+        self._space = space
+        self.nbytes = nbytes
+
+    def release(self) -> None:
+        if self.nbytes:
+            self._space.reserved -= self.nbytes
+            self.nbytes = 0
+
+
+class StagingSpace:
+    """
+    Budget for the staging dir with admission control for uploads.
+
+    Usage comes from a byte ledger (one total per draft and per top-level
+    staging entry) that the upload, finalize, Coconut, seeder and cleanup
+    paths update as they write and delete, so size queries are O(1).
+    reconcile() re-measures from disk in a worker thread to correct drift
+    from anything that wrote without accounting. The transcode cache
+    tracks its own size, which is used live.
+    """
+
+    def __init__(self, staging_dir: Path, max_bytes: int, exclude: tuple[Path, ...] = ()):
+        self.staging_dir = staging_dir
+        self.max_bytes = max_bytes  # 0 = unlimited
+        self.exclude_keys = {
+            p.resolve().relative_to(staging_dir.resolve()).parts[0]
+            for p in exclude if p.resolve().is_relative_to(staging_dir.resolve())
+        }
+        self.reserved = 0
+        self.ledger: dict[str, int] = {}
+        self.reconciled_at: Optional[float] = None
+        self._scan_cache: dict[str, _DirScan] = {}
+        self._lock = asyncio.Lock()
+
+    def _key(self, path: Path) -> Optional[str]:
+        try:
+            parts = path.resolve().relative_to(self.staging_dir.resolve()).parts
+        except ValueError:
+            return None  # Outside staging (e.g. seeding on its own mount)
+        if not parts:
+            return None
+        if parts[0] == "drafts":
+            return f"drafts/{parts[1]}" if len(parts) > 1 else None
+        return parts[0]
+
+    def account(self, path: Path, delta: int) -> None:
+        """Record bytes written (positive) or deleted (negative) under path."""
+        key = self._key(path)
+        if key is not None and delta:
+            self.ledger[key] = max(0, self.ledger.get(key, 0) + delta)
+
+    def forget(self, path: Path) -> None:
+        """Record that a draft or top-level staging entry was removed entirely."""
+        key = self._key(path)
+        if key is not None:
+            self.ledger.pop(key, None)
+
+    async def reconcile(self) -> None:
+        """Re-measure the ledger from disk (scandir, in a worker thread)."""
+        totals, self._scan_cache = await run_io(scan_staging, self.staging_dir, self._scan_cache)
+        drift = sum(totals.values()) - sum(self.ledger.values())
+        if self.reconciled_at is not None and abs(drift) > 64 * 1024 ** 2:
+            logger.info(f"Staging ledger reconciled: drift {drift / 1024 ** 2:+.0f}MB")
+        self.ledger = totals
+        self.reconciled_at = time.time()
+
+    def usage(self) -> StagingUsage:
+        usage = StagingUsage()
+        for key, size in self.ledger.items():
+            if key in self.exclude_keys:
+                usage.excluded_bytes += size
+                continue
+            category = _category(key)
+            usage.categories[category] = usage.categories.get(category, 0) + size
+            if category == "drafts":
+                usage.drafts[key.split("/", 1)[1]] = size
+        cache = get_transcode_cache()
+        if cache is not None and cache.root.is_relative_to(self.staging_dir):
+            usage.categories["cache"] = cache.total_bytes
+        return usage
+
+    def headroom(self) -> Optional[int]:
+        """Bytes left in the budget (None if unlimited)."""
+        if not self.max_bytes:
+            return None
+        return self.max_bytes - self.usage().total_bytes - self.reserved
+
+    async def free_space(self, needed: int) -> Optional[int]:
+        """
+        Try to make `needed` bytes of headroom: shrink the transcode cache
+        (LRU first), then remove expired and orphaned drafts that haven't
+        been collected yet. Returns the headroom afterwards.
+        """
+        headroom = self.headroom()
+        if headroom is None or headroom >= needed:
+            return headroom
+
+        cache = get_transcode_cache()
+        if cache is not None:
+            freed = await run_io(cache.evict, max(0, cache.total_bytes - (needed - headroom)))
+            if freed:
+                logger.info(f"Staging over budget: evicted {freed} bytes of transcode cache")
+                headroom = self.headroom()
+                if headroom >= needed:
+                    return headroom
+
+        scheduler = get_expiry_scheduler()
+        if scheduler is not None:
+            removed = await scheduler.remove_due()
+        else:
+            _, removed = await cleanup_expired_drafts(self.staging_dir)
+        if removed:
+            logger.info(f"Staging over budget: removed {removed} expired/orphaned drafts")
+            for key in [k for k in self.ledger if k.startswith("drafts/")]:
+                if not (self.staging_dir / key).exists():
+                    self.ledger.pop(key, None)
+        return self.headroom()
+
+    async def admit(self, nbytes: int) -> Reservation:
+        """
+        Reserve space for an upload of nbytes, evicting if needed.
+
+        Raises StagingFullError if the budget can't accommodate it.
+        Release the reservation once the files are written and accounted.
+        """
+        if not self.max_bytes:
+            return Reservation(self, 0)
+        async with self._lock:
+            headroom = self.headroom()
+            if headroom < nbytes:
+                headroom = await self.free_space(nbytes)
+            if headroom < nbytes:
+                raise StagingFullError(nbytes, max(0, headroom))
+            self.reserved += nbytes
+            return Reservation(self, nbytes)
+
+    def status(self) -> dict:
+        """Usage summary for /health."""
+        usage = self.usage()
+        gb = 1024 ** 3
+        headroom = self.headroom()
+        return {
+            "used_gb": round(usage.total_bytes / gb, 3),
+            "budget_gb": round(self.max_bytes / gb, 3) if self.max_bytes else None,
+            "headroom_gb": round(headroom / gb, 3) if headroom is not None else None,
+            "reserved_gb": round(self.reserved / gb, 3),
+            "by_category_gb": {k: round(v / gb, 3) for k, v in sorted(usage.categories.items())},
+            "excluded_gb": round(usage.excluded_bytes / gb, 3),
+            "drafts": len(usage.drafts),
+            "reconciled_at": self.reconciled_at,
+        }
+
+
+# Global staging space instance
+_space: Optional[StagingSpace] = None
+
+
+def get_staging_space() -> Optional[StagingSpace]:
+    """Get the global staging space manager (None until init_staging_space)."""
+    return _space
+
+
+def init_staging_space(staging_dir: Path, max_gb: float, seeding_dir: Optional[Path] = None) -> StagingSpace:
+    """Initialize the global staging space manager. Call reconcile() to load the ledger."""
+    global _space
+    exclude = (seeding_dir,) if seeding_dir is not None else ()
+    _space = StagingSpace(staging_dir, int(max_gb * 1024 ** 3), exclude=exclude)
+    return _space
+
+
+def account_staging(path: Path, delta: int) -> None:
+    """Ledger update for bytes written/deleted under path; no-op before init."""
+    if _space is not None:
+        _space.account(path, delta)
+
+
+async def account_staging_tree(path: Path, removing: bool = False) -> None:
+    """
+    Ledger update for a whole directory written (or about to be removed)
+    under path. Only walks the tree if it is inside the staging dir; the
+    walk runs in a worker thread, the ledger is updated on the loop. Files
+    hardlinked from elsewhere (the upload, the transcode cache) are
+    already counted there and are skipped.
+    """
+    space = _space
+    if space is not None and space._key(path) is not None:
+        size = await run_io(owned_bytes, path)
+        space.account(path, -size if removing else size)
+
+
+async def remeasure_staging(path: Path) -> None:
+    """
+    Re-measure the ledger entry (draft or top-level staging entry) holding
+    path after files under it were removed without being accounted. The
+    walk runs in a worker thread, the ledger is updated on the loop.
+    """
+    space = _space
+    key = space._key(path) if space is not None else None
+    if key is not None:
+        space.ledger[key] = await run_io(_key_bytes, space.staging_dir, key, space._scan_cache)
+
+
+def forget_staging(path: Path) -> None:
+    """Ledger update for a removed draft or staging entry; no-op before init."""
+    if _space is not None:
+        _space.forget(path)
+
+
+def owned_bytes(path: Path) -> int:
+    """
+    Bytes under a directory in files with no other hardlink. Files linked
+    from an upload or into the transcode cache are counted there instead.
+    """
+    fresh: dict[str, _DirScan] = {}
+    _entry_bytes(path, {}, fresh, set(), time.time())
+    return sum(scan.own_bytes for scan in fresh.values())
+
+
+def _key_bytes(staging_dir: Path, key: str, cache: dict[str, _DirScan]) -> int:
+    """One ledger key's total, measured the way scan_staging does."""
+    now = time.time()
+    seen: set[tuple[int, int]] = set()
+    if key != "cache":
+        _entry_bytes(staging_dir / "cache", cache, {}, seen, now)
+    return _entry_bytes(staging_dir / key, cache, {}, seen, now)
+
+
+async def remove_draft_dir(draft_dir: Path) -> None:
+    """
+    Delete a draft's directory and drop it from the staging ledger and the
+    expiry schedule. Only the rmtree runs in a worker thread: the ledger,
+    the draft store and the schedule are touched on the loop alone.
+    """
+    await run_io(shutil.rmtree, draft_dir)
+    forget_staging(draft_dir)
+    get_draft_store().forget(draft_dir)
+    if _expiry is not None:
+        _expiry.cancel(draft_dir.name)
+
+
+async def sweep_draft_assemblies(staging_dir: Path) -> int:
+    """
+    Discard the MFS trees failed album finalizes kept for their retry
+    once the draft itself is gone (deleted or expired). Returns how many.
+    """
+    drafts_dir = staging_dir / "drafts"
+    swept = 0
+    for name in await ipfs.list_assemblies():
+        if name.startswith("draft-") and not (drafts_dir / name.removeprefix("draft-")).exists():
+            await ipfs.discard_assembly(name)
+            swept += 1
+    return swept
+
+
+# A draft with no readable draft.json is removed this long after its mtime
+ORPHAN_DRAFT_HOURS = 24
+# A due draft that is still finalizing is looked at again after this long
+_FINALIZING_RETRY_SECONDS = 300
+
+
+class ExpiryScheduler:
+    """
+    Removes drafts at their expires_at, exactly when due.
+
+    A min-heap of (deadline, draft_id) is built once from the drafts dir,
+    then kept current by schedule() on draft creation and cancel() on
+    removal; run() sleeps until the earliest deadline (or an earlier one
+    is scheduled) and removes only the drafts that are due, in a worker
+    thread. Cancelled or rescheduled entries are skipped lazily when they
+    reach the top of the heap.
+    """
+
+    def __init__(self, staging_dir: Path):
+        self.staging_dir = staging_dir
+        self._heap: list[tuple[float, str]] = []
+        self._deadlines: dict[str, float] = {}  # draft_id -> current deadline
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, draft_id: str, expires_at: datetime) -> None:
+        deadline = expires_at.timestamp()
+        self._deadlines[draft_id] = deadline
+        heapq.heappush(self._heap, (deadline, draft_id))
+        if self._heap[0] == (deadline, draft_id):
+            self._wakeup.set()
+
+    def cancel(self, draft_id: str) -> None:
+        self._deadlines.pop(draft_id, None)
+
+    def next_deadline(self) -> Optional[float]:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)  # Stale entry
+        return self._heap[0][0] if self._heap else None
+
+    def load(self) -> int:
+        """Schedule every draft on disk. Returns the number scheduled."""
+        drafts_dir = self.staging_dir / "drafts"
+        if not drafts_dir.exists():
+            return 0
+        for draft_dir in drafts_dir.iterdir():
+            if not draft_dir.is_dir():
+                continue
+            expires_at = get_draft_expiry(draft_dir)
+            if expires_at is None:
+                try:
+                    mtime = draft_dir.stat().st_mtime
+                except OSError:
+                    continue
+                expires_at = datetime.fromtimestamp(mtime + ORPHAN_DRAFT_HOURS * 3600, tz=timezone.utc)
+            self._deadlines[draft_dir.name] = expires_at.timestamp()
+        self._heap = [(deadline, draft_id) for draft_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        return len(self._heap)
+
+    async def remove_due(self) -> int:
+        """Remove every draft whose deadline has passed. Returns the number removed."""
+        removed = 0
+        now = time.time()
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, draft_id = heapq.heappop(self._heap)
+            del self._deadlines[draft_id]
+            draft_dir = self.staging_dir / "drafts" / draft_id
+
+            if is_finalizing(draft_id):
+                self.schedule(draft_id, datetime.fromtimestamp(now + _FINALIZING_RETRY_SECONDS, tz=timezone.utc))
+                continue
+            # draft.json is the authority; it may have been replaced since scheduling
+            expires_at = get_draft_expiry(draft_dir)
+            if expires_at is not None and expires_at.timestamp() > now:
+                self.schedule(draft_id, expires_at)
+                continue
+            if not draft_dir.exists():
+                forget_staging(draft_dir)
+                continue
+
+            try:
+                await remove_draft_dir(draft_dir)
+                removed += 1
+                logger.info(f"Removed expired draft: {draft_id}")
+            except OSError as e:
+                logger.error(f"Failed to remove draft {draft_id}: {e}")
+        return removed
+
+    async def run(self) -> None:
+        """Sleep until the next deadline, remove what's due, repeat."""
+        while True:
+            try:
+                await self.remove_due()
+            except Exception as e:
+                logger.error(f"Error removing expired drafts: {e}")
+            self._wakeup.clear()
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Global expiry scheduler
+_expiry: Optional[ExpiryScheduler] = None
+_expiry_task: Optional[asyncio.Task] = None
+
+
+def get_expiry_scheduler() -> Optional[ExpiryScheduler]:
+    """Get the global draft expiry scheduler."""
+    return _expiry
+
+
+def init_expiry_scheduler(staging_dir: Path) -> ExpiryScheduler:
+    """Load every draft's deadline and start removing drafts as they expire."""
+    global _expiry, _expiry_task
+    _expiry = ExpiryScheduler(staging_dir)
+    count = _expiry.load()
+    _expiry_task = asyncio.create_task(_expiry.run())
+    logger.info(f"Draft expiry scheduler started ({count} drafts)")
+    return _expiry
+
+
+async def stop_expiry_scheduler() -> None:
+    """Stop the global draft expiry scheduler."""
+    global _expiry, _expiry_task
+    if _expiry_task is not None:
+        _expiry_task.cancel()
+        try:
+            await _expiry_task
+        except asyncio.CancelledError:
+            pass
+    _expiry = _expiry_task = None
+
+
+def schedule_draft_expiry(draft_id: str, expires_at: datetime) -> None:
+    """Register a new draft's deadline; no-op before init_expiry_scheduler."""
+    if _expiry is not None:
+        _expiry.schedule(draft_id, expires_at)
+
+
+async def admit_upload(nbytes: int) -> Reservation:
+    """Reserve staging space for an upload; a no-op before init_staging_space."""
+    space = get_staging_space()
+    if space is None:
+        return Reservation(None, 0)
+    return await space.admit(nbytes)
 
 
 async def periodic_cleanup(staging_dir: Path, interval_seconds: int = 3600):
     """
-    Async task that periodically cleans up expired drafts.
+    Async task that periodically prunes finalize logs, reconciles the
+    staging ledger, frees space if the budget is exceeded and drops the
+    kept MFS trees of drafts that are gone. Expired drafts are removed on
+    time by the ExpiryScheduler, not here.
 
     Args:
         staging_dir: Path to the staging directory
@@ -110,16 +680,23 @@ async def periodic_cleanup(staging_dir: Path, interval_seconds: int = 3600):
 
     while True:
         try:
-            checked, removed = cleanup_expired_drafts(staging_dir)
-            size_gb = get_staging_size_gb(staging_dir)
+            await run_io(cleanup_finalize_logs, staging_dir)
 
-            if removed > 0 or checked > 0:
-                logger.info(
-                    f"Cleanup complete: checked={checked}, removed={removed}, "
-                    f"staging_size={size_gb:.2f}GB"
-                )
-            else:
-                logger.debug(f"Cleanup: no drafts to check, staging_size={size_gb:.2f}GB")
+            space = get_staging_space()
+            if space is not None:
+                await space.reconcile()
+                headroom = await space.free_space(0)
+                if headroom is not None and headroom < 0:
+                    logger.warning(
+                        f"Staging over budget by {-headroom / 1024 ** 3:.2f}GB after eviction"
+                    )
+            await sweep_draft_assemblies(staging_dir)
+            size_gb = await get_staging_size_gb(staging_dir)
+            scheduler = get_expiry_scheduler()
+            logger.info(
+                f"Cleanup complete: drafts_scheduled={len(scheduler) if scheduler else 'n/a'}, "
+                f"staging_size={size_gb:.2f}GB"
+            )
 
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -127,16 +704,17 @@ async def periodic_cleanup(staging_dir: Path, interval_seconds: int = 3600):
         await asyncio.sleep(interval_seconds)
 
 
-def startup_cleanup(staging_dir: Path) -> None:
+async def startup_cleanup(staging_dir: Path) -> None:
     """
-    Run cleanup synchronously at startup.
+    Run cleanup once at startup.
 
     Clears any expired drafts that accumulated while service was down.
     """
     logger.info("Running startup cleanup...")
     try:
-        checked, removed = cleanup_expired_drafts(staging_dir)
-        size_gb = get_staging_size_gb(staging_dir)
+        checked, removed = await cleanup_expired_drafts(staging_dir)
+        await run_io(cleanup_finalize_logs, staging_dir)
+        size_gb = await get_staging_size_gb(staging_dir)
         logger.info(
             f"Startup cleanup complete: checked={checked}, removed={removed}, "
             f"staging_size={size_gb:.2f}GB"
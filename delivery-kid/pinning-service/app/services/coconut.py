@@ -4,56 +4,74 @@ Submits videos to Coconut for AV1+Opus HLS transcoding (royalty-free codecs),
 receives webhook on completion, downloads outputs, and pins to IPFS.
 """
 
-import json
+import asyncio
 import logging
+import random
+import re
 import shutil
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urljoin, urlparse
 
 import httpx
 
 from . import ipfs
+from .cleanup import account_staging, forget_staging
+from .events import get_event_hub, job_topic
+from .job_store import get_job_store
+from .workers import run_io
 
 logger = logging.getLogger(__name__)
 
 COCONUT_API_URL = "https://api.coconut.co/v2/jobs"
 
 
-def _jobs_dir(staging_dir: Path) -> Path:
-    d = staging_dir / "jobs"
-    d.mkdir(parents=True, exist_ok=True)
-    return d
+# Webhook bookkeeping: the raw Coconut payload (with output URLs) and the
+# delivery keys. Kept on the record, never returned or published.
+INTERNAL_JOB_FIELDS = ("pendingEvent", "webhookKeys", "relayedOutputs")
+
+
+def public_job(job: dict) -> dict:
+    """A job record as the API shows it, without INTERNAL_JOB_FIELDS."""
+    return {key: value for key, value in job.items() if key not in INTERNAL_JOB_FIELDS}
 
 
 def save_job(staging_dir: Path, job_id: str, data: dict) -> None:
-    path = _jobs_dir(staging_dir) / f"{job_id}.json"
-    path.write_text(json.dumps(data, indent=2, default=str))
+    get_job_store(staging_dir).save(job_id, data)
+    # Wake /job/{id}/events and /job/{id}/wait subscribers
+    get_event_hub().publish(job_topic(job_id), "job", public_job(data))
 
 
 def load_job(staging_dir: Path, job_id: str) -> Optional[dict]:
-    path = _jobs_dir(staging_dir) / f"{job_id}.json"
-    if not path.exists():
-        return None
-    try:
-        return json.loads(path.read_text())
-    except (json.JSONDecodeError, OSError):
-        return None
+    return get_job_store(staging_dir).load(job_id)
 
 
 def list_jobs(staging_dir: Path, limit: int = 50) -> list[dict]:
     """List recent jobs, newest first."""
-    jobs_path = _jobs_dir(staging_dir)
-    jobs = []
-    for f in sorted(jobs_path.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
-        try:
-            jobs.append(json.loads(f.read_text()))
-        except (json.JSONDecodeError, OSError):
-            continue
-        if len(jobs) >= limit:
-            break
+    jobs, _ = get_job_store(staging_dir).list_page(limit=limit)
     return jobs
 
 
+def list_jobs_page(
+    staging_dir: Path,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    identity: Optional[str] = None,
+    draft_id: Optional[str] = None,
+) -> tuple[list[dict], Optional[str]]:
+    """One page of jobs, newest first, plus the cursor for the next page (or None)."""
+    return get_job_store(staging_dir).list_page(
+        limit=limit, cursor=cursor, status=status, identity=identity, draft_id=draft_id
+    )
+
+
+def pending_webhook_job_ids(staging_dir: Path) -> list[str]:
+    """IDs of jobs with an accepted webhook event that hasn't been processed yet."""
+    return get_job_store(staging_dir).pending_ids()
+
+
 async def submit_to_coconut(
     source_url: str,
     api_key: str,
@@ -159,69 +177,341 @@ async def submit_to_coconut(
         return resp.json()
 
 
+@dataclass
+class DownloadStats:
+    downloaded: int = 0
+    skipped: int = 0  # Already on disk with the right size (resumed)
+    failed: int = 0
+    bytes: int = 0
+
+
+_DOWNLOAD_CHUNK_SIZE = 256 * 1024
+_RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def _playlist_media_uris(playlist_text: str) -> list[str]:
+    """Media URIs referenced by an HLS media playlist (segments + init maps), deduplicated."""
+    uris = []
+    for line in playlist_text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-MAP:"):
+            match = re.search(r'URI="([^"]+)"', line)
+            if match:
+                uris.append(match.group(1))
+        elif line and not line.startswith("#"):
+            uris.append(line)
+    # Byte-range playlists reference the same file many times
+    return list(dict.fromkeys(uris))
+
+
+def _local_media_path(output_dir: Path, uri: str) -> Optional[Path]:
+    """Where a playlist URI lands on disk, or None if it would escape output_dir."""
+    parsed = urlparse(uri)
+    rel = Path(parsed.path).name if parsed.scheme else parsed.path
+    if not rel or ".." in Path(rel).parts or rel.startswith("/"):
+        return None
+    return output_dir / rel
+
+
+class _SinkError(Exception):
+    """The consumer of a download failed (e.g. kubo rejected the add)."""
+
+
+async def _stream_with_retries(
+    client: httpx.AsyncClient,
+    url: str,
+    name: str,
+    consume: Callable[[httpx.Response], Awaitable[int]],
+    max_attempts: int = 4,
+) -> Optional[int]:
+    """
+    GET url and hand the streaming response to consume(), retrying transient
+    failures with jittered exponential backoff.
+
+    consume() reads the (decoded) body and returns the number of bytes it
+    saw. A transfer shorter than Content-Length (which counts the bytes on
+    the wire, before any Content-Encoding is undone) is a failed attempt.
+    Returns the byte count, or None once the file is given up on.
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            async with client.stream("GET", url) as resp:
+                if not resp.is_success:
+                    if resp.status_code in _RETRYABLE_STATUS and attempt < max_attempts:
+                        raise httpx.HTTPStatusError(
+                            f"HTTP {resp.status_code}", request=resp.request, response=resp
+                        )
+                    logger.warning("Failed to download %s: %s", name, resp.status_code)
+                    return None
+
+                expected = int(resp.headers.get("content-length", -1))
+                received = await consume(resp)
+                on_wire = resp.num_bytes_downloaded
+
+            if expected >= 0 and on_wire != expected:
+                raise httpx.ReadError(f"short read: {on_wire}/{expected} bytes")
+            return received
+
+        except (httpx.HTTPError, _SinkError) as e:
+            if attempt == max_attempts:
+                logger.warning("Error downloading %s after %d attempts: %s", name, attempt, e)
+                return None
+            await asyncio.sleep(0.5 * 2 ** (attempt - 1) * (0.5 + random.random()))
+    return None
+
+
+async def _download_file(
+    client: httpx.AsyncClient,
+    url: str,
+    path: Path,
+    semaphore: asyncio.Semaphore,
+    stats: DownloadStats,
+) -> None:
+    """Stream one file to disk with retries; skip it if already complete."""
+    async with semaphore:
+        if path.exists():
+            # Resume: keep files whose size matches what the server has
+            try:
+                head = await client.head(url)
+                if head.is_success and int(head.headers.get("content-length", -1)) == path.stat().st_size:
+                    stats.skipped += 1
+                    return
+            except (httpx.HTTPError, ValueError):
+                pass
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = path.with_name(path.name + ".part")
+
+        async def write_part(resp: httpx.Response) -> int:
+            written = 0
+            with open(part_path, "wb") as f:
+                async for chunk in resp.aiter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+            return written
+
+        written = await _stream_with_retries(client, url, path.name, write_part)
+        if written is None:
+            part_path.unlink(missing_ok=True)
+            stats.failed += 1
+            return
+        part_path.replace(path)
+        stats.downloaded += 1
+        stats.bytes += written
+
+
+async def _relay_file(
+    client: httpx.AsyncClient,
+    url: str,
+    rel_path: str,
+    semaphore: asyncio.Semaphore,
+    stats: DownloadStats,
+    added: dict[str, str],
+    pin: bool = False,
+    assembly: Optional[ipfs.DirectoryAssembly] = None,
+) -> Optional[str]:
+    """
+    Stream one file from url straight into kubo. Returns its CID.
+
+    With an assembly, the (unpinned) file is linked into it right away.
+    """
+    cid = None
+
+    async def add_to_ipfs(resp: httpx.Response) -> int:
+        nonlocal cid
+        received = 0
+
+        async def counted():
+            nonlocal received
+            async for chunk in resp.aiter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                received += len(chunk)
+                yield chunk
+
+        result = await ipfs.add_stream(counted(), rel_path.rsplit("/", 1)[-1], pin=pin)
+        if not result.success:
+            raise _SinkError(result.error)
+        cid = result.cid
+        return received
+
+    async with semaphore:
+        received = await _stream_with_retries(client, url, rel_path, add_to_ipfs)
+    if received is None:
+        stats.failed += 1
+        return None
+    if assembly is not None:
+        try:
+            await assembly.link(rel_path, cid)
+        except Exception as e:
+            logger.warning("Failed to link %s into the HLS directory: %s", rel_path, e)
+            stats.failed += 1
+            return None
+    added[rel_path] = cid
+    stats.downloaded += 1
+    stats.bytes += received
+    return cid
+
+
+def _hls_output_playlists(outputs: dict) -> list[tuple[str, str]]:
+    """(relative playlist path, URL) for each HLS output in a Coconut webhook."""
+    playlists = []
+    for key, output in outputs.items():
+        url = output.get("url")
+        if not url:
+            continue
+        if key == "hls_master":
+            playlists.append(("master.m3u8", url))
+        elif key.startswith("hls_av1_"):
+            quality = key.replace("hls_av1_", "").replace("p", "")
+            playlists.append((f"{quality}p/playlist.m3u8", url))
+    return playlists
+
+
+async def _fetch_playlists(
+    client: httpx.AsyncClient, outputs: dict
+) -> tuple[dict[str, str], list[tuple[str, str]]]:
+    """
+    Fetch all HLS playlists concurrently.
+
+    Returns ({relative path: playlist text}, [(segment URL, relative path)]).
+    """
+    texts: dict[str, str] = {}
+    segments: list[tuple[str, str]] = []
+
+    async def fetch(rel_path: str, url: str) -> None:
+        logger.info("Downloading %s from %s", rel_path, url)
+        resp = await client.get(url)
+        if not resp.is_success:
+            logger.warning("Failed to download %s: %s", rel_path, resp.status_code)
+            return
+        texts[rel_path] = resp.text
+
+        if rel_path != "master.m3u8":
+            rendition_dir = Path(rel_path).parent
+            for uri in _playlist_media_uris(resp.text):
+                path = _local_media_path(rendition_dir, uri)
+                if path is None:
+                    logger.warning("Skipping unsafe segment path %s", uri)
+                    continue
+                segments.append((urljoin(url, uri), path.as_posix()))
+
+    await asyncio.gather(*[fetch(rel_path, url) for rel_path, url in _hls_output_playlists(outputs)])
+    return texts, segments
+
+
+def _client_limits(concurrency: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+
 async def download_hls_outputs(
     outputs: dict,
     hls_dir: Path,
-) -> None:
+    concurrency: int = 8,
+) -> DownloadStats:
     """Download HLS playlists and segments from Coconut output URLs.
 
+    Playlists are fetched first; then every segment of every rendition
+    goes through one shared pool of at most `concurrency` parallel
+    streaming downloads, each retried with backoff. Segments already on
+    disk with the server's Content-Length are skipped, so a retried
+    webhook resumes instead of starting over.
+
     Args:
         outputs: Dict of output key -> {url: ...} from Coconut webhook
         hls_dir: Local directory to write files into
+        concurrency: Maximum parallel segment downloads
+
+    Returns:
+        DownloadStats with downloaded/skipped/failed counts
     """
     hls_dir.mkdir(parents=True, exist_ok=True)
+    stats = DownloadStats()
+    semaphore = asyncio.Semaphore(concurrency)
 
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        for key, output in outputs.items():
-            url = output.get("url")
-            if not url:
-                continue
-
-            if key == "hls_master":
-                local_path = hls_dir / "master.m3u8"
-            elif key.startswith("hls_av1_"):
-                quality = key.replace("hls_av1_", "").replace("p", "")
-                quality_dir = hls_dir / f"{quality}p"
-                quality_dir.mkdir(parents=True, exist_ok=True)
-                local_path = quality_dir / "playlist.m3u8"
-            else:
-                continue
-
-            # Download playlist
-            logger.info("Downloading %s from %s", key, url)
-            resp = await client.get(url)
-            if not resp.is_success:
-                logger.warning("Failed to download %s: %s", key, resp.status_code)
-                continue
-            local_path.write_text(resp.text)
-
-            # Download segments referenced in playlist
-            if local_path.name.endswith(".m3u8") and key != "hls_master":
-                await _download_segments(client, resp.text, url, local_path.parent)
-
-
-async def _download_segments(
-    client: httpx.AsyncClient,
-    playlist_text: str,
-    playlist_url: str,
-    output_dir: Path,
-) -> None:
-    """Download .ts/.m4s segments referenced in an HLS playlist."""
-    from urllib.parse import urljoin
+    async with httpx.AsyncClient(timeout=120.0, limits=_client_limits(concurrency)) as client:
+        playlists, segments = await _fetch_playlists(client, outputs)
+        for rel_path, text in playlists.items():
+            local_path = hls_dir / rel_path
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            local_path.write_text(text)
 
-    for line in playlist_text.splitlines():
-        line = line.strip()
-        if line.endswith(".ts") or line.endswith(".m4s"):
-            segment_url = urljoin(playlist_url, line)
-            segment_path = output_dir / line
-            try:
-                resp = await client.get(segment_url)
-                if resp.is_success:
-                    segment_path.write_bytes(resp.content)
-                else:
-                    logger.warning("Failed to download segment %s: %s", line, resp.status_code)
-            except Exception as e:
-                logger.warning("Error downloading segment %s: %s", line, e)
+        await asyncio.gather(*[
+            _download_file(client, url, hls_dir / rel_path, semaphore, stats)
+            for url, rel_path in segments
+        ])
+
+    logger.info(
+        "HLS download: %d downloaded (%.1f MB), %d resumed, %d failed",
+        stats.downloaded, stats.bytes / (1024 ** 2), stats.skipped, stats.failed
+    )
+    return stats
+
+
+async def relay_hls_outputs_to_ipfs(
+    outputs: dict,
+    concurrency: int = 8,
+    assembly: Optional[ipfs.DirectoryAssembly] = None,
+    relayed: Optional[dict[str, str]] = None,
+) -> tuple[dict[str, str], DownloadStats]:
+    """Stream HLS outputs from Coconut straight into kubo, unpinned.
+
+    Same fetch plan and retry behaviour as download_hls_outputs, but each
+    response body is piped into an IPFS add instead of a staging file.
+    Pass an assembly to link every file into it as soon as it is added
+    (then pin it with assembly.pin()); returns {relative path: CID}.
+    Files in `relayed` (already in the assembly from an earlier attempt)
+    are not fetched again and are returned as they are.
+    """
+    stats = DownloadStats()
+    added: dict[str, str] = dict(relayed or {})
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=120.0, limits=_client_limits(concurrency)) as client:
+        playlists, segments = await _fetch_playlists(client, outputs)
+
+        async def add_playlist(rel_path: str, text: str) -> None:
+            async def body():
+                yield text.encode()
+            result = await ipfs.add_stream(body(), rel_path.rsplit("/", 1)[-1], pin=False)
+            if not result.success:
+                logger.warning("Failed to add %s to IPFS: %s", rel_path, result.error)
+                stats.failed += 1
+                return
+            if assembly is not None:
+                try:
+                    await assembly.link(rel_path, result.cid)
+                except Exception as e:
+                    logger.warning("Failed to link %s into the HLS directory: %s", rel_path, e)
+                    stats.failed += 1
+                    return
+            added[rel_path] = result.cid
+
+        await asyncio.gather(
+            *[add_playlist(rel_path, text) for rel_path, text in playlists.items()
+              if rel_path not in added],
+            *[_relay_file(client, url, rel_path, semaphore, stats, added, assembly=assembly)
+              for url, rel_path in segments if rel_path not in added],
+        )
+
+    logger.info(
+        "HLS relay: %d files (%.1f MB) streamed into IPFS, %d failed",
+        stats.downloaded, stats.bytes / (1024 ** 2), stats.failed
+    )
+    return added, stats
+
+
+async def _pin_preview(client: httpx.AsyncClient, job: dict, preview_url: str) -> None:
+    """Stream the preview MP4 into IPFS (pinned) and record job["previewCid"]."""
+    job_id = job["id"]
+    stats = DownloadStats()
+    added: dict[str, str] = {}
+    cid = await _relay_file(
+        client, preview_url, "preview.mp4", asyncio.Semaphore(1), stats, added, pin=True
+    )
+    if cid:
+        job["previewCid"] = cid
+        logger.info("[%s] Preview pinned: %s (%d bytes)", job_id, cid, stats.bytes)
+    else:
+        logger.warning("[%s] Preview download/pin failed", job_id)
 
 
 async def process_completed_job(
@@ -230,48 +520,74 @@ async def process_completed_job(
     staging_dir: Path,
     ipfs_api_url: str,
     pinata_jwt: str = "",
+    download_concurrency: int = 8,
+    stream_to_ipfs: bool = True,
 ) -> Optional[str]:
-    """Process a completed Coconut job: download HLS + preview, pin to IPFS.
+    """Process a completed Coconut job: fetch HLS + preview, pin to IPFS.
+
+    With stream_to_ipfs (the default) every output is piped from Coconut
+    straight into kubo and the HLS directory is assembled from the
+    per-file CIDs; nothing is written to the staging volume. Otherwise
+    the HLS tree is downloaded to staging_dir/hls-<job_id> first and added
+    from disk; the directory is only removed once the job succeeds, so a
+    retry (or a re-run after a crash) resumes the partial download. Call
+    discard_job_download once the job is given up on.
 
     Returns the HLS directory CID, or None on failure.
     Also pins the preview MP4 if present and stores its CID in job["previewCid"].
+
+    Work a failed attempt finished is not repeated by the retry: a pinned
+    preview stays in job["previewCid"], and relayed HLS files are recorded
+    in job["relayedOutputs"] and kept linked in the job's assembly (named
+    after the job; see discard_job_download).
     """
     job_id = job["id"]
     hls_dir = staging_dir / f"hls-{job_id}"
+    assembly = None
+    succeeded = False
 
     try:
-        # Download all HLS outputs
-        await download_hls_outputs(outputs, hls_dir)
-
-        # Download preview MP4 if present
-        preview_output = outputs.get("mp4_preview", {})
-        preview_url = preview_output.get("url")
-        if preview_url:
-            preview_path = staging_dir / f"preview-{job_id}.mp4"
+        preview_url = outputs.get("mp4_preview", {}).get("url")
+        if preview_url and not job.get("previewCid"):
             try:
                 async with httpx.AsyncClient(timeout=120.0) as client:
-                    resp = await client.get(preview_url)
-                    if resp.is_success:
-                        preview_path.write_bytes(resp.content)
-                        logger.info("[%s] Preview MP4 downloaded (%d bytes)", job_id, len(resp.content))
-                        # Pin preview to IPFS
-                        preview_result = await ipfs.add_file(preview_path)
-                        if preview_result.success:
-                            job["previewCid"] = preview_result.cid
-                            logger.info("[%s] Preview pinned: %s", job_id, preview_result.cid)
-                        preview_path.unlink(missing_ok=True)
+                    await _pin_preview(client, job, preview_url)
             except Exception as e:
                 logger.warning("[%s] Preview download/pin failed: %s", job_id, e)
 
-        # Pin HLS to IPFS
-        logger.info("[%s] Pinning HLS directory to IPFS...", job_id)
-        result = await ipfs.add_directory(hls_dir)
+        if stream_to_ipfs:
+            assembly = ipfs.DirectoryAssembly(name=_assembly_name(job_id))
+            relayed = await assembly.resume(job.get("relayedOutputs") or {})
+            if relayed:
+                logger.info("[%s] Resuming: %d HLS files already relayed", job_id, len(relayed))
+            added, stats = await relay_hls_outputs_to_ipfs(
+                outputs, concurrency=download_concurrency, assembly=assembly, relayed=relayed
+            )
+            job["relayedOutputs"] = added
+            if stats.failed:
+                logger.error("[%s] %d HLS files could not be relayed to IPFS", job_id, stats.failed)
+                return None
+            if "master.m3u8" not in added:
+                logger.error("[%s] No HLS master playlist in outputs", job_id)
+                return None
+            logger.info("[%s] Pinning HLS directory of %d files...", job_id, len(added))
+            result = await assembly.pin()
+        else:
+            stats = await download_hls_outputs(outputs, hls_dir, concurrency=download_concurrency)
+            account_staging(hls_dir, stats.bytes)
+            if stats.failed:
+                logger.error("[%s] %d HLS files could not be downloaded", job_id, stats.failed)
+                return None
+            logger.info("[%s] Pinning HLS directory to IPFS...", job_id)
+            result = await ipfs.add_directory(hls_dir)
 
         if not result.success:
             logger.error("[%s] IPFS pin failed: %s", job_id, result.error)
             return None
 
         logger.info("[%s] HLS pinned: %s", job_id, result.cid)
+        succeeded = True
+        job.pop("relayedOutputs", None)
         return result.cid
 
     except Exception as e:
@@ -279,5 +595,27 @@ async def process_completed_job(
         return None
 
     finally:
-        # Clean up temp directory
-        shutil.rmtree(hls_dir, ignore_errors=True)
+        if assembly is not None:
+            # Kept after a failure, so a retry's relayed files stay out of GC
+            await assembly.close(keep=not succeeded)
+        # Pinned: the download (only exists when staging to disk) is done with
+        if succeeded:
+            await _discard_hls_dir(hls_dir)
+
+
+def _assembly_name(job_id: str) -> str:
+    return f"job-{job_id}"
+
+
+async def discard_job_download(staging_dir: Path, job_id: str) -> None:
+    """
+    Remove a job's staged HLS download and its kept IPFS assembly (both
+    kept between attempts for resuming).
+    """
+    await _discard_hls_dir(staging_dir / f"hls-{job_id}")
+    await ipfs.discard_assembly(_assembly_name(job_id))
+
+
+async def _discard_hls_dir(hls_dir: Path) -> None:
+    await run_io(shutil.rmtree, hls_dir, ignore_errors=True)
+    forget_staging(hls_dir)
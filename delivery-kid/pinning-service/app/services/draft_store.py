@@ -0,0 +1,146 @@
+"""Shared access to drafts' draft.json state.
+
+Every authenticated preview request, range request and SSE snapshot used
+to open and parse draft.json. DraftStore keeps the parsed contents in
+memory, keyed by path and validated against the file's (inode, mtime,
+size) on each read: a stat per request instead of a read and a parse,
+and any change on disk, by this process or another, is picked up.
+
+Writes go to a temporary file in the draft directory that is then
+renamed over draft.json, so a reader sees either the old state or the
+new one, never a truncated file. Each write replaces the inode, which
+also makes the cache key change even within one mtime tick.
+
+Read-modify-write sequences that await in between (or race with
+background tasks) go through update(), which holds a per-draft
+asyncio.Lock.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from .workers import run_io
+
+logger = logging.getLogger(__name__)
+
+DRAFT_FILE = "draft.json"
+_CACHE_MAX_ENTRIES = 1024
+
+
+class DraftStore:
+    """draft.json reads served from an mtime-validated cache; atomic writes."""
+
+    def __init__(self, max_entries: int = _CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # str(path) -> ((st_ino, st_mtime_ns, st_size), parsed contents)
+        self._cache: OrderedDict[str, tuple[tuple[int, int, int], dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()  # Cleanup reads from worker threads
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _remember(self, path: Path, key: tuple[int, int, int], data: dict) -> None:
+        with self._cache_lock:
+            self._cache[str(path)] = (key, data)
+            self._cache.move_to_end(str(path))
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _drop(self, path: Path) -> None:
+        with self._cache_lock:
+            self._cache.pop(str(path), None)
+
+    def read(self, draft_dir: Path) -> Optional[dict]:
+        """
+        Parsed draft.json (a copy the caller may modify), or None if it
+        doesn't exist or can't be parsed.
+        """
+        path = draft_dir / DRAFT_FILE
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._drop(path)
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+        cached = self._cache.get(str(path))
+        if cached is not None and cached[0] == key:
+            self.hits += 1
+            return copy.deepcopy(cached[1])
+
+        self.misses += 1
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.warning("Could not read %s: %s", path, e)
+            return None
+        if not isinstance(data, dict):
+            return None
+        self._remember(path, key, data)
+        return copy.deepcopy(data)
+
+    def write(self, draft_dir: Path, data: dict) -> None:
+        """Replace draft.json atomically (temp file + rename)."""
+        path = draft_dir / DRAFT_FILE
+        tmp_path = draft_dir / f".{DRAFT_FILE}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, indent=2, default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        st = os.stat(path)
+        # Cache what a fresh parse would give (default=str may have stringified values)
+        self._remember(path, (st.st_ino, st.st_mtime_ns, st.st_size), json.loads(json.dumps(data, default=str)))
+
+    def lock(self, draft_id: str) -> asyncio.Lock:
+        """The lock serializing read-modify-write of one draft's state."""
+        lock = self._locks.get(draft_id)
+        if lock is None:
+            lock = self._locks[draft_id] = asyncio.Lock()
+        return lock
+
+    async def update(self, draft_dir: Path, mutate: Callable[[dict], None]) -> Optional[dict]:
+        """
+        Apply mutate() to the current state and write it back, holding the
+        draft's lock. Returns the new state, or None if the draft is gone.
+        """
+        async with self.lock(draft_dir.name):
+            data = self.read(draft_dir)
+            if data is None:
+                return None
+            mutate(data)
+            try:
+                await run_io(self.write, draft_dir, data)
+            except FileNotFoundError:
+                return None  # Draft removed meanwhile
+            return data
+
+    def forget(self, draft_dir: Path) -> None:
+        """Drop a removed draft's cache entry and lock."""
+        self._drop(draft_dir / DRAFT_FILE)
+        lock = self._locks.get(draft_dir.name)
+        if lock is not None and not lock.locked():
+            del self._locks[draft_dir.name]
+
+    def status(self) -> dict:
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+# Global store instance
+_store = DraftStore()
+
+
+def get_draft_store() -> DraftStore:
+    """Get the global draft store."""
+    return _store
@@ -0,0 +1,145 @@
+"""In-process pub/sub for job and draft state changes.
+
+Publishers (job saves, the Coconut webhook's draft preview update, the
+finalize generators) call publish() on a topic such as "job:<id>" or
+"draft:<id>"; SSE and long-poll endpoints subscribe and wake the moment
+something changes instead of the frontend re-reading state on a timer.
+
+Each topic keeps a version counter and its latest message, so a
+long-poll client passes back the version it last saw and returns
+immediately if it already missed an update. Versions are per process
+and restart from zero, so clients should treat any different version
+as "changed", not compare for greater-than.
+
+publish() is synchronous and must be called on the event loop thread.
+"""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Latest message kept for this many topics (least recently published dropped first)
+_MAX_TOPICS = 4096
+# Per-subscriber backlog; a slow consumer loses the oldest messages first
+_SUBSCRIBER_QUEUE_SIZE = 64
+
+
+def job_topic(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def draft_topic(draft_id: str) -> str:
+    return f"draft:{draft_id}"
+
+
+class EventHub:
+    """Topic-based fan-out of small JSON-able messages to asyncio subscribers."""
+
+    def __init__(self, max_topics: int = _MAX_TOPICS):
+        self.max_topics = max_topics
+        self._latest: OrderedDict[str, tuple[int, dict]] = OrderedDict()
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    def latest(self, topic: str) -> tuple[int, Optional[dict]]:
+        """Current (version, message) for a topic; (0, None) if never published."""
+        return self._latest.get(topic, (0, None))
+
+    def publish(self, topic: str, event: str, data: dict) -> int:
+        """Publish {"event": event, "data": data} on a topic. Returns the new version."""
+        version = self._latest.get(topic, (0, None))[0] + 1
+        message = {"event": event, "data": data, "version": version}
+
+        self._latest[topic] = (version, message)
+        self._latest.move_to_end(topic)
+        while len(self._latest) > self.max_topics:
+            self._latest.popitem(last=False)
+
+        for queue in self._subscribers.get(topic, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+        return version
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[asyncio.Queue]:
+        """Receive every message published on a topic while the block is open."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(topic, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    async def wait_for_change(
+        self, topic: str, since: Optional[int], timeout: float
+    ) -> tuple[int, Optional[dict]]:
+        """
+        Long-poll: return (version, message) as soon as the topic's version
+        differs from `since`, or the unchanged state after `timeout` seconds.
+        """
+        with self.subscribe(topic) as queue:
+            version, message = self.latest(topic)
+            if since is None or version != since:
+                return version, message
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return version, message
+            return message["version"], message
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._subscribers.get(topic, ()))
+
+
+async def stream_topic(
+    topic: str,
+    snapshot: Callable[[], Optional[tuple[str, dict]]],
+    is_final: Callable[[str, dict], bool] = lambda event, data: False,
+) -> AsyncIterator[dict]:
+    """
+    SSE generator for a topic: the current state first, then every change.
+
+    snapshot() returns the (event, data) describing the current state, read
+    after subscribing so nothing published in between is missed. The stream
+    ends after a message for which is_final(event, data) is true, or when
+    the client disconnects.
+    """
+    hub = get_event_hub()
+    with hub.subscribe(topic) as queue:
+        version, _ = hub.latest(topic)
+        initial = snapshot()
+        if initial is not None:
+            event, data = initial
+            yield {"event": event, "data": json.dumps(data, default=str), "id": str(version)}
+            if is_final(event, data):
+                return
+        while True:
+            message = await queue.get()
+            yield {
+                "event": message["event"],
+                "data": json.dumps(message["data"], default=str),
+                "id": str(message["version"]),
+            }
+            if is_final(message["event"], message["data"]):
+                return
+
+
+# Global hub instance
+_hub: Optional[EventHub] = None
+
+
+def get_event_hub() -> EventHub:
+    """Get the global event hub, creating it on first use."""
+    global _hub
+    if _hub is None:
+        _hub = EventHub()
+    return _hub
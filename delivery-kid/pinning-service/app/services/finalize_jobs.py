@@ -0,0 +1,243 @@
+"""Detached finalize jobs with a persisted, replayable event log.
+
+A finalize runs as a background task, not inside the SSE response, so a
+browser disconnect no longer cancels (or orphans) a half-done transcode.
+Every event the finalize generator produces is numbered, kept in memory
+for live tailers and appended to {staging_dir}/finalize/{draft_id}.jsonl:
+
+    {"identity": ..., "started_at": ...}          header
+    {"id": 1, "event": "progress", "data": {...}}  one line per event
+    {"end": true}                                  written when the job exits
+
+SSE endpoints tail a job from any event id (Last-Event-ID), and a second
+finalize request for a draft that is already finalizing attaches to the
+running job instead of starting another. Logs of finished jobs outlive
+the draft directory, so a client that reconnects after completion still
+gets the result; cleanup removes them after FINALIZE_LOG_TTL_HOURS.
+
+Log lines are buffered and written by the io pool, never on the loop. At
+shutdown stop_finalize_jobs() cancels the running jobs, each of which
+records an "error" event and its end before the process exits.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from .workers import run_io
+
+logger = logging.getLogger(__name__)
+
+FINALIZE_LOG_TTL_HOURS = 24
+
+
+def finalize_log_dir(staging_dir: Path) -> Path:
+    return staging_dir / "finalize"
+
+
+def _log_path(staging_dir: Path, draft_id: str) -> Path:
+    return finalize_log_dir(staging_dir) / f"{draft_id}.jsonl"
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Last-Event-ID header value -> last event id seen (0 if absent/garbage)."""
+    try:
+        return max(0, int(value)) if value else 0
+    except ValueError:
+        return 0
+
+
+class FinalizeJob:
+    """One draft's finalize: its event history and (while running) its task."""
+
+    def __init__(self, draft_id: str, identity: str, log_path: Optional[Path] = None):
+        self.draft_id = draft_id
+        self.identity = identity
+        self.log_path = log_path
+        self.events: list[dict] = []  # {"id", "event", "data"}
+        self.done = False
+        self.interrupted = False  # Loaded from a log the process never finished
+        self._changed = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+        self._unwritten: list[dict] = []  # Log records not yet on disk
+        self._writer: Optional[asyncio.Task] = None
+        self._log_started = False
+
+    @property
+    def running(self) -> bool:
+        return not self.done
+
+    @property
+    def completed(self) -> bool:
+        """Finished with a "complete" event (the draft has been pinned and removed)."""
+        return any(e["event"] == "complete" for e in self.events)
+
+    def _write_lines(self, records: list[dict], truncate: bool) -> None:
+        """Blocking: append (or, for the header, start) the log file."""
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "w" if truncate else "a") as f:
+                f.writelines(json.dumps(record, default=str) + "\n" for record in records)
+        except OSError as e:
+            logger.warning("[finalize:%s] Could not write event log: %s", self.draft_id[:8], e)
+
+    def _write(self, record: dict) -> None:
+        """Queue a log record; one writer task at a time drains the queue in order."""
+        if self.log_path is None:
+            return
+        self._unwritten.append(record)
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while self._unwritten:
+            records, self._unwritten = self._unwritten, []
+            truncate, self._log_started = not self._log_started, True
+            await run_io(self._write_lines, records, truncate)
+
+    async def _append(self, event: str, data: dict) -> None:
+        record = {"id": len(self.events) + 1, "event": event, "data": data}
+        self.events.append(record)
+        self._write(record)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _run(self, source: AsyncIterator[dict]) -> None:
+        try:
+            async for message in source:
+                await self._append(message["event"], json.loads(message["data"]))
+        except asyncio.CancelledError:
+            logger.warning("[finalize:%s] Interrupted by shutdown", self.draft_id[:8])
+            await self._append("error", {
+                "message": "Finalize was interrupted by a service shutdown; start it again"
+            })
+            raise
+        except Exception as e:
+            logger.error("[finalize:%s] Job crashed: %s", self.draft_id[:8], e)
+            await self._append("error", {"message": str(e)})
+        finally:
+            self._write({"end": True})
+            if self._writer is not None:
+                await self._writer  # A reload must find the whole log
+            self.done = True
+            if _running.get(self.draft_id) is self:
+                del _running[self.draft_id]
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def tail(self, after_id: int = 0) -> AsyncIterator[dict]:
+        """SSE messages for events after `after_id`, following the job until it ends."""
+        next_index = after_id
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.events) > next_index or self.done)
+            while next_index < len(self.events):
+                record = self.events[next_index]
+                next_index += 1
+                yield {
+                    "event": record["event"],
+                    "data": json.dumps(record["data"], default=str),
+                    "id": str(record["id"]),
+                }
+            if self.done and next_index >= len(self.events):
+                break
+
+        if self.interrupted and not any(e["event"] in ("complete", "error") for e in self.events):
+            yield {
+                "event": "error",
+                "data": json.dumps({"message": "Finalize was interrupted by a service restart; start it again"}),
+            }
+
+
+# draft_id -> job, for finalizes running in this process
+_running: dict[str, FinalizeJob] = {}
+
+
+def _load_log(staging_dir: Path, draft_id: str) -> Optional[FinalizeJob]:
+    path = _log_path(staging_dir, draft_id)
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return None
+
+    job = None
+    finished = False
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # Torn last line from a crash
+        if "identity" in record and job is None:
+            job = FinalizeJob(draft_id, record["identity"])
+        elif record.get("end"):
+            finished = True
+        elif job is not None and "event" in record:
+            job.events.append(record)
+
+    if job is None:
+        return None
+    job.done = True
+    job.interrupted = not finished
+    return job
+
+
+def is_finalizing(draft_id: str) -> bool:
+    return draft_id in _running
+
+
+def find_finalize_job(staging_dir: Path, draft_id: str) -> Optional[FinalizeJob]:
+    """The running finalize for a draft, else the last one recorded on disk, else None."""
+    return _running.get(draft_id) or _load_log(staging_dir, draft_id)
+
+
+def start_finalize_job(
+    staging_dir: Path,
+    draft_id: str,
+    identity: str,
+    source: AsyncIterator[dict],
+) -> FinalizeJob:
+    """
+    Run a finalize generator (yielding {"event", "data": json}) as a detached job.
+
+    Replaces any previous log for the draft. Callers should check
+    find_finalize_job first so a running job is attached to, not duplicated.
+    """
+    job = FinalizeJob(draft_id, identity, _log_path(staging_dir, draft_id))
+    job._write({
+        "identity": identity,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+    })
+    _running[draft_id] = job
+    job._task = asyncio.create_task(job._run(source))
+    return job
+
+
+async def stop_finalize_jobs() -> None:
+    """Cancel the running finalizes and wait until each has logged its interruption."""
+    tasks = [job._task for job in _running.values() if job._task is not None]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def cleanup_finalize_logs(staging_dir: Path, max_age_hours: float = FINALIZE_LOG_TTL_HOURS) -> int:
+    """Remove event logs of finished jobs older than max_age_hours. Returns count removed."""
+    log_dir = finalize_log_dir(staging_dir)
+    if not log_dir.exists():
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for path in log_dir.glob("*.jsonl"):
+        if path.stem in _running:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,127 @@
+"""Pipelined HLS pinning — add segments to IPFS while ffmpeg is still encoding.
+
+ffmpeg's HLS muxer writes segments in order and only opens segment N+1
+after it has closed segment N (VOD playlists aren't written until the
+encode finishes, so they can't be used as the signal). SegmentPinner
+watches the output directory, adds every closed segment to kubo unpinned
+and links it into a scratch MFS tree straight away (so GC can't collect it
+mid-encode), and at the end pins that tree — only the playlists and
+directory nodes are left to do once the encode is done.
+"""
+
+import asyncio
+import logging
+import re
+from pathlib import Path
+from typing import Optional
+
+from . import ipfs
+
+logger = logging.getLogger(__name__)
+
+# Numbered media segments written by build_hls_command (ts and fmp4 layouts)
+_SEGMENT_RE = re.compile(r"^segment_(\d+)\.(ts|m4s)$")
+
+
+def closed_files(hls_dir: Path) -> list[Path]:
+    """
+    List media files in an HLS output tree that ffmpeg has finished writing.
+
+    Per rendition directory, every numbered segment except the newest is
+    closed, and an fMP4 init section is closed once the first segment is.
+    Single-file (byte-range) output and playlists are never reported
+    here — they are only complete once the encode exits.
+    """
+    closed = []
+    for rendition_dir in sorted(p for p in hls_dir.iterdir() if p.is_dir()):
+        segments = []
+        for path in rendition_dir.iterdir():
+            match = _SEGMENT_RE.match(path.name)
+            if match:
+                segments.append((int(match.group(1)), path))
+        if len(segments) < 2:
+            continue
+        segments.sort()
+        closed.extend(path for _, path in segments[:-1])
+        init = rendition_dir / "init.mp4"
+        if init.exists():
+            closed.append(init)
+    return closed
+
+
+class SegmentPinner:
+    """
+    Adds closed HLS segments to kubo as they appear, then builds the directory.
+
+    Call close() when done (whether or not finish() succeeded) to drop the
+    scratch MFS tree.
+    """
+
+    def __init__(self, hls_dir: Path, poll_interval: float = 1.0):
+        self.hls_dir = hls_dir
+        self.poll_interval = poll_interval
+        self.added: dict[str, str] = {}  # relative path -> CID
+        self.error: Optional[str] = None
+        self.assembly = ipfs.DirectoryAssembly()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def added_count(self) -> int:
+        return len(self.added)
+
+    async def _add(self, path: Path) -> bool:
+        rel_path = path.relative_to(self.hls_dir).as_posix()
+        if rel_path in self.added:
+            return True
+        result = await ipfs.add_file(path, pin=False)
+        if not result.success:
+            self.error = f"{rel_path}: {result.error}"
+            return False
+        try:
+            await self.assembly.link(rel_path, result.cid)
+        except Exception as e:
+            self.error = f"{rel_path}: {e}"
+            return False
+        self.added[rel_path] = result.cid
+        return True
+
+    async def _watch(self) -> None:
+        while self.error is None:
+            if self.hls_dir.exists():
+                for path in closed_files(self.hls_dir):
+                    if not await self._add(path):
+                        logger.warning("Pipelined add stopped: %s", self.error)
+                        return
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        """Start watching the output directory in the background."""
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Stop watching (call once the encoder has exited)."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def finish(self) -> ipfs.PinResult:
+        """
+        Add whatever is left (last segments, playlists, metadata) and pin
+        the assembled directory. Call after stop().
+        """
+        if self.error is not None:
+            return ipfs.PinResult(success=False, error=self.error)
+
+        for path in sorted(self.hls_dir.rglob("*")):
+            if path.is_file() and not await self._add(path):
+                return ipfs.PinResult(success=False, error=self.error)
+
+        return await self.assembly.pin()
+
+    async def close(self) -> None:
+        """Drop the scratch MFS tree (a successful pin keeps the blocks)."""
+        await self.assembly.close()
@@ -1,12 +1,29 @@
 """IPFS pinning service - local kubo + Pinata backup."""
 
+import asyncio
+import json
+import uuid
+
 import httpx
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional
 from dataclasses import dataclass
 
 from ..config import get_settings
 
+# Called after this process adds or removes a local pin (see pin_index)
+_pin_listeners: list[Callable[[], None]] = []
+
+
+def on_pins_changed(listener: Callable[[], None]) -> None:
+    """Register a callback for changes to the local pin set made through this module."""
+    _pin_listeners.append(listener)
+
+
+def _pins_changed() -> None:
+    for listener in _pin_listeners:
+        listener()
+
 
 @dataclass
 class PinResult:
@@ -57,12 +74,12 @@ async def add_directory(directory_path: Path) -> PinResult:
 
             # Response is newline-delimited JSON, last line is the directory
             lines = response.text.strip().split("\n")
-            import json
             last_entry = json.loads(lines[-1])
             cid = last_entry.get("Hash")
 
             if not cid:
                 return PinResult(success=False, error="No CID in IPFS response")
+            _pins_changed()
 
             # Pin to Pinata as backup
             pinata_success = False
@@ -83,8 +100,14 @@ async def add_directory(directory_path: Path) -> PinResult:
             f.close()
 
 
-async def add_file(file_path: Path) -> PinResult:
-    """Add a single file to IPFS and pin it."""
+async def add_file(file_path: Path, pin: bool = True) -> PinResult:
+    """
+    Add a single file to IPFS.
+
+    With pin=False the blocks are only written to the local repo (no pin,
+    no Pinata backup) — used when the file will be pinned later as part
+    of a directory assembled with a DirectoryAssembly.
+    """
     settings = get_settings()
 
     try:
@@ -93,7 +116,7 @@ async def add_file(file_path: Path) -> PinResult:
                 response = await client.post(
                     f"{settings.ipfs_api_url}/api/v0/add",
                     files={"file": (file_path.name, f)},
-                    params={"pin": "true"}
+                    params={"pin": "true" if pin else "false"}
                 )
 
             if response.status_code != 200:
@@ -102,16 +125,17 @@ async def add_file(file_path: Path) -> PinResult:
                     error=f"IPFS add failed: {response.status_code}"
                 )
 
-            import json
             data = json.loads(response.text)
             cid = data.get("Hash")
 
             if not cid:
                 return PinResult(success=False, error="No CID in response")
+            if pin:
+                _pins_changed()
 
             # Pin to Pinata as backup
             pinata_success = False
-            if settings.pinata_jwt:
+            if pin and settings.pinata_jwt:
                 pinata_success = await pin_to_pinata(cid)
 
             return PinResult(
@@ -124,6 +148,234 @@ async def add_file(file_path: Path) -> PinResult:
         return PinResult(success=False, error=f"IPFS error: {e}")
 
 
+async def add_stream(chunks: AsyncIterator[bytes], filename: str, pin: bool = True) -> PinResult:
+    """
+    Add a file to IPFS from an async byte stream, without touching disk.
+
+    The multipart body is generated on the fly and sent chunked, so the
+    data goes straight from `chunks` (e.g. an HTTP download) into kubo.
+    pin=False behaves as in add_file.
+    """
+    settings = get_settings()
+    boundary = uuid.uuid4().hex
+    safe_name = filename.replace('"', "").replace("\r", "").replace("\n", "")
+
+    async def body():
+        yield (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{safe_name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        async for chunk in chunks:
+            yield chunk
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    try:
+        async with httpx.AsyncClient(timeout=300.0) as client:
+            response = await client.post(
+                f"{settings.ipfs_api_url}/api/v0/add",
+                content=body(),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                params={"pin": "true" if pin else "false"}
+            )
+
+            if response.status_code != 200:
+                return PinResult(
+                    success=False,
+                    error=f"IPFS add failed: {response.status_code}"
+                )
+
+            cid = json.loads(response.text).get("Hash")
+            if not cid:
+                return PinResult(success=False, error="No CID in response")
+            if pin:
+                _pins_changed()
+
+            pinata_success = False
+            if pin and settings.pinata_jwt:
+                pinata_success = await pin_to_pinata(cid)
+
+            return PinResult(success=True, cid=cid, pinata_success=pinata_success)
+
+    except Exception as e:
+        return PinResult(success=False, error=f"IPFS error: {e}")
+
+
+class DirectoryAssembly:
+    """
+    A directory built in a scratch MFS path from already-added files.
+
+    Files added with pin=False are fair game for kubo's GC until something
+    references them. An MFS entry does, so link() copies each file under
+    the scratch root as soon as it has a CID; callers that add files over
+    minutes (SegmentPinner during an encode, the Coconut relay) should link
+    right after each add rather than collect CIDs and assemble at the end.
+    Copies run concurrently, bounded by `concurrency`. pin() pins the
+    finished tree; close() drops the scratch entry (the pin keeps the
+    blocks). Use as an async context manager.
+
+    A retryable job passes a stable `name` and closes with keep=True after
+    a failure: the tree (and so every file already linked) outlives the
+    attempt, and the retry's resume() tells which recorded files it still
+    holds. discard_assembly(name) drops it once the job is given up on.
+    """
+
+    def __init__(self, concurrency: int = 16, name: Optional[str] = None):
+        self.name = name
+        self.root = _assembly_root(name or uuid.uuid4().hex)
+        self.entries: dict[str, str] = {}  # relative path -> CID
+        self._api = f"{get_settings().ipfs_api_url}/api/v0"
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._dirs: dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "DirectoryAssembly":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _call(self, endpoint: str, params) -> httpx.Response:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=300.0)
+        response = await self._client.post(f"{self._api}/{endpoint}", params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"{endpoint} failed: {response.status_code} {response.text[:200]}")
+        return response
+
+    async def _mkdir(self, path: str) -> None:
+        # One files/mkdir per directory, shared by every link into it
+        task = self._dirs.get(path)
+        if task is None:
+            task = asyncio.ensure_future(self._call("files/mkdir", {"arg": path, "parents": "true"}))
+            self._dirs[path] = task
+        await task
+
+    async def link(self, rel_path: str, cid: str) -> None:
+        """Copy an added file into the tree at rel_path. Raises on failure."""
+        dest = f"{self.root}/{rel_path}"
+        async with self._semaphore:
+            await self._mkdir(dest.rsplit("/", 1)[0])
+            try:
+                await self._call("files/cp", [("arg", f"/ipfs/{cid}"), ("arg", dest)])
+            except RuntimeError:
+                if self.name is None:
+                    raise
+                # A kept tree may hold an entry an earlier attempt linked but never recorded
+                await self._call("files/rm", {"arg": dest, "force": "true"})
+                await self._call("files/cp", [("arg", f"/ipfs/{cid}"), ("arg", dest)])
+        self.entries[rel_path] = cid
+
+    async def resume(self, entries: dict[str, str]) -> dict[str, str]:
+        """
+        Of the files an earlier attempt linked into this (kept) tree, those
+        it still holds with the same CID; they count as linked. The rest,
+        or everything if the tree is gone, must be added and linked again:
+        their blocks may have been garbage collected.
+        """
+        async def held(rel_path: str, cid: str) -> bool:
+            async with self._semaphore:
+                try:
+                    stat = await self._call("files/stat", {"arg": f"{self.root}/{rel_path}", "hash": "true"})
+                except (RuntimeError, httpx.HTTPError):
+                    return False
+            return json.loads(stat.text).get("Hash") == cid
+
+        if not entries:
+            return {}
+        checks = await asyncio.gather(*(held(rel_path, cid) for rel_path, cid in entries.items()))
+        kept = {rel_path: cid for (rel_path, cid), ok in zip(entries.items(), checks) if ok}
+        self.entries.update(kept)
+        return kept
+
+    async def link_all(self, entries: dict[str, str]) -> None:
+        """Link many files at once. Raises the first failure, after all copies settle."""
+        results = await asyncio.gather(
+            *(self.link(rel_path, cid) for rel_path, cid in entries.items()),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def pin(self) -> PinResult:
+        """Pin the tree linked so far (and back it up to Pinata). Returns the root CID."""
+        settings = get_settings()
+
+        if not self.entries:
+            return PinResult(success=False, error="No files in directory")
+
+        try:
+            stat = await self._call("files/stat", {"arg": self.root, "hash": "true"})
+            cid = json.loads(stat.text).get("Hash")
+            if not cid:
+                return PinResult(success=False, error="No CID in files/stat response")
+
+            await self._call("pin/add", {"arg": cid})
+            _pins_changed()
+        except Exception as e:
+            return PinResult(success=False, error=f"IPFS error: {e}")
+
+        # Pin to Pinata as backup
+        pinata_success = False
+        if settings.pinata_jwt:
+            pinata_success = await pin_to_pinata(cid)
+
+        return PinResult(success=True, cid=cid, pinata_success=pinata_success)
+
+    async def close(self, keep: bool = False) -> None:
+        """Remove the scratch MFS entry, unless keep (for a named tree a retry will resume)."""
+        if self._client is None:
+            return
+        if not keep:
+            try:
+                await self._client.post(
+                    f"{self._api}/files/rm",
+                    params={"arg": self.root, "recursive": "true", "force": "true"}
+                )
+            except httpx.HTTPError:
+                pass
+        await self._client.aclose()
+        self._client = None
+
+
+_ASSEMBLY_DIR = "/delivery-kid"
+_ASSEMBLY_PREFIX = "assemble-"
+
+
+def _assembly_root(name: str) -> str:
+    return f"{_ASSEMBLY_DIR}/{_ASSEMBLY_PREFIX}{name}"
+
+
+async def discard_assembly(name: str) -> None:
+    """Drop a kept DirectoryAssembly tree (best effort), releasing its unpinned files to GC."""
+    settings = get_settings()
+    try:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            await client.post(
+                f"{settings.ipfs_api_url}/api/v0/files/rm",
+                params={"arg": _assembly_root(name), "recursive": "true", "force": "true"}
+            )
+    except httpx.HTTPError:
+        pass
+
+
+async def list_assemblies() -> list[str]:
+    """Names of the DirectoryAssembly trees currently in MFS (kept or in use)."""
+    settings = get_settings()
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        response = await client.post(
+            f"{settings.ipfs_api_url}/api/v0/files/ls", params={"arg": _ASSEMBLY_DIR}
+        )
+    if response.status_code != 200:
+        return []  # Nothing assembled yet
+    return [
+        entry["Name"].removeprefix(_ASSEMBLY_PREFIX)
+        for entry in json.loads(response.text).get("Entries") or []
+        if entry.get("Name", "").startswith(_ASSEMBLY_PREFIX)
+    ]
+
+
 async def pin_to_pinata(cid: str) -> bool:
     """Pin an existing CID to Pinata for redundancy."""
     settings = get_settings()
@@ -146,24 +398,38 @@ async def pin_to_pinata(cid: str) -> bool:
         return False
 
 
-async def get_local_pins() -> list[str]:
-    """Get list of all locally pinned CIDs."""
-    settings = get_settings()
+async def iter_local_pins() -> AsyncIterator[str]:
+    """
+    Yield every recursively pinned CID, streamed from kubo.
 
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{settings.ipfs_api_url}/api/v0/pin/ls",
-                params={"type": "recursive"}
-            )
+    Uses pin/ls --stream: kubo writes one {"Cid", "Type"} object per line
+    as it walks the pinset instead of building one {"Keys": {...}}
+    document, so neither side holds the whole listing. Raises on failure.
+    """
+    settings = get_settings()
 
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async with client.stream(
+            "POST",
+            f"{settings.ipfs_api_url}/api/v0/pin/ls",
+            params={"type": "recursive", "stream": "true"},
+        ) as response:
             if response.status_code != 200:
-                return []
+                raise RuntimeError(f"pin/ls failed: {response.status_code}")
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if "Cid" in entry:
+                    yield entry["Cid"]
+                elif entry.get("Type") == "error":
+                    raise RuntimeError(f"pin/ls failed: {entry.get('Message')}")
 
-            import json
-            data = json.loads(response.text)
-            return list(data.get("Keys", {}).keys())
 
+async def get_local_pins() -> list[str]:
+    """Get list of all locally pinned CIDs."""
+    try:
+        return [cid async for cid in iter_local_pins()]
     except Exception:
         return []
 
@@ -194,6 +460,7 @@ async def unpin(cid: str) -> UnpinResult:
             )
             if response.status_code == 200:
                 local_unpinned = True
+                _pins_changed()
             else:
                 errors.append(f"Local unpin failed: {response.status_code} {response.text[:100]}")
     except Exception as e:
@@ -0,0 +1,195 @@
+"""Indexed transcoding job store — SQLite (WAL) under the staging dir.
+
+Jobs stay schemaless JSON documents (camelCase, as the frontend polls
+them); the columns alongside are only there to index and filter on.
+Listing is newest-first by createdAt with keyset (cursor) pagination, so
+a page costs the same however much history has accumulated.
+
+On first open, jobs from the old one-file-per-job layout
+({staging_dir}/jobs/*.json) are imported once and that directory is
+renamed to jobs-migrated/.
+"""
+
+import base64
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    identity TEXT,
+    created_at TEXT NOT NULL,
+    draft_id TEXT,
+    pending INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS jobs_identity ON jobs (identity, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS jobs_draft ON jobs (draft_id);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (pending) WHERE pending = 1;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def encode_cursor(created_at: str, job_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, job_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return str(created_at), str(job_id)
+
+
+class JobStore:
+    """Job documents in SQLite with status/identity/createdAt/draftId indexes."""
+
+    def __init__(self, staging_dir: Path):
+        self.staging_dir = staging_dir
+        self.db_path = staging_dir / "jobs.db"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_json()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row_values(job_id: str, data: dict, created_at: Optional[str] = None) -> tuple:
+        created_at = data.get("createdAt") or created_at or datetime.now(timezone.utc).isoformat()
+        return (
+            job_id,
+            data.get("status"),
+            data.get("identity"),
+            created_at,
+            data.get("draftId"),
+            1 if data.get("pendingEvent") else 0,
+            json.dumps(data, default=str),
+        )
+
+    def save(self, job_id: str, data: dict) -> None:
+        """Insert or replace a job. createdAt is kept from the first save if absent."""
+        with self._lock:
+            row = self._conn.execute("SELECT created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            values = self._row_values(job_id, data, row["created_at"] if row else None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, identity, created_at, draft_id, pending, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                values,
+            )
+
+    def load(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def list_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        identity: Optional[str] = None,
+        draft_id: Optional[str] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        One page of jobs, newest first.
+
+        Returns (jobs, next_cursor); next_cursor is None on the last page.
+        Raises ValueError for a malformed cursor.
+        """
+        clauses, params = [], []
+        for column, value in (("status", status), ("identity", identity), ("draft_id", draft_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if cursor:
+            created_at, job_id = decode_cursor(cursor)
+            clauses.append("(created_at, id) < (?, ?)")
+            params += [created_at, job_id]
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, created_at, data FROM jobs {where} "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return [json.loads(row["data"]) for row in rows], next_cursor
+
+    def pending_ids(self) -> list[str]:
+        """IDs of jobs with an accepted webhook event not yet processed."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs WHERE pending = 1").fetchall()
+        return [row["id"] for row in rows]
+
+    def _migrate_json(self) -> None:
+        """Import the legacy jobs/*.json files once."""
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone()
+        legacy_dir = self.staging_dir / "jobs"
+        if done or not legacy_dir.is_dir():
+            return
+
+        rows = []
+        for f in legacy_dir.glob("*.json"):
+            try:
+                data = json.loads(f.read_text())
+                mtime = datetime.fromtimestamp(f.stat().st_mtime, tz=timezone.utc).isoformat()
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning("Skipping unreadable job file %s: %s", f.name, e)
+                continue
+            rows.append(self._row_values(f.stem, data, mtime))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (id, status, identity, created_at, draft_id, pending, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                               (datetime.now(timezone.utc).isoformat(),))
+            self._conn.execute("COMMIT")
+
+        try:
+            legacy_dir.rename(self.staging_dir / "jobs-migrated")
+        except OSError as e:
+            logger.warning("Could not move legacy jobs dir aside: %s", e)
+        logger.info("Migrated %d JSON job files into %s", len(rows), self.db_path)
+
+
+_stores: dict[Path, JobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_job_store(staging_dir: Path) -> JobStore:
+    """Return the (process-wide) job store for a staging dir."""
+    key = staging_dir.resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = JobStore(staging_dir)
+        return store
@@ -0,0 +1,172 @@
+"""Event loop lag monitor.
+
+A heartbeat task sleeps for a fixed interval and records how late it
+wakes up: that delay is the time the loop spent running something else,
+so it rises whenever a callback blocks (an inline rmtree, a sync hash, a
+slow sqlite write).
+
+The heartbeat can only measure a stall after it is over, when the
+culprit has already returned. A watchdog thread therefore checks the
+heartbeat's last beat; once the loop has been unresponsive for longer
+than the threshold it captures the loop thread's current stack, which
+is the callback doing the blocking, and logs it. Recent stalls (with
+their stacks) and lag percentiles are kept for /health and /debug/loop.
+
+Optionally asyncio's own debug mode is switched on too, which names every
+callback slower than the threshold ("Executing <Task ...> took 0.8
+seconds") at some cost in overhead.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_LAG_SAMPLES = 600  # Lag percentiles cover the last ~minute at the default interval
+_STALLS_KEPT = 20
+
+
+class LoopMonitor:
+    """Heartbeat task measuring loop lag, plus a watchdog capturing stalls."""
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.lag_max = 0.0
+        self.stall_count = 0
+        self.lags: deque[float] = deque(maxlen=_LAG_SAMPLES)
+        self.stalls: deque[dict] = deque(maxlen=_STALLS_KEPT)
+        self._beat_at = time.monotonic()
+        self._current_stall: Optional[dict] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def _record_lag(self, lag: float) -> None:
+        self.samples += 1
+        self.lags.append(lag)
+        self.lag_max = max(self.lag_max, lag)
+        stall = self._current_stall
+        if stall is not None:
+            # The watchdog caught this one while it was happening
+            stall["duration_ms"] = round(lag * 1000, 1)
+            self._current_stall = None
+            logger.warning("Event loop stall ended after %.0f ms", stall["duration_ms"])
+        elif lag > self.threshold:
+            # Shorter than a watchdog check: no stack, but still counted
+            self.stall_count += 1
+            self.stalls.append({
+                "at": datetime.now(timezone.utc).isoformat(),
+                "duration_ms": round(lag * 1000, 1),
+                "stack": None,
+            })
+            logger.warning("Event loop lagged %.0f ms", lag * 1000)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            before = time.monotonic()
+            self._beat_at = before
+            await asyncio.sleep(self.interval)
+            self._record_lag(max(0.0, time.monotonic() - before - self.interval))
+
+    def _capture_stall(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        self.stall_count += 1
+        self._current_stall = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": None,  # Filled in when the loop gets going again
+            "stack": [line.rstrip() for line in stack],
+        }
+        self.stalls.append(self._current_stall)
+        logger.warning(
+            "Event loop blocked for %.0f ms in:\n%s", blocked_for * 1000, "".join(stack).rstrip()
+        )
+
+    def _watch(self) -> None:
+        check_every = max(self.threshold / 2, 0.01)
+        while not self._stopping.wait(check_every):
+            blocked_for = time.monotonic() - self._beat_at - self.interval
+            if blocked_for > self.threshold and self._current_stall is None:
+                self._capture_stall(blocked_for)
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._beat_at = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self, include_stalls: bool = False) -> dict:
+        lags = sorted(self.lags)
+
+        def percentile(p: float) -> float:
+            if not lags:
+                return 0.0
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 1)
+
+        status = {
+            "interval_ms": round(self.interval * 1000),
+            "threshold_ms": round(self.threshold * 1000),
+            "samples": self.samples,
+            "lag_p50_ms": percentile(0.50),
+            "lag_p99_ms": percentile(0.99),
+            "lag_max_ms": round(self.lag_max * 1000, 1),
+            "stalls": self.stall_count,
+            "blocked": self._current_stall is not None,
+        }
+        if include_stalls:
+            status["recent_stalls"] = list(self.stalls)
+        return status
+
+
+# Global monitor instance
+_monitor: Optional[LoopMonitor] = None
+
+
+def get_loop_monitor() -> Optional[LoopMonitor]:
+    """Get the global loop monitor (None if disabled)."""
+    return _monitor
+
+
+def init_loop_monitor(
+    interval: float = 0.1,
+    threshold: float = 0.25,
+    asyncio_debug: bool = False,
+) -> LoopMonitor:
+    """Initialize and start the global loop monitor on the running loop."""
+    global _monitor
+    if asyncio_debug:
+        loop = asyncio.get_running_loop()
+        loop.set_debug(True)
+        loop.slow_callback_duration = threshold
+    _monitor = LoopMonitor(interval, threshold)
+    _monitor.start()
+    return _monitor
+
+
+async def stop_loop_monitor() -> None:
+    """Stop the global loop monitor."""
+    global _monitor
+    if _monitor:
+        await _monitor.stop()
+        _monitor = None
@@ -0,0 +1,448 @@
+"""Serving staged media: conditional and range requests, shaped by priority.
+
+Staged files are only ever replaced, never rewritten in place (see
+placement.py), so (inode, size, mtime) identifies one exact content and
+makes a strong ETag. Responses carry ETag/Last-Modified; If-Match,
+If-None-Match, If-Modified-Since, If-Unmodified-Since and If-Range are
+evaluated per RFC 9110, and Range may ask for several byte ranges (sent
+as multipart/byteranges).
+
+Bodies are sent in 1 MiB chunks, each pread on the serve worker pool,
+so downloads neither wait behind cleanup and hashing on the io pool nor
+hold it up.
+
+Every chunk is paid for from a BandwidthShaper before it is sent. Two
+priorities share it:
+
+    interactive  a person's player seeking or previewing: never waits
+    bulk         machine fetches (Coconut pulling a source): waits until
+                 the shared budget has room, and per client is capped
+
+so with a total budget configured, seeks keep their latency while bulk
+pulls soak up whatever is left. Transfers are accounted per draft.
+"""
+
+import asyncio
+import email.utils
+import hashlib
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .workers import run_serve
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MIN_BURST = 256 * 1024  # Smallest shaper bucket; bigger chunks run it into debt
+MAX_RANGES = 32  # More (after merging) and the Range header is ignored
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def strong_etag(st: os.stat_result) -> str:
+    digest = hashlib.sha256(f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _etag_list(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _strong_match(header: str, etag: str) -> bool:
+    return any(tag == "*" or (tag == etag and not tag.startswith("W/")) for tag in _etag_list(header))
+
+
+def _weak_match(header: str, etag: str) -> bool:
+    return any(tag == "*" or tag.removeprefix("W/") == etag for tag in _etag_list(header))
+
+
+def _http_date(header: str) -> Optional[float]:
+    try:
+        return email.utils.parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def check_preconditions(headers, method: str, etag: str, mtime: int) -> Optional[int]:
+    """
+    Evaluate conditional request headers (RFC 9110 section 13.2.2).
+
+    Returns 412 or 304 when the request should end there, else None.
+    mtime is whole seconds, the resolution of Last-Modified.
+    """
+    if_match = headers.get("if-match")
+    if if_match is not None:
+        if not _strong_match(if_match, etag):
+            return 412
+    elif headers.get("if-unmodified-since"):
+        since = _http_date(headers["if-unmodified-since"])
+        if since is not None and mtime > since:
+            return 412
+
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if _weak_match(if_none_match, etag):
+            return 304 if method in ("GET", "HEAD") else 412
+    elif method in ("GET", "HEAD") and headers.get("if-modified-since"):
+        since = _http_date(headers["if-modified-since"])
+        if since is not None and mtime <= since:
+            return 304
+    return None
+
+
+def range_applies(headers, etag: str, last_modified: str) -> bool:
+    """False if If-Range names another version (then the whole file is sent)."""
+    if_range = headers.get("if-range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag  # Strong comparison only
+    return if_range == last_modified
+
+
+def parse_ranges(header: str, size: int) -> Optional[list[tuple[int, int]]]:
+    """
+    Byte ranges [(start, end_inclusive)] a Range header asks for, sorted and
+    merged. None means ignore the header (not bytes, malformed, or too many
+    ranges) and send the whole file. Raises RangeNotSatisfiable if no range
+    overlaps the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        first, dash, last = part.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if first == "":
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start, end = max(0, size - suffix), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else None
+                if end is not None and end < start:
+                    return None
+                end = size - 1 if end is None else min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size and start <= end:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged if len(merged) <= MAX_RANGES else None
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate  # Bytes per second
+        self.capacity = max(rate * 0.25, MIN_BURST)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, nbytes: int) -> float:
+        """Seconds until nbytes (capped at the burst size) are available."""
+        self.refill()
+        return max(0.0, (min(nbytes, self.capacity) - self.tokens) / self.rate)
+
+
+class BandwidthShaper:
+    """
+    Shared send budget. Interactive chunks are taken at once, even into
+    debt; bulk chunks wait until the shared bucket (and their client's
+    bucket) have room, so they only ever use what interactive leaves.
+    A rate of 0 means unlimited.
+    """
+
+    def __init__(self, max_bytes_per_second: float = 0, bulk_client_bytes_per_second: float = 0):
+        self.total = _TokenBucket(max_bytes_per_second) if max_bytes_per_second > 0 else None
+        self.client_rate = bulk_client_bytes_per_second
+        self._clients: OrderedDict[str, _TokenBucket] = OrderedDict()
+        self.bulk_waiting = 0
+        self.bulk_wait_seconds = 0.0
+
+    def _client_bucket(self, client: str) -> Optional[_TokenBucket]:
+        if self.client_rate <= 0:
+            return None
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = _TokenBucket(self.client_rate)
+            while len(self._clients) > 1024:
+                self._clients.popitem(last=False)
+        self._clients.move_to_end(client)
+        return bucket
+
+    async def acquire(self, nbytes: int, priority: str, client: str = "") -> None:
+        buckets = [b for b in (self.total,) if b is not None]
+        if priority == BULK:
+            client_bucket = self._client_bucket(client)
+            if client_bucket is not None:
+                buckets.append(client_bucket)
+            started = time.monotonic()
+            self.bulk_waiting += 1
+            try:
+                while True:
+                    delay = max((b.wait_for(nbytes) for b in buckets), default=0.0)
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+            finally:
+                self.bulk_waiting -= 1
+                self.bulk_wait_seconds += time.monotonic() - started
+        else:
+            for bucket in buckets:
+                bucket.refill()
+        for bucket in buckets:
+            bucket.tokens -= nbytes
+
+    def status(self) -> dict:
+        return {
+            "max_mbps": round(self.total.rate * 8 / 1e6, 1) if self.total else None,
+            "bulk_client_mbps": round(self.client_rate * 8 / 1e6, 1) if self.client_rate > 0 else None,
+            "bulk_waiting": self.bulk_waiting,
+            "bulk_wait_seconds": round(self.bulk_wait_seconds, 1),
+        }
+
+
+@dataclass
+class DraftTransfers:
+    requests: int = 0
+    bytes_sent: int = 0
+    partial: int = 0
+    not_modified: int = 0
+    interactive_bytes: int = 0
+    bulk_bytes: int = 0
+
+
+class TransferLedger:
+    """Per-draft request and byte counts for served staging files (most recent drafts kept)."""
+
+    def __init__(self, max_drafts: int = 1024):
+        self.max_drafts = max_drafts
+        self.drafts: OrderedDict[str, DraftTransfers] = OrderedDict()
+
+    def _entry(self, draft_id: str) -> DraftTransfers:
+        entry = self.drafts.get(draft_id)
+        if entry is None:
+            entry = self.drafts[draft_id] = DraftTransfers()
+            while len(self.drafts) > self.max_drafts:
+                self.drafts.popitem(last=False)
+        self.drafts.move_to_end(draft_id)
+        return entry
+
+    def record(self, draft_id: str, status: int, nbytes: int, priority: str) -> None:
+        entry = self._entry(draft_id)
+        entry.requests += 1
+        entry.bytes_sent += nbytes
+        entry.partial += status == 206
+        entry.not_modified += status == 304
+        if priority == BULK:
+            entry.bulk_bytes += nbytes
+        else:
+            entry.interactive_bytes += nbytes
+
+    def get(self, draft_id: str) -> Optional[DraftTransfers]:
+        return self.drafts.get(draft_id)
+
+
+class StagingFileResponse(Response):
+    """A staged file, honouring conditional and (multi-)range requests."""
+
+    def __init__(
+        self,
+        path: Path,
+        request: Request,
+        *,
+        draft_id: str,
+        priority: str = INTERACTIVE,
+        media_type: str = "application/octet-stream",
+        filename: Optional[str] = None,
+        shaper: Optional[BandwidthShaper] = None,
+        ledger: Optional[TransferLedger] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.path = path
+        self.request = request
+        self.draft_id = draft_id
+        self.priority = priority
+        self.media_type = media_type
+        self.filename = filename
+        self.shaper = shaper or BandwidthShaper()
+        self.ledger = ledger
+        self.chunk_size = chunk_size
+        self.client = request.client.host if request.client else ""
+        self.status_code = 200
+        self.background = None
+        self.raw_headers = []
+
+    def _base_headers(self, etag: str, last_modified: str) -> dict:
+        headers = {
+            "etag": etag,
+            "last-modified": last_modified,
+            "accept-ranges": "bytes",
+            "cache-control": "private, no-cache",
+        }
+        if self.filename:
+            headers["content-disposition"] = f"attachment; filename*=utf-8''{quote(self.filename)}"
+        return headers
+
+    async def _start(self, send: Send, status: int, headers: dict) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode("latin-1"), str(v).encode("latin-1")) for k, v in headers.items()],
+        })
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        method = scope["method"]
+        try:
+            f = await run_serve(open, self.path, "rb")
+        except OSError:
+            await self._start(send, 404, {"content-type": "text/plain", "content-length": "14"})
+            await send({"type": "http.response.body", "body": b"File not found"})
+            return
+
+        sent = 0
+        status = 200
+        try:
+            st = os.fstat(f.fileno())
+            etag = strong_etag(st)
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+            headers = self._base_headers(etag, last_modified)
+            size = st.st_size
+
+            precondition = check_preconditions(self.request.headers, method, etag, int(st.st_mtime))
+            if precondition is not None:
+                status = precondition
+                if status == 412:
+                    headers = {"etag": etag, "content-length": "0"}
+                await self._start(send, status, headers)
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            ranges = None
+            range_header = self.request.headers.get("range")
+            if range_header and method in ("GET", "HEAD") and range_applies(self.request.headers, etag, last_modified):
+                try:
+                    ranges = parse_ranges(range_header, size)
+                except RangeNotSatisfiable:
+                    status = 416
+                    await self._start(send, 416, {**headers, "content-range": f"bytes */{size}", "content-length": "0"})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+            if ranges is None:
+                parts = [(None, 0, size - 1)]
+                headers.update({"content-type": self.media_type, "content-length": str(size)})
+            elif len(ranges) == 1:
+                status = 206
+                start, end = ranges[0]
+                parts = [(None, start, end)]
+                headers.update({
+                    "content-type": self.media_type,
+                    "content-range": f"bytes {start}-{end}/{size}",
+                    "content-length": str(end - start + 1),
+                })
+            else:
+                status = 206
+                boundary = uuid.uuid4().hex
+                parts = [
+                    (
+                        (
+                            f"--{boundary}\r\ncontent-type: {self.media_type}\r\n"
+                            f"content-range: bytes {start}-{end}/{size}\r\n\r\n"
+                        ).encode("latin-1"),
+                        start, end,
+                    )
+                    for start, end in ranges
+                ]
+                closing = f"--{boundary}--\r\n".encode("latin-1")
+                length = sum(len(head) + (end - start + 1) + 2 for head, start, end in parts) + len(closing)
+                headers.update({
+                    "content-type": f"multipart/byteranges; boundary={boundary}",
+                    "content-length": str(length),
+                })
+
+            self.status_code = status
+            await self._start(send, status, headers)
+            if method == "HEAD":
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            for head, start, end in parts:
+                if head:
+                    await send({"type": "http.response.body", "body": head, "more_body": True})
+                offset = start
+                while offset <= end:
+                    count = min(self.chunk_size, end - offset + 1)
+                    await self.shaper.acquire(count, self.priority, self.client)
+                    chunk = await run_serve(os.pread, f.fileno(), count, offset)
+                    if not chunk:
+                        raise OSError(f"{self.path} shrank while being sent")
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    offset += len(chunk)
+                    sent += len(chunk)
+                if head:
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+            await send({
+                "type": "http.response.body",
+                "body": closing if len(parts) > 1 else b"",
+            })
+        finally:
+            f.close()
+            if self.ledger is not None:
+                self.ledger.record(self.draft_id, status, sent, self.priority)
+
+
+# Global shaper and ledger instances
+_shaper: Optional[BandwidthShaper] = None
+_ledger = TransferLedger()
+
+
+def get_bandwidth_shaper() -> Optional[BandwidthShaper]:
+    """Get the global staging bandwidth shaper (None until initialized)."""
+    return _shaper
+
+
+def init_bandwidth_shaper(max_mbps: float = 0, bulk_client_mbps: float = 0) -> BandwidthShaper:
+    """Initialize the global shaper. Rates in megabits per second; 0 = unlimited."""
+    global _shaper
+    _shaper = BandwidthShaper(max_mbps * 1e6 / 8, bulk_client_mbps * 1e6 / 8)
+    return _shaper
+
+
+def get_transfer_ledger() -> TransferLedger:
+    """Get the global per-draft transfer ledger."""
+    return _ledger
@@ -0,0 +1,195 @@
+"""
+Cached local pin set for the public /local-pins endpoint.
+
+The arthel build polls /local-pins; running kubo pin/ls for every poll is
+wasteful when the pin set changes a handful of times a day. PinIndex keeps
+a pre-serialized response body with a strong ETag, built from the streamed
+pin/ls output. It is rebuilt when ipfs reports one of our own pins or
+unpins, and periodically in the background to pick up changes made
+directly on the node (ipfs pin add / pin rm from a shell).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from . import ipfs
+
+logger = logging.getLogger(__name__)
+
+# After a failed listing, keep serving the old snapshot this long before retrying
+RETRY_SECONDS = 10
+
+
+@dataclass
+class PinSnapshot:
+    """One serialized /local-pins response."""
+    body: bytes
+    etag: str
+    count: int
+    built_at: float
+
+    @classmethod
+    def build(cls, cids: list[str]) -> "PinSnapshot":
+        # Sorted so the body (and so the ETag) only changes when the set does
+        pins = [{"cid": cid} for cid in sorted(set(cids))]
+        body = json.dumps(
+            {"pins": pins, "count": len(pins), "node": "delivery-kid"},
+            separators=(",", ":"),
+        ).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        return cls(body=body, etag=etag, count=len(pins), built_at=time.time())
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header names this snapshot."""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return self.etag in tags
+
+
+class PinIndex:
+    """
+    Serves the local pin set from memory.
+
+    get() returns the current snapshot, rebuilding first when it has been
+    invalidated or is older than max_age. Concurrent callers share one
+    rebuild. If kubo is unreachable the last good snapshot keeps being
+    served; with no snapshot at all an empty one is returned and not
+    cached, matching the old endpoint. Either way kubo is retried at most
+    every RETRY_SECONDS.
+    """
+
+    def __init__(self, max_age: float = 300):
+        self.max_age = max_age
+        self._snapshot: Optional[PinSnapshot] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._failed_at = 0.0
+        self.builds = 0
+        self.failures = 0
+        self.hits = 0
+
+    def invalidate(self) -> None:
+        """Mark the pin set as changed; the next get() or the refresher rebuilds."""
+        self._stale = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _fresh(self) -> bool:
+        now = time.time()
+        if now - self._failed_at < RETRY_SECONDS:
+            return True  # Kubo just failed; don't ask again yet
+        if self._snapshot is None:
+            return False
+        return not self._stale and now - self._snapshot.built_at < self.max_age
+
+    async def get(self) -> PinSnapshot:
+        if self._fresh():
+            self.hits += 1
+            return self._snapshot or PinSnapshot.build([])
+        async with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._snapshot or PinSnapshot.build([])
+            return await self.refresh()
+
+    async def refresh(self) -> PinSnapshot:
+        """Rebuild from kubo. Call with _lock held, or from the refresher."""
+        # Cleared first: a pin that lands mid-listing re-marks it stale
+        self._stale = False
+        try:
+            cids = [cid async for cid in ipfs.iter_local_pins()]
+        except Exception as e:
+            self._stale = True
+            self._failed_at = time.time()
+            self.failures += 1
+            logger.warning(f"Failed to list local pins: {e}")
+            return self._snapshot or PinSnapshot.build([])
+
+        snapshot = PinSnapshot.build(cids)
+        if self._snapshot is not None and self._snapshot.etag == snapshot.etag:
+            # Unchanged: keep the ETag, just restart the age clock
+            self._snapshot.built_at = snapshot.built_at
+        else:
+            self._snapshot = snapshot
+        self.builds += 1
+        return self._snapshot
+
+    async def run(self) -> None:
+        """Rebuild when invalidated, and at least every max_age seconds."""
+        self._wakeup = asyncio.Event()
+        while True:
+            if not self._fresh():
+                async with self._lock:
+                    if not self._fresh():
+                        await self.refresh()
+            if self._snapshot is None or self._stale:
+                # Last listing failed (kubo not up yet?); retry sooner than max_age
+                timeout = min(self.max_age, 30)
+            else:
+                timeout = max(0.0, self._snapshot.built_at + self.max_age - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def status(self) -> dict:
+        return {
+            "count": self._snapshot.count if self._snapshot else None,
+            "etag": self._snapshot.etag if self._snapshot else None,
+            "stale": self._stale,
+            "builds": self.builds,
+            "failures": self.failures,
+            "hits": self.hits,
+        }
+
+
+# Global pin index
+_index: Optional[PinIndex] = None
+_task: Optional[asyncio.Task] = None
+
+
+def _invalidate() -> None:
+    if _index is not None:
+        _index.invalidate()
+
+
+ipfs.on_pins_changed(_invalidate)
+
+
+def get_pin_index() -> PinIndex:
+    """Get the global pin index, creating one (without a refresher) if needed."""
+    global _index
+    if _index is None:
+        _index = PinIndex()
+    return _index
+
+
+def init_pin_index(refresh_seconds: float) -> PinIndex:
+    """Start the background refresher for the global pin index."""
+    global _task
+    index = get_pin_index()
+    index.max_age = refresh_seconds
+    _task = asyncio.create_task(index.run())
+    return index
+
+
+async def stop_pin_index() -> None:
+    """Stop the global pin index refresher."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = None
@@ -0,0 +1,50 @@
+"""Place staged files where finalize needs them without copying bytes.
+
+Uploads, the pin directory, originals/ and the transcode cache all live
+on the staging filesystem, so a hardlink gives the destination the same
+content in one metadata operation. A copy is only made where linking
+fails (another filesystem, or one without hardlinks).
+
+Sources are linked rather than moved: a draft's uploads have to survive
+a failed finalize so it can be retried, and the draft directory is
+removed after a successful one anyway.
+
+A placed file may share its inode with the source, so callers must
+replace placed files rather than modify them in place.
+"""
+
+import logging
+import os
+import shutil
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def place_file(src: Path, dest: Path) -> str:
+    """
+    Make dest a hardlink to src, or a copy if linking fails.
+
+    An existing dest is replaced (unlinked first, so an old link is never
+    written through). Returns "link" or "copy".
+    """
+    src, dest = Path(src), Path(dest)
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+        return "link"
+    except OSError as e:
+        if not src.exists():
+            raise
+        logger.debug("Hardlink %s -> %s failed (%s), copying", src, dest, e)
+        shutil.copy2(src, dest)
+        return "copy"
+
+
+def place_tree(src: Path, dest: Path) -> None:
+    """place_file for a file or a whole directory tree, merging into dest."""
+    if src.is_file():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        place_file(src, dest)
+        return
+    shutil.copytree(src, dest, copy_function=place_file, dirs_exist_ok=True)
@@ -107,6 +107,10 @@ class Seeder:
 
         Returns:
             infohash string, or None on failure
+
+        Blocking (copies the content): call via run_io from async code.
+        The staging ledger is left to the caller (account_staging_tree on
+        the loop, before and after).
         """
         cid_dir = self.seeding_dir / cid
         data_dir = cid_dir / "data"
@@ -6,6 +6,11 @@ from pathlib import Path
 from dataclasses import dataclass
 from typing import Optional, Callable, Awaitable
 
+from ..config import HLS_LAYOUTS
+from .analyze import probe_keyframe_times
+from .transcode_cache import TranscodeCache, file_sha256, get_transcode_cache
+from .workers import run_io
+
 
 @dataclass
 class TranscodeResult:
@@ -14,6 +19,47 @@ class TranscodeResult:
     error: Optional[str] = None
 
 
+# Part of every cache key: bump when encoder output changes in a way the
+# key params don't capture, so stale cached outputs stop being served
+CACHE_VERSION = 1
+
+
+async def _cache_key(cache: Optional[TranscodeCache], input_path: Path, params: dict) -> Optional[str]:
+    """Cache key for this input + params, or None if caching is off/unavailable."""
+    if cache is None:
+        return None
+    try:
+        return cache.make_key(await file_sha256(input_path), version=CACHE_VERSION, **params)
+    except OSError:
+        return None
+
+
+def _reset_output_dir(output_dir: Path) -> None:
+    """
+    Empty output_dir before an HLS encode or cache restore.
+
+    Files left from an earlier attempt may be hardlinks into the transcode
+    cache; ffmpeg -y would rewrite them in place (corrupting the cached
+    entry), and leftovers the new encode doesn't produce would be pinned
+    along with it.
+    """
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir(parents=True)
+
+
+async def _run_ffmpeg(cmd: list[str]) -> Optional[str]:
+    """Run an ffmpeg command. Returns an error message, or None on success."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        return stderr.decode() if stderr else "Unknown ffmpeg error"
+    return None
+
+
 async def transcode_flac_to_ogg(
     input_path: Path,
     output_path: Path,
@@ -22,10 +68,13 @@ async def transcode_flac_to_ogg(
     progress_callback: Optional[Callable[[str], Awaitable[None]]] = None
 ) -> TranscodeResult:
     """
-    Transcode a FLAC file to OGG Vorbis.
+    Transcode a FLAC file (or any audio ffmpeg can read, e.g. WAV) to OGG Vorbis.
+
+    Outputs are served from the transcode cache when the same source was
+    already encoded with the same quality and metadata.
 
     Args:
-        input_path: Path to input FLAC file
+        input_path: Path to input audio file
         output_path: Path for output OGG file
         quality: OGG quality (0-10, default 6 ≈ 192kbps)
         metadata: Optional dict of metadata tags to embed (KEY: VALUE)
@@ -37,17 +86,28 @@ async def transcode_flac_to_ogg(
     if not input_path.exists():
         return TranscodeResult(success=False, error=f"Input file not found: {input_path}")
 
+    # Ensure output directory exists
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    cache = get_transcode_cache()
+    params = {"codec": "libvorbis", "quality": quality, "metadata": metadata or {}}
+    cache_key = await _cache_key(cache, input_path, params)
+    if cache_key and await run_io(cache.restore, cache_key, output_path):
+        if progress_callback:
+            await progress_callback(f"Using cached transcode of {input_path.name}")
+        return TranscodeResult(success=True, output_path=output_path)
+
     # Check for ffmpeg
     if not shutil.which("ffmpeg"):
         return TranscodeResult(success=False, error="ffmpeg not found")
 
-    # Ensure output directory exists
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
     if progress_callback:
         await progress_callback(f"Transcoding {input_path.name}")
 
     try:
+        # A previous output may be a hardlink into the cache; never encode over it
+        output_path.unlink(missing_ok=True)
+
         # Build ffmpeg command
         cmd = [
             "ffmpeg",
@@ -66,21 +126,69 @@ async def transcode_flac_to_ogg(
             str(output_path)
         ])
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        error_msg = await _run_ffmpeg(cmd)
+        if error_msg:
+            return TranscodeResult(success=False, error=error_msg)
+
+        if not output_path.exists():
+            return TranscodeResult(success=False, error="Output file not created")
+
+        if cache_key:
+            await run_io(cache.store, cache_key, output_path, params)
+
+        return TranscodeResult(success=True, output_path=output_path)
+
+    except Exception as e:
+        return TranscodeResult(success=False, error=str(e))
 
-        stdout, stderr = await process.communicate()
 
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown ffmpeg error"
+async def transcode_to_flac(
+    input_path: Path,
+    output_path: Path,
+    compression_level: int = 8,
+) -> TranscodeResult:
+    """
+    Encode an audio file (typically WAV) to FLAC for the lossless archive.
+
+    Args:
+        input_path: Path to input audio file
+        output_path: Path for output FLAC file
+        compression_level: FLAC compression level (0-12, default 8)
+
+    Returns:
+        TranscodeResult with success status and output path
+    """
+    if not input_path.exists():
+        return TranscodeResult(success=False, error=f"Input file not found: {input_path}")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    cache = get_transcode_cache()
+    params = {"codec": "flac", "compression_level": compression_level}
+    cache_key = await _cache_key(cache, input_path, params)
+    if cache_key and await run_io(cache.restore, cache_key, output_path):
+        return TranscodeResult(success=True, output_path=output_path)
+
+    if not shutil.which("ffmpeg"):
+        return TranscodeResult(success=False, error="ffmpeg not found")
+
+    try:
+        output_path.unlink(missing_ok=True)  # May be a hardlink into the cache
+        error_msg = await _run_ffmpeg([
+            "ffmpeg", "-y", "-i", str(input_path),
+            "-c:a", "flac",
+            "-compression_level", str(compression_level),
+            str(output_path)
+        ])
+        if error_msg:
             return TranscodeResult(success=False, error=error_msg)
 
         if not output_path.exists():
             return TranscodeResult(success=False, error="Output file not created")
 
+        if cache_key:
+            await run_io(cache.store, cache_key, output_path, params)
+
         return TranscodeResult(success=True, output_path=output_path)
 
     except Exception as e:
@@ -133,23 +241,333 @@ async def transcode_album_directory(
     return (success, outputs, errors)
 
 
+# Default HLS ladder when the caller doesn't pick one (matches Coconut's default)
+DEFAULT_HLS_QUALITIES = [720, 480]
+
+# Segment length in seconds; keyframes are forced on these boundaries so
+# every rendition switches cleanly at the same points.
+HLS_SEGMENT_SECONDS = 6
+
+# Encoder settings shared by every HLS rendition (also part of the cache key)
+HLS_VIDEO_ARGS = ("-c:v", "libx264", "-preset", "medium", "-pix_fmt", "yuv420p", "-sc_threshold", "0")
+HLS_AUDIO_ARGS = ("-c:a", "aac", "-b:a", "128k", "-ac", "2")
+
+# HLS output layouts:
+# - "ts":          MPEG-TS, one .ts file per segment (most compatible)
+# - "fmp4":        fragmented MP4, init.mp4 + one .m4s file per segment
+# - "fmp4_single": fragmented MP4, one stream.mp4 per rendition addressed
+#                  with EXT-X-BYTERANGE (a handful of files per video
+#                  instead of thousands, far fewer IPFS blocks/gateway fetches)
+# (defined once as config.HlsLayout)
+
+
+def video_bitrate_kbps(height: int) -> int:
+    """Target H.264 video bitrate for a rendition of the given height."""
+    if height >= 2160:
+        return 12000
+    if height >= 1080:
+        return 5000
+    if height >= 720:
+        return 2800
+    if height >= 480:
+        return 1400
+    return 800
+
+
+def select_ladder(qualities: Optional[list[int]], source_height: Optional[int] = None) -> list[int]:
+    """
+    Pick the rendition heights to encode, highest first.
+
+    Rungs taller than the source are dropped (no point upscaling). If that
+    leaves nothing, a single rendition at the source height is used.
+    """
+    ladder = sorted({q for q in (qualities or DEFAULT_HLS_QUALITIES) if q > 0}, reverse=True)
+    if source_height:
+        fitting = [q for q in ladder if q <= source_height]
+        # Heights must be even for yuv420p
+        ladder = fitting or [source_height - (source_height % 2)]
+    return ladder
+
+
+def build_hls_command(
+    input_path: Path,
+    output_dir: Path,
+    qualities: list[int],
+    has_audio: bool = True,
+    trim_start: Optional[float] = None,
+    trim_end: Optional[float] = None,
+    layout: str = "ts",
+) -> list[str]:
+    """
+    Build the ffmpeg command for a multi-rendition HLS ladder.
+
+    The source is decoded once; filter_complex splits the decoded video and
+    scales each branch to its rung. Output layout matches Coconut's:
+    master.m3u8 at the root, {height}p/playlist.m3u8 + media per rendition.
+    See HLS_LAYOUTS for how the media files are laid out.
+    """
+    if layout not in HLS_LAYOUTS:
+        raise ValueError(f"Unknown HLS layout: {layout} (expected one of {', '.join(HLS_LAYOUTS)})")
+
+    cmd = ["ffmpeg", "-y"] + _input_args(input_path, trim_start, trim_end)
+
+    # One decode, N scaled branches
+    count = len(qualities)
+    split_outputs = "".join(f"[s{i}]" for i in range(count))
+    filters = [f"[0:v]split={count}{split_outputs}"]
+    for i, height in enumerate(qualities):
+        filters.append(f"[s{i}]scale=-2:{height}[v{i}]")
+    cmd.extend(["-filter_complex", ";".join(filters)])
+
+    for i in range(count):
+        cmd.extend(["-map", f"[v{i}]"])
+        if has_audio:
+            cmd.extend(["-map", "0:a:0"])
+
+    # Video: H.264 for broad compatibility, bitrate-capped per rung
+    cmd.extend(HLS_VIDEO_ARGS)
+    cmd.extend(["-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})"])
+    for i, height in enumerate(qualities):
+        kbps = video_bitrate_kbps(height)
+        cmd.extend([
+            f"-b:v:{i}", f"{kbps}k",
+            f"-maxrate:v:{i}", f"{int(kbps * 1.07)}k",
+            f"-bufsize:v:{i}", f"{int(kbps * 1.5)}k",
+        ])
+
+    # Audio: AAC, same for every rendition
+    if has_audio:
+        cmd.extend(HLS_AUDIO_ARGS)
+
+    if has_audio:
+        stream_map = " ".join(f"v:{i},a:{i},name:{q}p" for i, q in enumerate(qualities))
+    else:
+        stream_map = " ".join(f"v:{i},name:{q}p" for i, q in enumerate(qualities))
+
+    cmd.extend(_hls_muxer_args(output_dir, stream_map, layout))
+    return cmd
+
+
+def _input_args(
+    input_path: Path,
+    trim_start: Optional[float] = None,
+    trim_end: Optional[float] = None,
+) -> list[str]:
+    """Input (and trim) arguments shared by the HLS commands."""
+    args = []
+    # Trim: -ss before -i for fast seek, -to after -i for end time
+    if trim_start is not None:
+        args.extend(["-ss", str(trim_start)])
+    args.extend(["-i", str(input_path)])
+    if trim_end is not None:
+        # -to is relative to -ss when -ss is before -i
+        if trim_start is not None:
+            args.extend(["-to", str(trim_end - trim_start)])
+        else:
+            args.extend(["-to", str(trim_end)])
+    return args
+
+
+def _hls_muxer_args(output_dir: Path, stream_map: str, layout: str) -> list[str]:
+    """HLS muxer arguments: segmenting, layout, master playlist, output path."""
+    args = [
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_list_size", "0",  # Keep all segments in playlist
+        "-hls_playlist_type", "vod",
+    ]
+    if layout == "ts":
+        segment_name = "segment_%03d.ts"
+    elif layout == "fmp4":
+        segment_name = "segment_%03d.m4s"
+        args.extend(["-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", "init.mp4"])
+    else:
+        # Init section and every fragment go into one file; the playlist
+        # addresses fragments by byte range
+        segment_name = "stream.mp4"
+        args.extend(["-hls_segment_type", "fmp4", "-hls_flags", "single_file"])
+    args.extend([
+        "-hls_segment_filename", str(output_dir / "%v" / segment_name),
+        "-master_pl_name", "master.m3u8",
+        "-var_stream_map", stream_map,
+        str(output_dir / "%v" / "playlist.m3u8"),
+    ])
+    return args
+
+
+# --- Stream-copy trim fast path ---
+
+# Codecs (as named by analyze.py) that can go into HLS without re-encoding
+STREAM_COPY_VIDEO_CODECS = {"H.264"}
+STREAM_COPY_AUDIO_CODECS = {"AAC"}
+
+
+def can_stream_copy(video_codec: Optional[str], audio_codec: Optional[str]) -> bool:
+    """Whether a source's streams can be remuxed to HLS as-is."""
+    if video_codec not in STREAM_COPY_VIDEO_CODECS:
+        return False
+    return audio_codec is None or audio_codec in STREAM_COPY_AUDIO_CODECS
+
+
+def is_source_only_ladder(qualities: Optional[list[int]], source_height: Optional[int]) -> bool:
+    """
+    Whether the ladder for these qualities is just one rendition at the
+    source height, which a stream-copy remux produces without losing any.
+    """
+    if not source_height:
+        return False
+    return select_ladder(qualities, source_height) == [source_height - (source_height % 2)]
+
+
+def snap_to_keyframe(t: float, keyframes: list[float], tolerance: float) -> Optional[float]:
+    """Nearest keyframe time to t, or None if none is within tolerance."""
+    if not keyframes:
+        return None
+    nearest = min(keyframes, key=lambda k: abs(k - t))
+    if abs(nearest - t) > tolerance:
+        return None
+    return nearest
+
+
+def build_hls_copy_command(
+    input_path: Path,
+    output_dir: Path,
+    rendition_name: str,
+    has_audio: bool = True,
+    trim_start: Optional[float] = None,
+    trim_end: Optional[float] = None,
+    layout: str = "ts",
+) -> list[str]:
+    """
+    Build an ffmpeg command that remuxes the source to single-rendition HLS
+    with -c copy. Cut points must already be keyframe-aligned.
+    """
+    if layout not in HLS_LAYOUTS:
+        raise ValueError(f"Unknown HLS layout: {layout} (expected one of {', '.join(HLS_LAYOUTS)})")
+
+    cmd = ["ffmpeg", "-y"] + _input_args(input_path, trim_start, trim_end)
+    cmd.extend(["-map", "0:v:0"])
+    if has_audio:
+        cmd.extend(["-map", "0:a:0"])
+    cmd.extend(["-c", "copy"])
+
+    stream_map = f"v:0,a:0,name:{rendition_name}" if has_audio else f"v:0,name:{rendition_name}"
+    cmd.extend(_hls_muxer_args(output_dir, stream_map, layout))
+    return cmd
+
+
+async def remux_trim_to_hls(
+    input_path: Path,
+    output_dir: Path,
+    trim_start: Optional[float],
+    trim_end: Optional[float],
+    tolerance: float,
+    source_height: Optional[int] = None,
+    has_audio: bool = True,
+    layout: str = "ts",
+) -> TranscodeResult:
+    """
+    Trim without re-encoding: snap the cut points to the nearest keyframes
+    and remux the source to HLS with -c copy.
+
+    Only applies when each requested cut point is within tolerance seconds
+    of a keyframe; otherwise returns a failed result and the caller should
+    fall back to a full transcode. The source codecs must already be
+    HLS-compatible (see can_stream_copy).
+
+    Args:
+        input_path: Path to input video file
+        output_dir: Directory to write HLS output (master.m3u8 + one rendition)
+        trim_start: Requested start time in seconds
+        trim_end: Requested end time in seconds
+        tolerance: Maximum distance in seconds a cut point may move
+        source_height: Source video height, used to name the rendition
+        has_audio: Whether the source has an audio stream to carry over
+        layout: Segment layout, one of HLS_LAYOUTS (default "ts")
+
+    Returns:
+        TranscodeResult with success status and output directory path
+    """
+    if not input_path.exists():
+        return TranscodeResult(success=False, error=f"Input file not found: {input_path}")
+
+    if not shutil.which("ffmpeg"):
+        return TranscodeResult(success=False, error="ffmpeg not found")
+
+    # Only scan the regions around the cut points
+    wanted = [t for t in (trim_start, trim_end) if t is not None]
+    keyframes = await probe_keyframe_times(
+        input_path, [(t - tolerance, t + tolerance) for t in wanted]
+    )
+
+    snapped_start = None
+    if trim_start is not None:
+        snapped_start = snap_to_keyframe(trim_start, keyframes, tolerance)
+        if snapped_start is None:
+            return TranscodeResult(success=False, error=f"No keyframe within {tolerance}s of {trim_start}s")
+
+    snapped_end = None
+    if trim_end is not None:
+        snapped_end = snap_to_keyframe(trim_end, keyframes, tolerance)
+        if snapped_end is None:
+            return TranscodeResult(success=False, error=f"No keyframe within {tolerance}s of {trim_end}s")
+
+    if snapped_start is not None and snapped_end is not None and snapped_end <= snapped_start:
+        return TranscodeResult(success=False, error="Cut points snap to the same keyframe")
+
+    rendition_name = f"{source_height}p" if source_height else "source"
+    await run_io(_reset_output_dir, output_dir)
+    (output_dir / rendition_name).mkdir()
+
+    try:
+        cmd = build_hls_copy_command(
+            input_path, output_dir, rendition_name,
+            has_audio=has_audio,
+            trim_start=snapped_start,
+            trim_end=snapped_end,
+            layout=layout,
+        )
+        error_msg = await _run_ffmpeg(cmd)
+        if error_msg:
+            return TranscodeResult(success=False, error=error_msg)
+
+        if not (output_dir / "master.m3u8").exists():
+            return TranscodeResult(success=False, error="master.m3u8 not created")
+
+        return TranscodeResult(success=True, output_path=output_dir)
+
+    except Exception as e:
+        return TranscodeResult(success=False, error=str(e))
+
+
 async def transcode_video_to_hls(
     input_path: Path,
     output_dir: Path,
     progress_callback: Optional[Callable[[str], Awaitable[None]]] = None,
     trim_start: Optional[float] = None,
     trim_end: Optional[float] = None,
+    qualities: Optional[list[int]] = None,
+    source_height: Optional[int] = None,
+    has_audio: bool = True,
+    layout: str = "ts",
 ) -> TranscodeResult:
     """
     Transcode a video file to HLS (HTTP Live Streaming) format.
 
-    Creates a directory with master.m3u8 and segment files,
+    Produces an adaptive-bitrate ladder from a single decode: master.m3u8
+    plus one {height}p/ directory of playlist and segments per rendition,
     suitable for streaming via IPFS gateway.
 
     Args:
         input_path: Path to input video file
-        output_dir: Directory to write HLS output (master.m3u8 + segments)
+        output_dir: Directory to write HLS output (master.m3u8 + renditions)
         progress_callback: Optional async callback for progress updates
+        trim_start: Optional start time in seconds
+        trim_end: Optional end time in seconds
+        qualities: Rendition heights, e.g. [1080, 720, 480] (default [720, 480])
+        source_height: Source video height; rungs above it are skipped
+        has_audio: Whether the source has an audio stream to carry over
+        layout: Segment layout, one of HLS_LAYOUTS (default "ts")
 
     Returns:
         TranscodeResult with success status and output directory path
@@ -157,68 +575,218 @@ async def transcode_video_to_hls(
     if not input_path.exists():
         return TranscodeResult(success=False, error=f"Input file not found: {input_path}")
 
+    await run_io(_reset_output_dir, output_dir)
+
+    ladder = select_ladder(qualities, source_height)
+
+    cache = get_transcode_cache()
+    params = {
+        "codec": "h264-hls",
+        "video_args": HLS_VIDEO_ARGS,
+        "audio_args": HLS_AUDIO_ARGS if has_audio else None,
+        "segment_seconds": HLS_SEGMENT_SECONDS,
+        "ladder": ladder,
+        "bitrates": [video_bitrate_kbps(q) for q in ladder],
+        "layout": layout,
+        "has_audio": has_audio,
+        "trim_start": trim_start,
+        "trim_end": trim_end,
+    }
+    cache_key = await _cache_key(cache, input_path, params)
+    if cache_key and await run_io(cache.restore, cache_key, output_dir):
+        if progress_callback:
+            await progress_callback(f"Using cached HLS transcode of {input_path.name}")
+        return TranscodeResult(success=True, output_path=output_dir)
+
     if not shutil.which("ffmpeg"):
         return TranscodeResult(success=False, error="ffmpeg not found")
 
-    output_dir.mkdir(parents=True, exist_ok=True)
-
     if progress_callback:
-        await progress_callback(f"Transcoding {input_path.name} to HLS")
+        ladder_desc = ", ".join(f"{q}p" for q in ladder)
+        await progress_callback(f"Transcoding {input_path.name} to HLS ({ladder_desc})")
 
     try:
-        # Build ffmpeg HLS command
-        # - Multiple quality renditions for adaptive streaming
-        # - 6-second segments
-        # - master playlist
         master_playlist = output_dir / "master.m3u8"
-
-        cmd = [
-            "ffmpeg", "-y",
-        ]
-        # Trim: -ss before -i for fast seek, -to after -i for end time
-        if trim_start is not None:
-            cmd.extend(["-ss", str(trim_start)])
-        cmd.extend([
-            "-i", str(input_path),
-        ])
-        if trim_end is not None:
-            # -to is relative to -ss when -ss is before -i
-            if trim_start is not None:
-                cmd.extend(["-to", str(trim_end - trim_start)])
-            else:
-                cmd.extend(["-to", str(trim_end)])
-        cmd.extend([
-            # Video: H.264 for broad compatibility
-            "-c:v", "libx264",
-            "-preset", "medium",
-            "-crf", "23",
-            # Audio: AAC
-            "-c:a", "aac",
-            "-b:a", "128k",
-            # HLS output
-            "-f", "hls",
-            "-hls_time", "6",
-            "-hls_list_size", "0",  # Keep all segments in playlist
-            "-hls_segment_filename", str(output_dir / "segment_%03d.ts"),
-            str(master_playlist),
-        ])
-
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        for height in ladder:
+            (output_dir / f"{height}p").mkdir(parents=True, exist_ok=True)
+
+        cmd = build_hls_command(
+            input_path, output_dir, ladder,
+            has_audio=has_audio,
+            trim_start=trim_start,
+            trim_end=trim_end,
+            layout=layout,
         )
 
-        _, stderr = await process.communicate()
-
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown ffmpeg error"
+        error_msg = await _run_ffmpeg(cmd)
+        if error_msg:
             return TranscodeResult(success=False, error=error_msg)
 
         if not master_playlist.exists():
             return TranscodeResult(success=False, error="master.m3u8 not created")
 
+        if cache_key:
+            await run_io(cache.store, cache_key, output_dir, params)
+
         return TranscodeResult(success=True, output_path=output_dir)
 
     except Exception as e:
         return TranscodeResult(success=False, error=str(e))
+
+
+# Local proxy preview — shown on the ReleaseDraft page within seconds of
+# upload, while the Coconut preview (if any) is still transcoding.
+PROXY_PREVIEW_HEIGHT = 360
+STORYBOARD_TILE_WIDTH = 160
+STORYBOARD_COLUMNS = 10
+STORYBOARD_MAX_TILES = 100
+
+
+def poster_time(duration: Optional[float]) -> float:
+    """Where to grab the poster frame: 10% in (past fade-ins), at most 10s."""
+    if not duration:
+        return 0.0
+    return round(min(duration * 0.1, 10.0), 3)
+
+
+def storyboard_interval(duration: Optional[float]) -> float:
+    """Seconds between storyboard tiles, so the sprite holds at most STORYBOARD_MAX_TILES."""
+    if not duration:
+        return 1.0
+    return max(1.0, round(duration / STORYBOARD_MAX_TILES, 3))
+
+
+def storyboard_tile_size(width: Optional[int], height: Optional[int]) -> tuple[int, int]:
+    """Tile width/height preserving the source aspect ratio (height kept even)."""
+    if not width or not height:
+        return STORYBOARD_TILE_WIDTH, 90
+    tile_height = round(STORYBOARD_TILE_WIDTH * height / width / 2) * 2
+    return STORYBOARD_TILE_WIDTH, max(2, tile_height)
+
+
+def build_poster_command(input_path: Path, output_path: Path, at_seconds: float) -> list[str]:
+    """Single JPEG frame, at most 720p."""
+    return [
+        "ffmpeg", "-y",
+        "-ss", str(at_seconds),
+        "-i", str(input_path),
+        "-frames:v", "1",
+        "-vf", "scale=-2:'min(720,ih)'",
+        "-q:v", "3",
+        str(output_path),
+    ]
+
+
+def build_storyboard_command(
+    input_path: Path,
+    output_path: Path,
+    interval: float,
+    tile_size: tuple[int, int],
+    tiles: int,
+) -> list[str]:
+    """
+    Storyboard sprite: one tile every `interval` seconds in a single JPEG.
+
+    Only keyframes are decoded (-skip_frame nokey), so this runs much
+    faster than real time even on long sources.
+    """
+    rows = max(1, -(-tiles // STORYBOARD_COLUMNS))
+    tile_w, tile_h = tile_size
+    return [
+        "ffmpeg", "-y",
+        "-skip_frame", "nokey",
+        "-i", str(input_path),
+        "-vf", f"fps=1/{interval},scale={tile_w}:{tile_h},tile={STORYBOARD_COLUMNS}x{rows}",
+        "-frames:v", "1",
+        "-an",
+        "-q:v", "5",
+        str(output_path),
+    ]
+
+
+def storyboard_vtt(
+    sprite_name: str,
+    duration: float,
+    interval: float,
+    tile_size: tuple[int, int],
+    tiles: int,
+) -> str:
+    """WebVTT thumbnail track mapping time ranges to sprite regions (#xywh=)."""
+    def ts(seconds: float) -> str:
+        ms = int(round(seconds * 1000))
+        return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+    tile_w, tile_h = tile_size
+    lines = ["WEBVTT", ""]
+    for i in range(tiles):
+        start = i * interval
+        if start >= duration:
+            break
+        end = min(duration, start + interval)
+        x, y = (i % STORYBOARD_COLUMNS) * tile_w, (i // STORYBOARD_COLUMNS) * tile_h
+        lines += [f"{ts(start)} --> {ts(end)}", f"{sprite_name}#xywh={x},{y},{tile_w},{tile_h}", ""]
+    return "\n".join(lines)
+
+
+def build_proxy_command(
+    input_path: Path,
+    output_path: Path,
+    seconds: Optional[float],
+    has_audio: bool = True,
+) -> list[str]:
+    """Low-bitrate 360p H.264/AAC MP4 of the first `seconds`, encoded ultrafast."""
+    cmd = ["ffmpeg", "-y", "-i", str(input_path)]
+    if seconds:
+        cmd.extend(["-t", str(seconds)])
+    cmd.extend([
+        "-map", "0:v:0",
+        "-vf", f"scale=-2:'min({PROXY_PREVIEW_HEIGHT},ih)'",
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "fastdecode",
+        "-crf", "30", "-maxrate", "600k", "-bufsize", "1200k",
+        "-pix_fmt", "yuv420p",
+    ])
+    if has_audio:
+        cmd.extend(["-map", "0:a:0", "-c:a", "aac", "-b:a", "64k", "-ac", "2"])
+    cmd.extend(["-movflags", "+faststart", str(output_path)])
+    return cmd
+
+
+async def make_poster(input_path: Path, output_path: Path, duration: Optional[float]) -> TranscodeResult:
+    error_msg = await _run_ffmpeg(build_poster_command(input_path, output_path, poster_time(duration)))
+    if error_msg or not output_path.exists():
+        return TranscodeResult(success=False, error=error_msg or "poster not created")
+    return TranscodeResult(success=True, output_path=output_path)
+
+
+async def make_storyboard(
+    input_path: Path,
+    sprite_path: Path,
+    vtt_path: Path,
+    duration: Optional[float],
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> TranscodeResult:
+    """Storyboard sprite plus its WebVTT track. output_path is the VTT file."""
+    if not duration:
+        return TranscodeResult(success=False, error="storyboard needs a known duration")
+    interval = storyboard_interval(duration)
+    tiles = min(STORYBOARD_MAX_TILES, max(1, int(duration // interval)))
+    tile_size = storyboard_tile_size(width, height)
+
+    error_msg = await _run_ffmpeg(build_storyboard_command(input_path, sprite_path, interval, tile_size, tiles))
+    if error_msg or not sprite_path.exists():
+        return TranscodeResult(success=False, error=error_msg or "storyboard not created")
+    vtt_path.write_text(storyboard_vtt(sprite_path.name, duration, interval, tile_size, tiles))
+    return TranscodeResult(success=True, output_path=vtt_path)
+
+
+async def make_proxy(
+    input_path: Path,
+    output_path: Path,
+    seconds: Optional[float],
+    has_audio: bool = True,
+) -> TranscodeResult:
+    error_msg = await _run_ffmpeg(build_proxy_command(input_path, output_path, seconds, has_audio))
+    if error_msg or not output_path.exists():
+        return TranscodeResult(success=False, error=error_msg or "proxy not created")
+    return TranscodeResult(success=True, output_path=output_path)
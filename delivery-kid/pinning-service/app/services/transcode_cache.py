@@ -0,0 +1,192 @@
+"""Content-addressed cache of transcode outputs.
+
+Keyed by the SHA-256 of the source file plus every encode parameter that
+affects the output (codec, quality, trim, embedded metadata, ...). A
+re-upload of the same master, or a finalize retried after an unrelated
+IPFS failure, gets its OGG/FLAC/HLS outputs back without running ffmpeg.
+
+Layout under {staging_dir}/cache/transcode/:
+
+    {key}/output      the cached file or directory
+    {key}/meta.json   size and parameters; its mtime is the last-use time
+
+Entries are evicted least-recently-used first once the total size exceeds
+the configured byte budget.
+
+Restored outputs are hardlinked to the cache where possible, so callers
+must replace output files rather than modify them in place.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from ..config import get_settings
+from .placement import place_tree
+from .workers import run_cpu
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# (path, size, mtime_ns) -> sha256 hex, so each input is only hashed once.
+# Filled from worker threads, so only touched under the lock.
+_digest_memo: dict[tuple[str, int, int], str] = {}
+_digest_memo_lock = threading.Lock()
+_DIGEST_MEMO_MAX = 1024
+
+
+def _file_sha256_sync(path: Path) -> str:
+    st = path.stat()
+    memo_key = (str(path), st.st_size, st.st_mtime_ns)
+    with _digest_memo_lock:
+        cached = _digest_memo.get(memo_key)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    result = digest.hexdigest()
+
+    with _digest_memo_lock:
+        if len(_digest_memo) >= _DIGEST_MEMO_MAX:
+            _digest_memo.clear()
+        _digest_memo[memo_key] = result
+    return result
+
+
+async def file_sha256(path: Path) -> str:
+    """SHA-256 of a file, computed off the event loop."""
+    return await run_cpu(_file_sha256_sync, path)
+
+
+def _tree_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class TranscodeCache:
+    """LRU cache of transcode outputs with a total byte budget."""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[int, float]] = {}  # key -> (size, last_used)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(source_sha256: str, **params) -> str:
+        """Derive a cache key from the source digest and encode parameters."""
+        material = json.dumps({"source": source_sha256, **params}, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for size, _ in self._entries.values())
+
+    def _load_index(self) -> None:
+        for entry_dir in self.root.iterdir():
+            meta_path = entry_dir / "meta.json"
+            try:
+                meta = json.loads(meta_path.read_text())
+                self._entries[entry_dir.name] = (int(meta["size"]), meta_path.stat().st_mtime)
+            except (OSError, ValueError, KeyError):
+                # Half-written entry or stray file from a crash
+                shutil.rmtree(entry_dir, ignore_errors=True)
+        logger.info(
+            "Transcode cache: %d entries, %.1f MB",
+            len(self._entries), self.total_bytes / (1024 ** 2)
+        )
+
+    def restore(self, key: str, dest: Path) -> bool:
+        """Place the cached output for key at dest. Returns False on a miss."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+        entry_dir = self.root / key
+        try:
+            place_tree(entry_dir / "output", dest)
+            now = time.time()
+            os.utime(entry_dir / "meta.json", (now, now))
+        except OSError as e:
+            logger.warning("Transcode cache entry %s unreadable, dropping: %s", key[:12], e)
+            self._drop(key)
+            return False
+        with self._lock:
+            size, _ = self._entries.get(key, (0, 0.0))
+            self._entries[key] = (size, now)
+        return True
+
+    def store(self, key: str, output: Path, params: Optional[dict] = None) -> None:
+        """Add a freshly produced output (file or directory) to the cache."""
+        size = _tree_size(output)
+        if size > self.max_bytes:
+            return
+
+        tmp_dir = self.root / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp_dir.mkdir()
+            place_tree(output, tmp_dir / "output")
+            (tmp_dir / "meta.json").write_text(json.dumps({
+                "size": size,
+                "params": params or {},
+                "created_at": time.time(),
+            }, default=str))
+            try:
+                tmp_dir.rename(self.root / key)
+            except OSError:
+                # Another finalize stored the same key first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return
+        except OSError as e:
+            logger.warning("Failed to cache transcode output %s: %s", output, e)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        with self._lock:
+            self._entries[key] = (size, time.time())
+        self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Evict least-recently-used entries until under budget. Returns bytes freed."""
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        freed = 0
+        while True:
+            with self._lock:
+                total = sum(size for size, _ in self._entries.values())
+                if total <= budget or not self._entries:
+                    return freed
+                key = min(self._entries, key=lambda k: self._entries[k][1])
+                size, _ = self._entries[key]
+            self._drop(key)
+            freed += size
+            logger.info("Evicted transcode cache entry %s (%d bytes)", key[:12], size)
+
+    def _drop(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+
+@lru_cache
+def get_transcode_cache() -> Optional[TranscodeCache]:
+    """Return the process-wide transcode cache, or None if disabled."""
+    settings = get_settings()
+    if settings.transcode_cache_max_gb <= 0:
+        return None
+    root = Path(settings.staging_dir) / "cache" / "transcode"
+    return TranscodeCache(root, int(settings.transcode_cache_max_gb * 1024 ** 3))
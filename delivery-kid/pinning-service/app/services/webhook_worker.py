@@ -0,0 +1,98 @@
+"""Background processing of accepted webhooks.
+
+Webhook handlers persist the event on the job record and enqueue the job
+ID here, so the HTTP response can go out immediately. A small pool of
+worker tasks drains the queue; a job ID that is already queued or being
+processed is not enqueued twice. A handler that fails transiently can
+keep the event on the job and ask for retry_later().
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookWorker:
+    """Bounded pool of tasks running `handler(job_id)` for queued jobs."""
+
+    def __init__(self, handler: Callable[[str], Awaitable[None]], concurrency: int = 2):
+        self.handler = handler
+        self.concurrency = concurrency
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._pending: set[str] = set()  # Queued or in progress
+        self._tasks: list[asyncio.Task] = []
+        self._retries: set[asyncio.TimerHandle] = set()
+
+    def enqueue(self, job_id: str) -> bool:
+        """Queue a job for processing. Returns False if it is already pending."""
+        if job_id in self._pending:
+            return False
+        self._pending.add(job_id)
+        self._queue.put_nowait(job_id)
+        return True
+
+    def is_pending(self, job_id: str) -> bool:
+        return job_id in self._pending
+
+    def retry_later(self, job_id: str, delay: float) -> None:
+        """Enqueue a job again after delay seconds (e.g. from its own handler)."""
+        def fire():
+            self._retries.discard(handle)
+            self.enqueue(job_id)
+        handle = asyncio.get_running_loop().call_later(delay, fire)
+        self._retries.add(handle)
+
+    async def _run(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.handler(job_id)
+            except Exception as e:
+                logger.error("[%s] Webhook processing failed: %s", job_id, e)
+            finally:
+                self._pending.discard(job_id)
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed."""
+        await self._queue.join()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        # Pending retries keep their event on the job; startup re-queues them
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+# Global worker instance
+_worker: Optional[WebhookWorker] = None
+
+
+def get_webhook_worker() -> Optional[WebhookWorker]:
+    """Get the global webhook worker."""
+    return _worker
+
+
+def init_webhook_worker(handler: Callable[[str], Awaitable[None]], concurrency: int = 2) -> WebhookWorker:
+    """Initialize and start the global webhook worker."""
+    global _worker
+    _worker = WebhookWorker(handler, concurrency)
+    _worker.start()
+    return _worker
+
+
+async def stop_webhook_worker() -> None:
+    """Stop the global webhook worker. Unfinished jobs are re-queued on next startup."""
+    global _worker
+    if _worker:
+        await _worker.stop()
+        _worker = None
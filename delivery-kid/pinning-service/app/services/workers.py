@@ -0,0 +1,181 @@
+"""Worker pools for blocking filesystem and CPU work.
+
+Async handlers must not block the event loop: while an rmtree, a tar
+extraction or a torrent hash runs inline, /health and every SSE stream
+stall with it. Blocking calls go through one of three fixed-size thread
+pools instead:
+
+    io     filesystem work: rmtree, copytree/links, scans, tar extraction
+    cpu    hashing: file digests, torrent piece hashing
+    serve  reads for staged file downloads (media_server)
+
+Keeping them separate means a long hash cannot starve the short
+filesystem operations a request is waiting on (and vice versa), a busy
+download cannot queue behind a cleanup (or hold one up), and the thread
+counts put a hard bound on how much of each runs at once. Excess calls
+wait in the pool's queue.
+
+Each pool records, per operation (the called function's qualified name),
+how long calls waited for a thread and how long they ran; /health reports
+them.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_IO_THREADS = 8
+DEFAULT_SERVE_THREADS = 4
+
+# Calls that waited longer than this for a thread are logged
+SLOW_QUEUE_WAIT_SECONDS = 2.0
+
+
+@dataclass
+class OperationStats:
+    """Queue-wait and run-time totals for one kind of blocking call."""
+    calls: int = 0
+    errors: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+    run_total: float = 0.0
+    run_max: float = 0.0
+
+    def record(self, wait: float, run: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.run_total += run
+        self.run_max = max(self.run_max, run)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wait_avg_ms": round(self.wait_total / self.calls * 1000, 1) if self.calls else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 1),
+            "run_avg_ms": round(self.run_total / self.calls * 1000, 1) if self.calls else 0.0,
+            "run_max_ms": round(self.run_max * 1000, 1),
+        }
+
+
+class WorkerPool:
+    """A fixed number of threads running blocking calls for the event loop."""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.queued = 0
+        self.running = 0
+        self.operations: dict[str, OperationStats] = {}
+        self._lock = threading.Lock()  # Stats are updated from the worker threads
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=f"worker-{name}")
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run func(*args, **kwargs) on a pool thread and await its result."""
+        label = getattr(func, "__qualname__", None) or repr(func)
+        context = contextvars.copy_context()
+        submitted = time.monotonic()
+        with self._lock:
+            self.queued += 1
+
+        def call() -> T:
+            started = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+            failed = True
+            try:
+                result = context.run(func, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                finished = time.monotonic()
+                with self._lock:
+                    self.running -= 1
+                    self.operations.setdefault(label, OperationStats()).record(
+                        started - submitted, finished - started, failed
+                    )
+                if started - submitted > SLOW_QUEUE_WAIT_SECONDS:
+                    logger.warning(
+                        "%s waited %.1fs for a %s worker", label, started - submitted, self.name
+                    )
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "threads": self.max_workers,
+                "running": self.running,
+                "queued": self.queued,
+                "operations": {label: s.as_dict() for label, s in sorted(self.operations.items())},
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting work; calls still queued are cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global pools, keyed "io" / "cpu" / "serve"
+_pools: dict[str, WorkerPool] = {}
+
+
+def _default_threads(kind: str) -> int:
+    if kind == "io":
+        return DEFAULT_IO_THREADS
+    if kind == "serve":
+        return DEFAULT_SERVE_THREADS
+    return os.cpu_count() or 2
+
+
+def get_worker_pool(kind: str) -> WorkerPool:
+    """Get a global pool ("io", "cpu" or "serve"), creating it with default sizes if needed."""
+    pool = _pools.get(kind)
+    if pool is None:
+        pool = _pools[kind] = WorkerPool(kind, _default_threads(kind))
+    return pool
+
+
+def init_worker_pools(io_threads: int = 0, cpu_threads: int = 0, serve_threads: int = 0) -> None:
+    """Initialize the global pools. 0 threads means the default for that pool."""
+    stop_worker_pools()
+    for kind, threads in (("io", io_threads), ("cpu", cpu_threads), ("serve", serve_threads)):
+        _pools[kind] = WorkerPool(kind, threads or _default_threads(kind))
+
+
+def stop_worker_pools() -> None:
+    """Shut the global pools down."""
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def worker_pools_status() -> dict:
+    return {kind: pool.status() for kind, pool in sorted(_pools.items())}
+
+
+async def run_io(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run blocking filesystem work on the io pool."""
+    return await get_worker_pool("io").run(func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run CPU-bound work (hashing) on the cpu pool."""
+    return await get_worker_pool("cpu").run(func, *args, **kwargs)
+
+
+async def run_serve(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a read for a file download on the serve pool."""
+    return await get_worker_pool("serve").run(func, *args, **kwargs)
@@ -0,0 +1,233 @@
+"""Tests for checkpointed album finalization in app.routes.drafts."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import Settings
+from app.models.draft import DraftFile, DraftState, FinalizeRequest
+from app.routes import drafts
+from app.services import ipfs, transcode
+
+
+def _draft(tmp_path, filenames):
+    draft_dir = tmp_path / "drafts" / "album-1"
+    upload_dir = draft_dir / "upload"
+    upload_dir.mkdir(parents=True)
+    files = []
+    for name in filenames:
+        (upload_dir / name).write_bytes(b"audio:" + name.encode())
+        files.append(DraftFile(
+            original_filename=name, detected_title=name, format="FLAC",
+            duration_seconds=1.0, sample_rate=44100, channels=2, size_bytes=10,
+        ))
+    now = datetime.now(timezone.utc)
+    state = DraftState(
+        draft_id="album-1", created_at=now, expires_at=now + timedelta(hours=1),
+        uploaded_by="0xabc", files=files,
+    )
+    drafts.save_draft_state(draft_dir, state)
+    return draft_dir
+
+
+def _request(filenames, album_title="Album"):
+    return FinalizeRequest(
+        album_title=album_title, artist="Artist",
+        tracks=[{"filename": name, "title": name.split(".")[0]} for name in filenames],
+    )
+
+
+class _Pipeline:
+    """Fake ffmpeg/IPFS steps that record what actually ran."""
+
+    def __init__(self, monkeypatch):
+        self.transcoded = []
+        self.added = []
+        self.assembled = []
+        self.trees = {}  # Named MFS trees that outlive an attempt
+        self.pin_ok = False
+
+        async def fake_ogg(input_path, output_path, metadata=None, **kwargs):
+            self.transcoded.append(output_path.name)
+            await asyncio.sleep(0.01)
+            output_path.write_bytes(b"ogg:" + input_path.read_bytes())
+            return transcode.TranscodeResult(success=True, output_path=output_path)
+
+        async def fake_flac(input_path, output_path, **kwargs):
+            self.transcoded.append(output_path.name)
+            output_path.write_bytes(b"flac:" + input_path.read_bytes())
+            return transcode.TranscodeResult(success=True, output_path=output_path)
+
+        async def fake_add_file(path, pin=True):
+            assert pin is False
+            self.added.append(path.name)
+            return ipfs.PinResult(success=True, cid=f"cid-{path.name}")
+
+        pipeline = self
+
+        class FakeAssembly:
+            def __init__(self, name=None):
+                self.name = name
+                self.entries = {}
+
+            @property
+            def tree(self):
+                return pipeline.trees.setdefault(self.name, {})
+
+            async def resume(self, entries):
+                held = {p: cid for p, cid in entries.items() if self.tree.get(p) == cid}
+                self.entries.update(held)
+                return held
+
+            async def link(self, rel_path, cid):
+                self.entries[rel_path] = cid
+                self.tree[rel_path] = cid
+
+            async def pin(self):
+                pipeline.assembled.append(dict(self.entries))
+                if not pipeline.pin_ok:
+                    return ipfs.PinResult(success=False, error="kubo unreachable")
+                return ipfs.PinResult(success=True, cid="bafyalbum")
+
+            async def close(self, keep=False):
+                if not keep:
+                    pipeline.trees.pop(self.name, None)
+
+        async def fake_discard_assembly(name):
+            pipeline.trees.pop(name, None)
+
+        monkeypatch.setattr(transcode, "transcode_flac_to_ogg", fake_ogg)
+        monkeypatch.setattr(transcode, "transcode_to_flac", fake_flac)
+        monkeypatch.setattr(ipfs, "add_file", fake_add_file)
+        monkeypatch.setattr(ipfs, "DirectoryAssembly", FakeAssembly)
+        monkeypatch.setattr(ipfs, "discard_assembly", fake_discard_assembly)
+
+
+async def _finalize(draft_dir, request, tmp_path):
+    state = drafts.load_draft_state(draft_dir)
+    settings = Settings(staging_dir=str(tmp_path))
+    return [
+        (m["event"], json.loads(m["data"]))
+        async for m in drafts.finalize_sse_generator("album-1", request, draft_dir, state, settings)
+    ]
+
+
+class TestCheckpointedFinalize:
+
+    @pytest.mark.asyncio
+    async def test_directory_assembled_from_per_file_cids(self, tmp_path, monkeypatch):
+        names = ["a.flac", "b.wav", "cover.jpg"]
+        draft_dir = _draft(tmp_path, names)
+        pipeline = _Pipeline(monkeypatch)
+        pipeline.pin_ok = True
+
+        events = await _finalize(draft_dir, _request(names), tmp_path)
+        assert events[-1][0] == "complete"
+        assert sorted(pipeline.transcoded) == ["01-a.ogg", "02-b.flac", "02-b.ogg"]
+        assert pipeline.assembled == [{
+            "flac/01-a.flac": "cid-01-a.flac",
+            "ogg/01-a.ogg": "cid-01-a.ogg",
+            "flac/02-b.flac": "cid-02-b.flac",
+            "ogg/02-b.ogg": "cid-02-b.ogg",
+            "cover.jpg": "cid-cover.jpg",
+            "metadata.json": "cid-metadata.json",
+        }]
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pin_failure_skips_transcode(self, tmp_path, monkeypatch):
+        names = ["a.flac", "b.flac"]
+        draft_dir = _draft(tmp_path, names)
+        pipeline = _Pipeline(monkeypatch)
+
+        events = await _finalize(draft_dir, _request(names), tmp_path)
+        assert events[-1][0] == "error"
+        assert sorted(pipeline.transcoded) == ["01-a.ogg", "02-b.ogg"]
+        # Draft (and its outputs) survive the failure
+        checkpoints = drafts.load_draft_state(draft_dir).finalize_checkpoints
+        assert set(checkpoints) == {"organize", "transcode", "metadata"}
+        assert set(checkpoints["transcode"].outputs) == {"ogg/01-a.ogg", "ogg/02-b.ogg"}
+        # The tree stays in MFS, keeping GC off the unpinned files
+        assert set(pipeline.trees["draft-album-1"]) == set(pipeline.assembled[0])
+
+        pipeline.transcoded.clear()
+        pipeline.added.clear()
+        pipeline.pin_ok = True
+        events = await _finalize(draft_dir, _request(names), tmp_path)
+        assert events[-1][0] == "complete"
+        assert events[-1][1]["cid"] == "bafyalbum"
+        assert pipeline.transcoded == []
+        assert pipeline.added == []
+        assert pipeline.assembled[0] == pipeline.assembled[1]
+        assert {data["stage"] for event, data in events if data.get("resumed")} == {
+            "organize", "transcode", "metadata"
+        }
+        assert not draft_dir.exists()
+        assert "draft-album-1" not in pipeline.trees
+
+    @pytest.mark.asyncio
+    async def test_retry_re_adds_files_the_tree_lost(self, tmp_path, monkeypatch):
+        names = ["a.flac", "b.flac"]
+        draft_dir = _draft(tmp_path, names)
+        pipeline = _Pipeline(monkeypatch)
+        await _finalize(draft_dir, _request(names), tmp_path)
+
+        # Kept tree lost one link (e.g. removed by hand): its blocks may be gone
+        del pipeline.trees["draft-album-1"]["ogg/02-b.ogg"]
+        pipeline.transcoded.clear()
+        pipeline.added.clear()
+        pipeline.pin_ok = True
+        events = await _finalize(draft_dir, _request(names), tmp_path)
+        assert events[-1][0] == "complete"
+        assert pipeline.transcoded == []
+        assert pipeline.added == ["02-b.ogg"]
+        assert pipeline.assembled[0] == pipeline.assembled[1]
+
+    @pytest.mark.asyncio
+    async def test_tampered_output_is_remade(self, tmp_path, monkeypatch):
+        names = ["a.flac", "b.flac"]
+        draft_dir = _draft(tmp_path, names)
+        pipeline = _Pipeline(monkeypatch)
+        await _finalize(draft_dir, _request(names), tmp_path)
+
+        (draft_dir / "album" / "ogg" / "02-b.ogg").write_bytes(b"corrupt")
+        pipeline.transcoded.clear()
+        await _finalize(draft_dir, _request(names), tmp_path)
+        assert pipeline.transcoded == ["02-b.ogg"]
+        assert (draft_dir / "album" / "ogg" / "02-b.ogg").read_bytes() == b"ogg:audio:b.flac"
+
+    @pytest.mark.asyncio
+    async def test_changed_request_starts_over(self, tmp_path, monkeypatch):
+        names = ["a.flac"]
+        draft_dir = _draft(tmp_path, names)
+        pipeline = _Pipeline(monkeypatch)
+        await _finalize(draft_dir, _request(names), tmp_path)
+
+        pipeline.transcoded.clear()
+        stale = pipeline.trees["draft-album-1"]
+        events = await _finalize(draft_dir, _request(names, album_title="Renamed"), tmp_path)
+        assert pipeline.transcoded == ["01-a.ogg"]
+        assert pipeline.trees["draft-album-1"] is not stale
+        assert not any(data.get("resumed") for _, data in events)
+        metadata = json.loads((draft_dir / "album" / "metadata.json").read_text())
+        assert metadata["album_title"] == "Renamed"
+
+
+@pytest.mark.asyncio
+async def test_sweep_drops_trees_of_removed_drafts(tmp_path, monkeypatch):
+    from app.services import cleanup
+
+    (tmp_path / "drafts" / "live").mkdir(parents=True)
+    discarded = []
+
+    async def fake_list_assemblies():
+        return ["draft-live", "draft-gone", "job-7"]
+
+    async def fake_discard_assembly(name):
+        discarded.append(name)
+
+    monkeypatch.setattr(ipfs, "list_assemblies", fake_list_assemblies)
+    monkeypatch.setattr(ipfs, "discard_assembly", fake_discard_assembly)
+    assert await cleanup.sweep_draft_assemblies(tmp_path) == 1
+    assert discarded == ["draft-gone"]
@@ -0,0 +1,96 @@
+"""Tests for app.auth — wallet signature verification and its cache."""
+
+import time
+
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from app import auth
+from app.auth import create_auth_message, verify_signature
+from app.config import Settings
+
+ACCOUNT = Account.create()
+
+
+def _sign(timestamp: int, account=ACCOUNT) -> str:
+    signed = account.sign_message(encode_defunct(text=create_auth_message(timestamp)))
+    return "0x" + signed.signature.hex().removeprefix("0x")
+
+
+@pytest.fixture
+def recoveries(monkeypatch):
+    """Count real public-key recoveries; start from an empty cache."""
+    monkeypatch.setattr(auth, "_recovered", type(auth._recovered)())
+    calls = []
+    original = Account.recover_message
+
+    def counting(message, signature):
+        calls.append(signature)
+        return original(message, signature=signature)
+
+    monkeypatch.setattr(auth.Account, "recover_message", counting)
+    return calls
+
+
+class TestVerifySignature:
+
+    def test_repeat_signature_recovered_once(self, recoveries):
+        settings = Settings(authorized_wallets="")
+        now_ms = int(time.time() * 1000)
+        signature = _sign(now_ms)
+
+        for _ in range(3):
+            result = verify_signature(signature, now_ms, settings)
+            assert result.valid and result.address == ACCOUNT.address
+        assert len(recoveries) == 1
+
+    def test_cached_signer_still_checked_against_allowlist(self, recoveries):
+        now_ms = int(time.time() * 1000)
+        signature = _sign(now_ms)
+        assert verify_signature(signature, now_ms, Settings(authorized_wallets="")).valid
+
+        other = Settings(authorized_wallets="0x0000000000000000000000000000000000000001")
+        result = verify_signature(signature, now_ms, other)
+        assert not result.valid and "not authorized" in result.error
+        assert len(recoveries) == 1
+
+    def test_cache_does_not_extend_the_window(self, recoveries, monkeypatch):
+        settings = Settings(authorized_wallets="", max_timestamp_drift_seconds=60)
+        now_ms = int(time.time() * 1000)
+        signature = _sign(now_ms)
+        assert verify_signature(signature, now_ms, settings).valid
+
+        later = time.time() + 120
+        monkeypatch.setattr(auth.time, "time", lambda: later)
+        result = verify_signature(signature, now_ms, settings)
+        assert not result.valid and "Timestamp" in result.error
+
+    def test_invalid_signatures_not_cached(self, recoveries):
+        settings = Settings(authorized_wallets="")
+        now_ms = int(time.time() * 1000)
+        for _ in range(2):
+            assert not verify_signature("0x1234", now_ms, settings).valid
+        assert len(recoveries) == 2
+        assert len(auth._recovered) == 0
+
+    def test_cache_is_bounded(self, recoveries, monkeypatch):
+        monkeypatch.setattr(auth, "_RECOVERED_MAX_ENTRIES", 2)
+        settings = Settings(authorized_wallets="")
+        now_ms = int(time.time() * 1000)
+        for offset in range(3):
+            assert verify_signature(_sign(now_ms + offset), now_ms + offset, settings).valid
+        assert len(auth._recovered) == 2
+
+    def test_recently_used_entry_survives_eviction(self, recoveries, monkeypatch):
+        monkeypatch.setattr(auth, "_RECOVERED_MAX_ENTRIES", 2)
+        settings = Settings(authorized_wallets="")
+        now_ms = int(time.time() * 1000)
+        first, second, third = (_sign(now_ms + offset) for offset in range(3))
+        assert verify_signature(first, now_ms, settings).valid
+        assert verify_signature(second, now_ms + 1, settings).valid
+        assert verify_signature(first, now_ms, settings).valid  # Hit: now most recent
+        assert verify_signature(third, now_ms + 2, settings).valid  # Evicts second
+
+        assert verify_signature(first, now_ms, settings).valid
+        assert recoveries == [first, second, third]
@@ -1,12 +1,19 @@
 """Tests for app.services.coconut — job config building and quality tiers."""
 
+import gzip
 import json
+import re
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
+import httpx
 import pytest
 
-from app.services.coconut import submit_to_coconut, save_job, load_job, list_jobs
+from app.services.coconut import (
+    discard_job_download, download_hls_outputs, process_completed_job, relay_hls_outputs_to_ipfs,
+    submit_to_coconut, save_job, load_job, list_jobs,
+)
+from app.services.ipfs import PinResult
 
 
 class TestJobConfigBuilding:
@@ -164,6 +171,312 @@ class TestJobPersistence:
         assert len(jobs) == 2
 
 
+class _Body(httpx.AsyncByteStream):
+    """Unread response body, like a real network stream."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+
+def _coconut_cdn(files: dict[str, bytes], fail_first: set[str] = frozenset(), gzipped: bool = False):
+    """MockTransport serving files by URL path; paths in fail_first 503 once."""
+    requests = []
+    failed = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        requests.append((request.method, path))
+        if path in fail_first and path not in failed:
+            failed.add(path)
+            return httpx.Response(503)
+        if path not in files:
+            return httpx.Response(404)
+        body = files[path]
+        headers = {}
+        if gzipped:
+            body = gzip.compress(body)
+            headers["content-encoding"] = "gzip"
+        headers["content-length"] = str(len(body))
+        if request.method == "HEAD":
+            return httpx.Response(200, headers=headers)
+        return httpx.Response(200, headers=headers, stream=_Body(body))
+
+    return httpx.MockTransport(handler), requests
+
+
+def _ladder_files(segments: int = 3) -> dict[str, bytes]:
+    files = {"/out/master.m3u8": b"#EXTM3U\n720p/playlist.m3u8\n"}
+    for quality in (720, 480):
+        lines = ["#EXTM3U", '#EXT-X-MAP:URI="init.mp4"']
+        files[f"/out/{quality}p/init.mp4"] = b"init"
+        for i in range(segments):
+            lines += ["#EXTINF:6.0,", f"segment_{i:03d}.m4s"]
+            files[f"/out/{quality}p/segment_{i:03d}.m4s"] = f"{quality}-{i}".encode() * 100
+        files[f"/out/{quality}p/playlist.m3u8"] = "\n".join(lines).encode()
+    return files
+
+
+_OUTPUTS = {
+    "hls_master": {"url": "https://cdn.test/out/master.m3u8"},
+    "hls_av1_720p": {"url": "https://cdn.test/out/720p/playlist.m3u8"},
+    "hls_av1_480p": {"url": "https://cdn.test/out/480p/playlist.m3u8"},
+}
+
+
+@pytest.fixture
+def client_with():
+    """Route every httpx.AsyncClient created in the code under test through a transport."""
+    real_client = httpx.AsyncClient
+
+    def install(transport):
+        return patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw))
+    return install
+
+
+class TestDownloadHlsOutputs:
+    """Test the concurrent, resumable Coconut segment downloader."""
+
+    @pytest.mark.asyncio
+    async def test_downloads_all_renditions(self, tmp_path, client_with):
+        files = _ladder_files()
+        transport, _ = _coconut_cdn(files)
+        with client_with(transport):
+            stats = await download_hls_outputs(_OUTPUTS, tmp_path, concurrency=2)
+
+        assert stats.downloaded == 8  # 2 renditions x (init + 3 segments)
+        assert stats.failed == 0
+        assert (tmp_path / "master.m3u8").exists()
+        assert (tmp_path / "480p" / "segment_002.m4s").read_bytes() == files["/out/480p/segment_002.m4s"]
+        assert (tmp_path / "720p" / "init.mp4").read_bytes() == b"init"
+        assert not list(tmp_path.rglob("*.part"))
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_complete_segments(self, tmp_path, client_with):
+        files = _ladder_files()
+        (tmp_path / "720p").mkdir()
+        (tmp_path / "720p" / "segment_000.m4s").write_bytes(files["/out/720p/segment_000.m4s"])
+        # Truncated leftover from an interrupted run must be re-fetched
+        (tmp_path / "720p" / "segment_001.m4s").write_bytes(b"720")
+
+        transport, requests = _coconut_cdn(files)
+        with client_with(transport):
+            stats = await download_hls_outputs(_OUTPUTS, tmp_path)
+
+        assert stats.skipped == 1
+        assert stats.downloaded == 7
+        assert ("GET", "/out/720p/segment_000.m4s") not in requests
+        assert (tmp_path / "720p" / "segment_001.m4s").read_bytes() == files["/out/720p/segment_001.m4s"]
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self, tmp_path, client_with):
+        files = _ladder_files(segments=1)
+        transport, _ = _coconut_cdn(files, fail_first={"/out/480p/segment_000.m4s"})
+        with client_with(transport), patch("app.services.coconut.asyncio.sleep", AsyncMock()):
+            stats = await download_hls_outputs(_OUTPUTS, tmp_path)
+
+        assert stats.failed == 0
+        assert (tmp_path / "480p" / "segment_000.m4s").exists()
+
+    @pytest.mark.asyncio
+    async def test_content_encoding_is_decoded(self, tmp_path, client_with):
+        files = _ladder_files(segments=1)
+        transport, _ = _coconut_cdn(files, gzipped=True)
+        with client_with(transport):
+            stats = await download_hls_outputs(_OUTPUTS, tmp_path)
+
+        assert stats.failed == 0
+        assert (tmp_path / "720p" / "segment_000.m4s").read_bytes() == files["/out/720p/segment_000.m4s"]
+
+    @pytest.mark.asyncio
+    async def test_missing_segment_fails_without_retry(self, tmp_path, client_with):
+        files = _ladder_files(segments=1)
+        del files["/out/720p/segment_000.m4s"]
+        transport, requests = _coconut_cdn(files)
+        with client_with(transport):
+            stats = await download_hls_outputs(_OUTPUTS, tmp_path)
+
+        assert stats.failed == 1
+        assert requests.count(("GET", "/out/720p/segment_000.m4s")) == 1
+
+
+class _FakeKubo:
+    """Wraps a CDN MockTransport handler and answers add / MFS / pin RPCs like kubo."""
+
+    def __init__(self, cdn_files: dict[str, bytes]):
+        self.cdn, self.cdn_requests = _coconut_cdn(cdn_files)
+        self.added: dict[str, bytes] = {}  # CID -> content
+        self.pin_params: list[str] = []
+        self.mfs: dict[str, str] = {}  # MFS path -> CID
+        self.copies = 0
+        self.pinned: list[str] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/api/v0/files/cp":
+            source, dest = request.url.params.get_list("arg")
+            self.mfs[dest] = source.removeprefix("/ipfs/")
+            self.copies += 1
+            return httpx.Response(200)
+        if path == "/api/v0/files/mkdir":
+            return httpx.Response(200)
+        if path == "/api/v0/files/rm":
+            arg = request.url.params["arg"]
+            self.mfs = {p: c for p, c in self.mfs.items() if p != arg and not p.startswith(arg + "/")}
+            return httpx.Response(200)
+        if path == "/api/v0/files/stat":
+            arg = request.url.params["arg"]
+            if arg in self.mfs:
+                return httpx.Response(200, json={"Hash": self.mfs[arg]})
+            if any(p.startswith(arg + "/") for p in self.mfs):
+                return httpx.Response(200, json={"Hash": "bafydir"})
+            return httpx.Response(500, text="file does not exist")
+        if path == "/api/v0/pin/add":
+            self.pinned.append(request.url.params["arg"])
+            return httpx.Response(200, json={"Pins": [request.url.params["arg"]]})
+        if path != "/api/v0/add":
+            return self.cdn.handler(request)
+        boundary = re.search(r"boundary=(\w+)", request.headers["content-type"]).group(1).encode()
+        body = request.content
+        filename = re.search(rb'filename="([^"]*)"', body).group(1).decode()
+        content = body.split(b"\r\n\r\n", 1)[1].rsplit(b"\r\n--" + boundary + b"--", 1)[0]
+        cid = f"cid-{filename}-{len(self.added)}"
+        self.added[cid] = content
+        self.pin_params.append(request.url.params["pin"])
+        return httpx.Response(200, json={"Name": filename, "Hash": cid})
+
+    @property
+    def transport(self):
+        return httpx.MockTransport(self.handler)
+
+
+class TestRelayToIpfs:
+    """Test piping Coconut outputs straight into kubo."""
+
+    @pytest.mark.asyncio
+    async def test_relay_adds_every_file_unpinned(self, client_with):
+        files = _ladder_files()
+        kubo = _FakeKubo(files)
+        with client_with(kubo.transport):
+            added, stats = await relay_hls_outputs_to_ipfs(_OUTPUTS, concurrency=3)
+
+        assert stats.failed == 0
+        assert set(added) == {
+            "master.m3u8",
+            *(f"{q}p/{name}" for q in (720, 480)
+              for name in ["playlist.m3u8", "init.mp4", "segment_000.m4s", "segment_001.m4s", "segment_002.m4s"]),
+        }
+        assert kubo.added[added["480p/segment_001.m4s"]] == files["/out/480p/segment_001.m4s"]
+        assert set(kubo.pin_params) == {"false"}
+
+    @pytest.mark.asyncio
+    async def test_process_completed_job_never_touches_disk(self, tmp_path, client_with):
+        files = _ladder_files(segments=1)
+        files["/out/preview.mp4"] = b"mp4" * 1000
+        outputs = {**_OUTPUTS, "mp4_preview": {"url": "https://cdn.test/out/preview.mp4"}}
+        kubo = _FakeKubo(files)
+        job = {"id": "job-1"}
+
+        with client_with(kubo.transport):
+            cid = await process_completed_job(job, outputs, tmp_path, "http://kubo")
+
+        assert cid == "bafydir"
+        assert kubo.pinned == ["bafydir"]
+        assert kubo.added[job["previewCid"]] == files["/out/preview.mp4"]
+        assert "true" in kubo.pin_params  # Preview is pinned directly
+        # Every HLS file was linked into the scratch MFS tree as it was added
+        assert kubo.copies == 7
+        assert kubo.mfs == {}  # Pinned, so the scratch tree is gone
+        assert list(tmp_path.iterdir()) == []
+        assert "relayedOutputs" not in job
+
+    @pytest.mark.asyncio
+    async def test_failed_segment_fails_job(self, tmp_path, client_with):
+        files = _ladder_files(segments=1)
+        del files["/out/720p/segment_000.m4s"]
+        kubo = _FakeKubo(files)
+        with client_with(kubo.transport):
+            cid = await process_completed_job({"id": "job-1"}, _OUTPUTS, tmp_path, "http://kubo")
+
+        assert cid is None
+        assert kubo.pinned == []
+
+    @pytest.mark.asyncio
+    async def test_retry_relays_only_what_is_missing(self, tmp_path, client_with):
+        files = _ladder_files(segments=2)
+        files["/out/preview.mp4"] = b"mp4" * 1000
+        outputs = {**_OUTPUTS, "mp4_preview": {"url": "https://cdn.test/out/preview.mp4"}}
+        missing = files.pop("/out/720p/segment_001.m4s")
+        kubo = _FakeKubo(files)
+        job = {"id": "job-1"}
+
+        with client_with(kubo.transport):
+            assert await process_completed_job(job, outputs, tmp_path, "http://kubo") is None
+        assert job["previewCid"]
+        assert len(job["relayedOutputs"]) == 8
+        # Kept: the relayed (unpinned) files stay referenced until the retry
+        assert len(kubo.mfs) == 8
+
+        files["/out/720p/segment_001.m4s"] = missing
+        kubo.cdn_requests.clear()
+        adds = len(kubo.added)
+        with client_with(kubo.transport):
+            assert await process_completed_job(job, outputs, tmp_path, "http://kubo") == "bafydir"
+
+        fetched = {path for method, path in kubo.cdn_requests if method == "GET"}
+        assert "/out/720p/segment_001.m4s" in fetched
+        assert "/out/720p/segment_000.m4s" not in fetched
+        assert "/out/preview.mp4" not in fetched
+        assert len(kubo.added) == adds + 1
+        assert kubo.pinned == ["bafydir"]
+        assert kubo.mfs == {}
+        assert "relayedOutputs" not in job
+
+    @pytest.mark.asyncio
+    async def test_discard_drops_the_kept_tree(self, tmp_path, client_with):
+        files = _ladder_files(segments=1)
+        del files["/out/720p/segment_000.m4s"]
+        kubo = _FakeKubo(files)
+        with client_with(kubo.transport):
+            assert await process_completed_job({"id": "job-1"}, _OUTPUTS, tmp_path, "http://kubo") is None
+            assert kubo.mfs
+            await discard_job_download(tmp_path, "job-1")
+        assert kubo.mfs == {}
+
+
+class TestProcessFromDisk:
+    """stream_to_ipfs=False: download to staging, then add the directory."""
+
+    @pytest.mark.asyncio
+    async def test_partial_download_is_kept_and_resumed(self, tmp_path, client_with):
+        files = _ladder_files(segments=2)
+        missing = files.pop("/out/720p/segment_001.m4s")
+        add_directory = AsyncMock(return_value=PinResult(success=True, cid="bafydisk"))
+        hls_dir = tmp_path / "hls-job-1"
+
+        transport, _ = _coconut_cdn(files)
+        with client_with(transport), patch("app.services.ipfs.add_directory", add_directory):
+            cid = await process_completed_job(
+                {"id": "job-1"}, _OUTPUTS, tmp_path, "http://kubo", stream_to_ipfs=False
+            )
+        assert cid is None
+        add_directory.assert_not_awaited()
+        assert (hls_dir / "720p" / "segment_000.m4s").exists()
+
+        files["/out/720p/segment_001.m4s"] = missing
+        transport, requests = _coconut_cdn(files)
+        with client_with(transport), patch("app.services.ipfs.add_directory", add_directory):
+            cid = await process_completed_job(
+                {"id": "job-1"}, _OUTPUTS, tmp_path, "http://kubo", stream_to_ipfs=False
+            )
+        assert cid == "bafydisk"
+        assert ("GET", "/out/720p/segment_000.m4s") not in requests
+        assert ("GET", "/out/720p/segment_001.m4s") in requests
+        assert not hls_dir.exists()
+
+
 class TestContentFinalizeRequest:
     """Test the transcoding_qualities field on ContentFinalizeRequest."""
 
@@ -181,3 +494,10 @@ class TestContentFinalizeRequest:
         from app.models.content import ContentFinalizeRequest
         req = ContentFinalizeRequest()
         assert req.transcoding_strategy == "auto"
+
+    def test_unknown_hls_layout_rejected(self):
+        from pydantic import ValidationError
+        from app.models.content import ContentFinalizeRequest
+        assert ContentFinalizeRequest(hls_layout="fmp4_single").hls_layout == "fmp4_single"
+        with pytest.raises(ValidationError):
+            ContentFinalizeRequest(hls_layout="fmp4-single")
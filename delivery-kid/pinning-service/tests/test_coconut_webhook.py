@@ -0,0 +1,198 @@
+"""Tests for the Coconut webhook — async acknowledgement and idempotency."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.routes.coconut import process_webhook_event, router
+from app.services.coconut import load_job, pending_webhook_job_ids, save_job
+from app.services.webhook_worker import WebhookWorker
+
+COMPLETED = {"event": "job.completed", "outputs": {"hls_master": {"url": "https://cdn.test/master.m3u8"}}}
+
+
+def make_client(settings: Settings) -> TestClient:
+    test_app = FastAPI()
+    test_app.include_router(router)
+    test_app.dependency_overrides[get_settings] = lambda: settings
+    return TestClient(test_app)
+
+
+@pytest.fixture
+def settings(tmp_path):
+    save_job(tmp_path, "job-1", {"id": "job-1", "status": "processing"})
+    return Settings(staging_dir=str(tmp_path), api_key="test-secret", authorized_wallets="")
+
+
+class TestWebhookAcknowledgement:
+
+    def test_returns_202_and_processes_in_background(self, settings, tmp_path):
+        process = AsyncMock(return_value="bafyhls")
+        with patch("app.routes.coconut.process_completed_job", process):
+            resp = make_client(settings).post("/webhook/coconut?job_id=job-1", json=COMPLETED)
+
+        assert resp.status_code == 202
+        assert resp.json() == {"received": True, "duplicate": False}
+        process.assert_awaited_once()
+        job = load_job(tmp_path, "job-1")
+        assert job["status"] == "complete"
+        assert job["hlsCid"] == "bafyhls"
+        assert "pendingEvent" not in job
+
+    def test_redelivery_is_not_reprocessed(self, settings):
+        process = AsyncMock(return_value="bafyhls")
+        client = make_client(settings)
+        with patch("app.routes.coconut.process_completed_job", process):
+            client.post("/webhook/coconut?job_id=job-1", json=COMPLETED)
+            resp = client.post("/webhook/coconut?job_id=job-1", json=COMPLETED)
+
+        assert resp.status_code == 202
+        assert resp.json()["duplicate"] is True
+        assert process.await_count == 1
+
+    def test_idempotency_key_header(self, settings, tmp_path):
+        client = make_client(settings)
+        headers = {"Idempotency-Key": "delivery-42"}
+        # Non-actionable event: only the key is recorded
+        client.post("/webhook/coconut?job_id=job-1", json={"event": "job.progress"}, headers=headers)
+        resp = client.post("/webhook/coconut?job_id=job-1", json=COMPLETED, headers=headers)
+
+        assert resp.json()["duplicate"] is True
+        assert load_job(tmp_path, "job-1")["status"] == "processing"
+
+    def test_status_hides_webhook_bookkeeping(self, settings, tmp_path):
+        job = load_job(tmp_path, "job-1")
+        job["pendingEvent"] = COMPLETED
+        job["webhookKeys"] = ["abc"]
+        save_job(tmp_path, "job-1", job)
+
+        body = make_client(settings).get("/job/job-1").json()
+        assert body == {"id": "job-1", "status": "processing"}
+        assert "pendingEvent" in load_job(tmp_path, "job-1")
+
+    def test_unknown_job(self, settings):
+        resp = make_client(settings).post("/webhook/coconut?job_id=nope", json=COMPLETED)
+        assert resp.status_code == 404
+
+
+class TestWebhookProcessing:
+
+    @pytest.mark.asyncio
+    async def test_pending_event_survives_restart(self, settings, tmp_path):
+        job = load_job(tmp_path, "job-1")
+        job["pendingEvent"] = {"event": "job.failed", "error": "bad source"}
+        save_job(tmp_path, "job-1", job)
+        assert pending_webhook_job_ids(tmp_path) == ["job-1"]
+
+        await process_webhook_event(settings, "job-1")
+
+        job = load_job(tmp_path, "job-1")
+        assert job["status"] == "failed"
+        assert job["error"] == "bad source"
+        assert pending_webhook_job_ids(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_finished_job_is_not_repinned(self, settings, tmp_path):
+        save_job(tmp_path, "job-1", {
+            "id": "job-1", "status": "complete", "hlsCid": "bafyold", "pendingEvent": COMPLETED,
+        })
+        process = AsyncMock(return_value="bafynew")
+        with patch("app.routes.coconut.process_completed_job", process):
+            await process_webhook_event(settings, "job-1")
+
+        process.assert_not_awaited()
+        assert load_job(tmp_path, "job-1")["hlsCid"] == "bafyold"
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_is_retried(self, settings, tmp_path):
+        job = load_job(tmp_path, "job-1")
+        job["pendingEvent"] = COMPLETED
+        save_job(tmp_path, "job-1", job)
+        process = AsyncMock(side_effect=[None, RuntimeError("kubo unreachable"), "bafyhls"])
+        retries = []
+
+        with patch("app.routes.coconut.process_completed_job", process), \
+                patch("app.routes.coconut._retry_later", lambda s, job_id, delay: retries.append(delay)):
+            for _ in range(2):
+                await process_webhook_event(settings, "job-1")
+                job = load_job(tmp_path, "job-1")
+                assert job["status"] == "processing"
+                assert job["pendingEvent"] == COMPLETED
+            assert job["lastError"] == "kubo unreachable"
+            await process_webhook_event(settings, "job-1")
+
+        assert retries == [30, 60]
+        job = load_job(tmp_path, "job-1")
+        assert job["status"] == "complete" and job["hlsCid"] == "bafyhls"
+        assert pending_webhook_job_ids(tmp_path) == []
+
+    @pytest.mark.asyncio
+    async def test_fails_once_attempts_run_out(self, settings, tmp_path):
+        job = load_job(tmp_path, "job-1")
+        job["pendingEvent"] = COMPLETED
+        save_job(tmp_path, "job-1", job)
+        process = AsyncMock(return_value=None)
+
+        with patch("app.routes.coconut.process_completed_job", process), \
+                patch("app.routes.coconut._retry_later", lambda *args: None):
+            for _ in range(4):
+                await process_webhook_event(settings, "job-1")
+
+        assert process.await_count == 4
+        job = load_job(tmp_path, "job-1")
+        assert job["status"] == "failed"
+        assert "pendingEvent" not in job
+
+
+class TestWebhookWorker:
+
+    @pytest.mark.asyncio
+    async def test_same_job_queued_once(self):
+        started = asyncio.Event()
+        release = asyncio.Event()
+        calls = []
+
+        async def handler(job_id):
+            calls.append(job_id)
+            started.set()
+            await release.wait()
+
+        worker = WebhookWorker(handler, concurrency=2)
+        worker.start()
+        try:
+            assert worker.enqueue("job-1")
+            await started.wait()
+            assert not worker.enqueue("job-1")  # In progress
+            release.set()
+            await worker.join()
+            assert not worker.is_pending("job-1")
+            assert worker.enqueue("job-1")  # Finished, so it can run again
+            await worker.join()
+        finally:
+            await worker.stop()
+
+        assert calls == ["job-1", "job-1"]
+
+    @pytest.mark.asyncio
+    async def test_retry_later(self):
+        calls = []
+
+        async def handler(job_id):
+            calls.append(job_id)
+
+        worker = WebhookWorker(handler)
+        worker.start()
+        try:
+            worker.retry_later("job-1", 0.01)
+            worker.retry_later("job-2", 60)
+            await asyncio.sleep(0.05)
+            await worker.join()
+        finally:
+            await worker.stop()
+
+        assert calls == ["job-1"]
+        assert not worker._retries
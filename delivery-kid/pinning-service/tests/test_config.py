@@ -3,7 +3,10 @@
 import os
 from unittest.mock import patch
 
-from app.config import get_commit
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings, get_commit
 
 
 class TestGetCommit:
@@ -18,3 +21,10 @@ class TestGetCommit:
             env.pop("GIT_COMMIT", None)
             with patch.dict(os.environ, env, clear=True):
                 assert get_commit() == "unknown"
+
+
+class TestSettings:
+    def test_hls_layout_validated(self):
+        assert Settings(hls_layout="fmp4").hls_layout == "fmp4"
+        with pytest.raises(ValidationError):
+            Settings(hls_layout="single_file")
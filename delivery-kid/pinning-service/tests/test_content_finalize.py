@@ -0,0 +1,58 @@
+"""Tests for content draft finalization in app.routes.content."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import Settings
+from app.models.content import ContentDraftState, ContentFile, ContentFinalizeRequest
+from app.routes import content
+from app.services import cleanup, ipfs
+from app.services.cleanup import StagingSpace
+from app.services.ipfs import PinResult
+
+
+@pytest.fixture
+def draft(tmp_path):
+    draft_id = str(uuid.uuid4())
+    draft_dir = tmp_path / "drafts" / draft_id
+    (draft_dir / "upload").mkdir(parents=True)
+    (draft_dir / "upload" / "notes.pdf").write_bytes(b"pdf")
+    now = datetime.now(timezone.utc)
+    state = ContentDraftState(
+        draft_id=draft_id, created_at=now, expires_at=now + timedelta(hours=1), uploaded_by="0xabc",
+        files=[ContentFile(original_filename="notes.pdf", detected_title="notes", media_type="other",
+                           format="PDF", size_bytes=3)],
+    )
+    content.save_draft_state(draft_dir, state)
+    return draft_id, draft_dir, state
+
+
+class TestFinalizeRetry:
+
+    @pytest.mark.asyncio
+    async def test_retry_starts_from_empty_output(self, tmp_path, draft, monkeypatch):
+        draft_id, draft_dir, state = draft
+        # A failed attempt's leftovers (e.g. segments from an abandoned encode)
+        (draft_dir / "output" / "hls").mkdir(parents=True)
+        (draft_dir / "output" / "hls" / "segment_000.ts").write_bytes(b"s" * 1000)
+        space = StagingSpace(tmp_path, max_bytes=0)
+        await space.reconcile()
+        monkeypatch.setattr(cleanup, "_space", space)
+
+        pinned = []
+
+        async def add_directory(path):
+            pinned.extend(sorted(p.relative_to(path).as_posix() for p in path.rglob("*")))
+            return PinResult(success=False, error="kubo down")
+
+        monkeypatch.setattr(ipfs, "add_directory", add_directory)
+        events = [e["event"] async for e in content.finalize_sse_generator(
+            draft_id, ContentFinalizeRequest(title="Notes"), draft_dir, state, Settings(staging_dir=str(tmp_path)),
+        )]
+
+        assert events[-1] == "error"
+        assert pinned == ["metadata.json", "notes.pdf"]
+        assert draft_dir.exists()  # Kept for the next retry
+        assert space.ledger[f"drafts/{draft_id}"] < 1000
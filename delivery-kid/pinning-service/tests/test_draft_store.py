@@ -0,0 +1,74 @@
+"""Tests for app.services.draft_store — cached draft.json access."""
+
+import asyncio
+import json
+
+import pytest
+
+from app.services.draft_store import DraftStore
+
+
+@pytest.fixture
+def draft_dir(tmp_path):
+    path = tmp_path / "drafts" / "d1"
+    path.mkdir(parents=True)
+    return path
+
+
+class TestDraftStore:
+
+    def test_reads_are_cached_until_the_file_changes(self, draft_dir):
+        store = DraftStore()
+        store.write(draft_dir, {"preview_status": "pending"})
+        assert store.read(draft_dir) == {"preview_status": "pending"}
+        assert store.read(draft_dir) == {"preview_status": "pending"}
+        assert (store.hits, store.misses) == (2, 0)
+
+        # Written behind the store's back (another process, an old writer)
+        (draft_dir / "draft.json").write_text(json.dumps({"preview_status": "ready!"}))
+        assert store.read(draft_dir) == {"preview_status": "ready!"}
+        assert store.misses == 1
+
+    def test_callers_get_copies(self, draft_dir):
+        store = DraftStore()
+        store.write(draft_dir, {"files": [{"name": "a"}]})
+        store.read(draft_dir)["files"].append({"name": "b"})
+        assert store.read(draft_dir) == {"files": [{"name": "a"}]}
+
+    def test_write_replaces_atomically(self, draft_dir):
+        store = DraftStore()
+        store.write(draft_dir, {"v": 1})
+        inode = (draft_dir / "draft.json").stat().st_ino
+        store.write(draft_dir, {"v": 2})
+        assert (draft_dir / "draft.json").stat().st_ino != inode
+        assert [p.name for p in draft_dir.iterdir()] == ["draft.json"]
+
+    def test_missing_or_corrupt(self, draft_dir):
+        store = DraftStore()
+        assert store.read(draft_dir) is None
+        (draft_dir / "draft.json").write_text('{"v": ')
+        assert store.read(draft_dir) is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_updates_are_serialized(self, draft_dir):
+        store = DraftStore()
+        store.write(draft_dir, {"count": 0, "fields": {}})
+
+        def bump(name):
+            def mutate(data):
+                data["count"] += 1
+                data["fields"][name] = True
+            return mutate
+
+        await asyncio.gather(*(store.update(draft_dir, bump(f"f{i}")) for i in range(10)))
+        data = json.loads((draft_dir / "draft.json").read_text())
+        assert data["count"] == 10
+        assert len(data["fields"]) == 10
+
+    @pytest.mark.asyncio
+    async def test_update_of_removed_draft(self, draft_dir):
+        store = DraftStore()
+        assert await store.update(draft_dir, lambda data: data.update(x=1)) is None
+        store.write(draft_dir, {"x": 0})
+        store.forget(draft_dir)
+        assert store.status()["cached"] == 0
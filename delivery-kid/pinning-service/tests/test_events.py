@@ -0,0 +1,111 @@
+"""Tests for app.services.events — pub/sub hub behind the SSE/long-poll endpoints."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.routes.coconut import router as coconut_router
+from app.services.coconut import save_job
+from app.services.events import EventHub, get_event_hub, stream_topic
+
+
+class TestEventHub:
+
+    @pytest.mark.asyncio
+    async def test_subscribers_receive_published_messages(self):
+        hub = EventHub()
+        with hub.subscribe("job:1") as queue:
+            hub.publish("job:1", "job", {"status": "complete"})
+            hub.publish("job:2", "job", {"status": "other"})
+            message = queue.get_nowait()
+            assert message == {"event": "job", "data": {"status": "complete"}, "version": 1}
+            assert queue.empty()
+        assert hub.subscriber_count("job:1") == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_returns_immediately_when_behind(self):
+        hub = EventHub()
+        hub.publish("t", "e", {"n": 1})
+        version, message = await hub.wait_for_change("t", since=0, timeout=5)
+        assert version == 1
+        assert message["data"] == {"n": 1}
+
+    @pytest.mark.asyncio
+    async def test_wait_wakes_on_publish(self):
+        hub = EventHub()
+        hub.publish("t", "e", {"n": 1})
+        waiter = asyncio.create_task(hub.wait_for_change("t", since=1, timeout=5))
+        await asyncio.sleep(0)
+        hub.publish("t", "e", {"n": 2})
+        version, message = await asyncio.wait_for(waiter, 1)
+        assert version == 2
+        assert message["data"] == {"n": 2}
+
+    @pytest.mark.asyncio
+    async def test_wait_times_out_unchanged(self):
+        hub = EventHub()
+        hub.publish("t", "e", {"n": 1})
+        assert (await hub.wait_for_change("t", since=1, timeout=0.01))[0] == 1
+
+    def test_topic_limit(self):
+        hub = EventHub(max_topics=2)
+        for topic in ("a", "b", "c"):
+            hub.publish(topic, "e", {})
+        assert hub.latest("a") == (0, None)
+        assert hub.latest("c")[0] == 1
+
+
+class TestStreamTopic:
+
+    @pytest.mark.asyncio
+    async def test_snapshot_then_changes_until_final(self):
+        stream = stream_topic(
+            "draft:test-stream",
+            lambda: ("preview", {"preview_status": "processing"}),
+            lambda event, data: event == "complete",
+        )
+        first = await stream.__anext__()
+        assert first["event"] == "preview"
+        assert json.loads(first["data"]) == {"preview_status": "processing"}
+
+        hub = get_event_hub()
+        hub.publish("draft:test-stream", "progress", {"stage": "pin"})
+        hub.publish("draft:test-stream", "complete", {"cid": "bafy"})
+        events = [message["event"] async for message in stream]
+        assert events == ["progress", "complete"]
+
+
+class TestJobEndpoints:
+
+    @pytest.fixture
+    def client(self, tmp_path):
+        settings = Settings(staging_dir=str(tmp_path), api_key="test-secret", authorized_wallets="")
+        save_job(tmp_path, "job-ev", {"id": "job-ev", "status": "processing"})
+        test_app = FastAPI()
+        test_app.include_router(coconut_router)
+        test_app.dependency_overrides[get_settings] = lambda: settings
+        return TestClient(test_app)
+
+    def test_long_poll(self, client):
+        first = client.get("/job/job-ev/wait").json()
+        assert first["changed"] is True
+        assert first["job"]["status"] == "processing"
+
+        again = client.get(f"/job/job-ev/wait?since={first['version']}&timeout=0").json()
+        assert again["changed"] is False
+        assert again["version"] == first["version"]
+
+    def test_stream_ends_when_job_finished(self, client, tmp_path):
+        save_job(tmp_path, "job-ev", {"id": "job-ev", "status": "complete", "hlsCid": "bafy"})
+        with client.stream("GET", "/job/job-ev/events") as resp:
+            body = "".join(resp.iter_text())
+        assert "event: job" in body
+        assert '"hlsCid": "bafy"' in body
+
+    def test_unknown_job(self, client):
+        assert client.get("/job/nope/wait").status_code == 404
+        assert client.get("/job/nope/events").status_code == 404
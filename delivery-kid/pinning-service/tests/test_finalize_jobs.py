@@ -0,0 +1,175 @@
+"""Tests for app.services.finalize_jobs — detached finalize with a replayable log."""
+
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.routes.content import router as content_router
+from app.services import finalize_jobs
+from app.services.finalize_jobs import (
+    cleanup_finalize_logs,
+    find_finalize_job,
+    parse_last_event_id,
+    start_finalize_job,
+)
+
+
+def _message(event: str, **data) -> dict:
+    return {"event": event, "data": json.dumps(data)}
+
+
+async def _source(gate: asyncio.Event):
+    yield _message("progress", stage="transcode")
+    await gate.wait()
+    yield _message("progress", stage="ipfs")
+    yield _message("complete", cid="bafy")
+
+
+async def _collect(stream) -> list[tuple[str, str]]:
+    return [(m.get("id"), m["event"]) async for m in stream]
+
+
+class TestFinalizeJob:
+
+    @pytest.mark.asyncio
+    async def test_runs_detached_and_tails_from_any_id(self, tmp_path):
+        gate = asyncio.Event()
+        job = start_finalize_job(tmp_path, "d-run", "0xabc", _source(gate))
+        assert find_finalize_job(tmp_path, "d-run") is job
+
+        # A tailer that goes away does not stop the job
+        first = job.tail()
+        assert (await first.__anext__())["event"] == "progress"
+        await first.aclose()
+
+        gate.set()
+        await asyncio.wait_for(job._task, 1)
+        assert job.completed
+        assert not finalize_jobs.is_finalizing("d-run")
+
+        assert await _collect(job.tail(after_id=1)) == [("2", "progress"), ("3", "complete")]
+
+    @pytest.mark.asyncio
+    async def test_log_replays_after_restart(self, tmp_path):
+        gate = asyncio.Event()
+        gate.set()
+        job = start_finalize_job(tmp_path, "d-log", "0xabc", _source(gate))
+        await asyncio.wait_for(job._task, 1)
+
+        loaded = finalize_jobs._load_log(tmp_path, "d-log")
+        assert loaded.identity == "0xabc"
+        assert loaded.completed and not loaded.interrupted
+        assert await _collect(loaded.tail(after_id=2)) == [("3", "complete")]
+
+    @pytest.mark.asyncio
+    async def test_unfinished_log_reports_interrupted(self, tmp_path):
+        log_dir = tmp_path / "finalize"
+        log_dir.mkdir()
+        (log_dir / "d-cut.jsonl").write_text(
+            json.dumps({"identity": "0xabc"}) + "\n"
+            + json.dumps({"id": 1, "event": "progress", "data": {}}) + "\n"
+            + '{"id": 2, "ev'  # torn write
+        )
+        job = find_finalize_job(tmp_path, "d-cut")
+        assert job.interrupted and not job.completed
+        events = await _collect(job.tail())
+        assert events == [("1", "progress"), (None, "error")]
+
+    @pytest.mark.asyncio
+    async def test_crashing_source_becomes_error_event(self, tmp_path):
+        async def broken():
+            yield _message("progress")
+            raise RuntimeError("boom")
+
+        job = start_finalize_job(tmp_path, "d-crash", "0xabc", broken())
+        await asyncio.wait_for(job._task, 1)
+        assert job.events[-1] == {"id": 2, "event": "error", "data": {"message": "boom"}}
+
+    @pytest.mark.asyncio
+    async def test_shutdown_cancels_and_logs_the_interruption(self, tmp_path):
+        closed = asyncio.Event()
+
+        async def stuck():
+            try:
+                yield _message("progress", stage="transcode")
+                await asyncio.Event().wait()
+            finally:
+                closed.set()
+
+        job = start_finalize_job(tmp_path, "d-stop", "0xabc", stuck())
+        first = job.tail()
+        assert (await first.__anext__())["event"] == "progress"
+
+        await asyncio.wait_for(finalize_jobs.stop_finalize_jobs(), 1)
+        assert closed.is_set()
+        assert job.done and not finalize_jobs.is_finalizing("d-stop")
+
+        loaded = finalize_jobs._load_log(tmp_path, "d-stop")
+        assert not loaded.interrupted  # The end was logged
+        assert loaded.events[-1]["event"] == "error"
+        assert "shutdown" in loaded.events[-1]["data"]["message"]
+
+    def test_parse_last_event_id(self):
+        assert parse_last_event_id(None) == 0
+        assert parse_last_event_id("7") == 7
+        assert parse_last_event_id("nope") == 0
+        assert parse_last_event_id("-3") == 0
+
+    def test_cleanup_removes_old_logs(self, tmp_path):
+        log_dir = tmp_path / "finalize"
+        log_dir.mkdir()
+        (log_dir / "old.jsonl").write_text("{}\n")
+        (log_dir / "new.jsonl").write_text("{}\n")
+        os.utime(log_dir / "old.jsonl", (0, 0))
+        assert cleanup_finalize_logs(tmp_path) == 1
+        assert [p.name for p in log_dir.iterdir()] == ["new.jsonl"]
+
+
+class TestFinalizeEndpoints:
+
+    @pytest.fixture
+    def client(self, tmp_path):
+        settings = Settings(staging_dir=str(tmp_path), api_key="test-secret", authorized_wallets="")
+        log_dir = tmp_path / "finalize"
+        log_dir.mkdir()
+        (log_dir / "done.jsonl").write_text("\n".join(json.dumps(r) for r in (
+            {"identity": "api-user"},
+            {"id": 1, "event": "progress", "data": {"stage": "ipfs"}},
+            {"id": 2, "event": "complete", "data": {"cid": "bafy"}},
+            {"end": True},
+        )) + "\n")
+        test_app = FastAPI()
+        test_app.include_router(content_router)
+        test_app.dependency_overrides[get_settings] = lambda: settings
+        return TestClient(test_app)
+
+    def test_repeat_finalize_attaches_to_finished_job(self, client):
+        # The draft itself is gone; the finalize replays the logged result
+        with client.stream(
+            "POST", "/draft-content/done/finalize",
+            json={"title": "t", "file_type": "video"},
+            headers={"X-API-Key": "test-secret", "Last-Event-ID": "1"},
+        ) as resp:
+            body = "".join(resp.iter_text())
+        assert resp.status_code == 200
+        assert "event: complete" in body
+        assert "event: progress" not in body
+
+    def test_tail_endpoint(self, client):
+        with client.stream(
+            "GET", "/draft-content/done/finalize/events", headers={"X-API-Key": "test-secret"}
+        ) as resp:
+            body = "".join(resp.iter_text())
+        assert "id: 1" in body and "id: 2" in body
+
+    def test_tail_checks_owner_and_existence(self, client):
+        headers = {"X-API-Key": "test-secret", "X-Uploaded-By": "0xsomeone"}
+        assert client.get("/draft-content/done/finalize/events", headers=headers).status_code == 403
+        assert client.get(
+            "/draft-content/nope/finalize/events", headers={"X-API-Key": "test-secret"}
+        ).status_code == 404
@@ -0,0 +1,102 @@
+"""Tests for app.services.hls_pipeline — closed-segment detection and pipelined pinning."""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.hls_pipeline import SegmentPinner, closed_files
+from app.services.ipfs import PinResult
+
+
+class _FakeAssembly:
+    """Stands in for ipfs.DirectoryAssembly: records links, pins to a fixed CID."""
+
+    def __init__(self):
+        self.entries = {}
+        self.closed = False
+
+    async def link(self, rel_path, cid):
+        self.entries[rel_path] = cid
+
+    async def pin(self):
+        return PinResult(success=True, cid="dir-cid")
+
+    async def close(self):
+        self.closed = True
+
+
+def _touch(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+class TestClosedFiles:
+
+    def test_newest_segment_is_open(self, tmp_path):
+        for i in range(3):
+            _touch(tmp_path / "720p" / f"segment_{i:03d}.ts")
+        names = [p.name for p in closed_files(tmp_path)]
+        assert names == ["segment_000.ts", "segment_001.ts"]
+
+    def test_numeric_ordering(self, tmp_path):
+        """segment_1000 sorts after segment_999 even though it's longer."""
+        _touch(tmp_path / "480p" / "segment_999.ts")
+        _touch(tmp_path / "480p" / "segment_1000.ts")
+        assert [p.name for p in closed_files(tmp_path)] == ["segment_999.ts"]
+
+    def test_init_waits_for_first_closed_segment(self, tmp_path):
+        _touch(tmp_path / "720p" / "init.mp4")
+        _touch(tmp_path / "720p" / "segment_000.m4s")
+        assert closed_files(tmp_path) == []
+        _touch(tmp_path / "720p" / "segment_001.m4s")
+        assert {p.name for p in closed_files(tmp_path)} == {"segment_000.m4s", "init.mp4"}
+
+    def test_ignores_playlists_and_single_file_output(self, tmp_path):
+        _touch(tmp_path / "master.m3u8")
+        _touch(tmp_path / "720p" / "playlist.m3u8")
+        _touch(tmp_path / "720p" / "stream.mp4")
+        assert closed_files(tmp_path) == []
+
+
+class TestSegmentPinner:
+
+    @pytest.mark.asyncio
+    async def test_finish_adds_remaining_and_assembles(self, tmp_path):
+        _touch(tmp_path / "master.m3u8")
+        _touch(tmp_path / "720p" / "playlist.m3u8")
+        _touch(tmp_path / "720p" / "segment_000.ts")
+        _touch(tmp_path / "720p" / "segment_001.ts")
+
+        add_file = AsyncMock(side_effect=lambda path, pin: PinResult(success=True, cid=f"cid-{path.name}"))
+
+        with patch("app.services.ipfs.add_file", add_file), \
+                patch("app.services.ipfs.DirectoryAssembly", _FakeAssembly):
+            pinner = SegmentPinner(tmp_path)
+            # Segment 000 was already added (and linked) while encoding
+            pinner.added["720p/segment_000.ts"] = "early-cid"
+            pinner.assembly.entries["720p/segment_000.ts"] = "early-cid"
+            result = await pinner.finish()
+            await pinner.close()
+
+        assert result.cid == "dir-cid"
+        assert pinner.assembly.closed
+        assert add_file.await_count == 3
+        assert all(call.kwargs["pin"] is False for call in add_file.await_args_list)
+        entries = pinner.assembly.entries
+        assert entries == {
+            "master.m3u8": "cid-master.m3u8",
+            "720p/playlist.m3u8": "cid-playlist.m3u8",
+            "720p/segment_000.ts": "early-cid",
+            "720p/segment_001.ts": "cid-segment_001.ts",
+        }
+
+    @pytest.mark.asyncio
+    async def test_add_failure_is_reported(self, tmp_path):
+        _touch(tmp_path / "720p" / "segment_000.ts")
+        add_file = AsyncMock(return_value=PinResult(success=False, error="boom"))
+
+        with patch("app.services.ipfs.add_file", add_file):
+            result = await SegmentPinner(tmp_path).finish()
+
+        assert not result.success
+        assert "boom" in result.error
@@ -0,0 +1,109 @@
+"""Tests for app.services.ipfs — assembling directories from added files."""
+
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.services import ipfs
+from app.services.ipfs import DirectoryAssembly
+
+
+class _MfsKubo:
+    """Answers the MFS and pin RPCs used by DirectoryAssembly."""
+
+    def __init__(self, fail_cp: str = ""):
+        self.calls: list[tuple[str, list[str]]] = []
+        self.mfs: dict[str, str] = {}
+        self.fail_cp = fail_cp
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        endpoint = request.url.path.removeprefix("/api/v0/")
+        args = request.url.params.get_list("arg")
+        self.calls.append((endpoint, args))
+        if endpoint == "files/cp":
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            if args[1].endswith(self.fail_cp or "\0"):
+                return httpx.Response(500, text="cp: no link named")
+            self.mfs[args[1]] = args[0]
+        elif endpoint == "files/stat":
+            return httpx.Response(200, json={"Hash": "bafydir"})
+        return httpx.Response(200, json={})
+
+    def endpoints(self) -> list[str]:
+        return [endpoint for endpoint, _ in self.calls]
+
+
+@pytest.fixture
+def kubo_with():
+    real_client = httpx.AsyncClient
+
+    def install(kubo):
+        transport = httpx.MockTransport(kubo.handler)
+        return patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw))
+    return install
+
+
+ENTRIES = {
+    "master.m3u8": "cid-master",
+    **{f"{q}p/segment_{i:03d}.ts": f"cid-{q}-{i}" for q in (720, 480) for i in range(10)},
+}
+
+
+class TestDirectoryAssembly:
+
+    @pytest.mark.asyncio
+    async def test_pins_assembled_tree(self, kubo_with):
+        kubo = _MfsKubo()
+        with kubo_with(kubo):
+            async with DirectoryAssembly() as assembly:
+                await assembly.link_all(ENTRIES)
+                result = await assembly.pin()
+
+        assert result.success and result.cid == "bafydir"
+        assert len(kubo.mfs) == len(ENTRIES)
+        assert kubo.mfs[next(p for p in kubo.mfs if p.endswith("/720p/segment_003.ts"))] == "/ipfs/cid-720-3"
+        # One mkdir per directory, however many files go into it
+        assert kubo.endpoints().count("files/mkdir") == 3
+        assert ("pin/add", ["bafydir"]) in kubo.calls
+        assert kubo.endpoints()[-1] == "files/rm"
+
+    @pytest.mark.asyncio
+    async def test_copies_run_concurrently_within_bound(self, kubo_with):
+        kubo = _MfsKubo()
+        with kubo_with(kubo):
+            async with DirectoryAssembly(concurrency=4) as assembly:
+                await assembly.link_all(ENTRIES)
+        assert 1 < kubo.max_in_flight <= 4
+
+    @pytest.mark.asyncio
+    async def test_link_as_added_then_pin(self, kubo_with):
+        kubo = _MfsKubo()
+        with kubo_with(kubo):
+            async with DirectoryAssembly() as assembly:
+                await assembly.link("720p/segment_000.ts", "cid-a")
+                # Linked (so protected from GC) before anything is pinned
+                assert "pin/add" not in kubo.endpoints()
+                assert len(kubo.mfs) == 1
+                await assembly.link("720p/segment_001.ts", "cid-b")
+                result = await assembly.pin()
+        assert result.cid == "bafydir"
+
+    @pytest.mark.asyncio
+    async def test_copy_failure_fails_without_pinning(self, kubo_with):
+        kubo = _MfsKubo(fail_cp="480p/segment_004.ts")
+        with kubo_with(kubo), patch.object(ipfs, "_pins_changed") as changed:
+            with pytest.raises(RuntimeError, match="files/cp failed: 500"):
+                async with DirectoryAssembly() as assembly:
+                    await assembly.link_all(ENTRIES)
+                    await assembly.pin()
+
+        assert "pin/add" not in kubo.endpoints()
+        assert kubo.endpoints()[-1] == "files/rm"
+        changed.assert_not_called()
@@ -0,0 +1,90 @@
+"""Tests for app.services.job_store — indexed job storage and pagination."""
+
+import json
+import os
+
+import pytest
+
+from app.services.job_store import JobStore
+
+
+def _job(i: int, **extra) -> dict:
+    return {"id": f"job-{i:03d}", "createdAt": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00", **extra}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(tmp_path)
+    yield store
+    store.close()
+
+
+class TestJobStore:
+
+    def test_wal_mode(self, store):
+        assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_cursor_pagination_walks_everything_once(self, store):
+        for i in range(25):
+            store.save(f"job-{i:03d}", _job(i))
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = store.list_page(limit=10, cursor=cursor)
+            seen += [job["id"] for job in page]
+            if cursor is None:
+                break
+
+        assert seen == [f"job-{i:03d}" for i in reversed(range(25))]
+
+    def test_filters(self, store):
+        store.save("a", _job(1, status="complete", identity="0xabc", draftId="d1"))
+        store.save("b", _job(2, status="processing", identity="0xabc"))
+        store.save("c", _job(3, status="complete", identity="0xdef"))
+
+        assert [j["id"] for j in store.list_page(status="complete")[0]] == ["job-003", "job-001"]
+        assert [j["id"] for j in store.list_page(identity="0xabc")[0]] == ["job-002", "job-001"]
+        assert [j["id"] for j in store.list_page(draft_id="d1")[0]] == ["job-001"]
+
+    def test_update_keeps_position(self, store):
+        store.save("x", {"id": "x", "status": "processing"})
+        store.save("x", {"id": "x", "status": "complete"})
+        store.save("y", {"id": "y"})
+
+        assert [j["id"] for j in store.list_page()[0]] == ["y", "x"]
+        assert store.load("x")["status"] == "complete"
+
+    def test_pending_ids(self, store):
+        store.save("x", {"id": "x", "pendingEvent": {"event": "job.completed"}})
+        store.save("y", {"id": "y"})
+        assert store.pending_ids() == ["x"]
+        store.save("x", {"id": "x", "status": "complete"})
+        assert store.pending_ids() == []
+
+    def test_bad_cursor(self, store):
+        with pytest.raises(ValueError):
+            store.list_page(cursor="not-a-cursor")
+
+
+class TestJsonMigration:
+
+    def test_imports_legacy_files_once(self, tmp_path):
+        legacy = tmp_path / "jobs"
+        legacy.mkdir()
+        (legacy / "old-1.json").write_text(json.dumps({"id": "old-1", "status": "complete"}))
+        (legacy / "old-2.json").write_text(json.dumps(_job(2, status="failed")))
+        (legacy / "broken.json").write_text("{")
+        os.utime(legacy / "old-1.json", (0, 0))  # Oldest by mtime, no createdAt
+
+        store = JobStore(tmp_path)
+        assert [j.get("status") for j in store.list_page()[0]] == ["failed", "complete"]
+        assert not legacy.exists()
+        assert (tmp_path / "jobs-migrated" / "old-1.json").exists()
+        store.close()
+
+        # A jobs/ dir reappearing later is not re-imported
+        legacy.mkdir()
+        (legacy / "late.json").write_text(json.dumps({"id": "late"}))
+        store = JobStore(tmp_path)
+        assert store.load("late") is None
+        store.close()
@@ -0,0 +1,75 @@
+"""Tests for the local proxy preview background task in app.routes.content."""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import Settings
+from app.models.content import ContentDraftState, ContentFile
+from app.routes import content
+from app.services import cleanup, transcode
+from app.services.cleanup import StagingSpace
+from app.services.transcode import TranscodeResult
+
+
+@pytest.fixture
+def draft(tmp_path):
+    draft_id = str(uuid.uuid4())
+    draft_dir = tmp_path / "drafts" / draft_id
+    (draft_dir / "upload").mkdir(parents=True)
+    (draft_dir / "upload" / "clip.mp4").write_bytes(b"video")
+    now = datetime.now(timezone.utc)
+    content.save_draft_state(draft_dir, ContentDraftState(
+        draft_id=draft_id, created_at=now, expires_at=now + timedelta(hours=1), uploaded_by="0xabc",
+        files=[ContentFile(original_filename="clip.mp4", detected_title="clip", media_type="video",
+                           format="MP4", size_bytes=5, duration_seconds=10.0, width=640, height=360)],
+        local_preview_status="processing",
+    ))
+    return draft_id, draft_dir
+
+
+@pytest.fixture
+def fake_encoders(monkeypatch):
+    async def write(path, data):
+        path.write_bytes(data)
+        return TranscodeResult(success=True, output_path=path)
+
+    async def poster(source, output, duration):
+        return await write(output, b"p" * 100)
+
+    async def storyboard(source, sprite, vtt, *args):
+        await write(vtt, b"WEBVTT")
+        return await write(sprite, b"s" * 200)
+
+    async def proxy(source, output, *args, **kwargs):
+        return await write(output, b"m" * 700)
+
+    monkeypatch.setattr(transcode, "make_poster", poster)
+    monkeypatch.setattr(transcode, "make_storyboard", storyboard)
+    monkeypatch.setattr(transcode, "make_proxy", proxy)
+
+
+class TestLocalPreview:
+
+    @pytest.mark.asyncio
+    async def test_outputs_are_accounted(self, tmp_path, draft, fake_encoders, monkeypatch):
+        draft_id, draft_dir = draft
+        space = StagingSpace(tmp_path, max_bytes=0)
+        monkeypatch.setattr(cleanup, "_space", space)
+
+        await content._generate_local_preview(draft_id, Settings(staging_dir=str(tmp_path)))
+
+        state = content.load_draft_state(draft_dir)
+        assert state.local_preview_status == "ready"
+        assert set(state.local_preview_files) == {"poster", "storyboard", "storyboard_vtt", "proxy"}
+        assert space.usage().drafts[draft_id] >= 100 + 200 + 6 + 700
+
+    @pytest.mark.asyncio
+    async def test_unusable_preview_dir_fails_the_preview(self, tmp_path, draft, fake_encoders):
+        draft_id, draft_dir = draft
+        (draft_dir / "preview").write_bytes(b"not a directory")
+
+        await content._generate_local_preview(draft_id, Settings(staging_dir=str(tmp_path)))
+
+        assert content.load_draft_state(draft_dir).local_preview_status == "failed"
@@ -0,0 +1,75 @@
+"""Tests for app.services.loop_monitor — loop lag and stall capture."""
+
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.routes.debug import router as debug_router
+from app.services import loop_monitor
+from app.services.loop_monitor import LoopMonitor
+
+
+def _blocking_handler(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+class TestLoopMonitor:
+
+    @pytest.mark.asyncio
+    async def test_quiet_loop_has_no_stalls(self):
+        monitor = LoopMonitor(interval=0.01, threshold=0.1)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+        status = monitor.status()
+        assert status["samples"] >= 3
+        assert status["stalls"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stall_captures_blocking_stack(self):
+        monitor = LoopMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.03)
+            _blocking_handler(0.3)
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        status = monitor.status(include_stalls=True)
+        assert status["stalls"] == 1
+        assert status["lag_max_ms"] >= 250
+        assert not status["blocked"]
+        stall = status["recent_stalls"][0]
+        assert stall["duration_ms"] >= 250
+        assert any("_blocking_handler" in line for line in stall["stack"])
+
+
+class TestDebugEndpoint:
+
+    @pytest.fixture
+    def client(self):
+        settings = Settings(api_key="test-secret", authorized_wallets="")
+        test_app = FastAPI()
+        test_app.include_router(debug_router)
+        test_app.dependency_overrides[get_settings] = lambda: settings
+        return TestClient(test_app)
+
+    def test_disabled_monitor_is_404(self, client):
+        assert client.get("/debug/loop", headers={"X-API-Key": "test-secret"}).status_code == 404
+
+    def test_reports_stalls(self, client, monkeypatch):
+        monitor = LoopMonitor()
+        monitor._record_lag(0.5)
+        monkeypatch.setattr(loop_monitor, "_monitor", monitor)
+        assert client.get("/debug/loop").status_code == 401
+        body = client.get("/debug/loop", headers={"X-API-Key": "test-secret"}).json()
+        assert body["loop"]["stalls"] == 1
+        assert body["loop"]["recent_stalls"][0]["stack"] is None
+        assert "workers" in body
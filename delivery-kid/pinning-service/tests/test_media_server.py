@@ -0,0 +1,184 @@
+"""Tests for app.services.media_server — conditional, range and shaped file serving."""
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Settings, get_settings
+from app.routes.staging import router
+from app.services import media_server, workers
+from app.services.media_server import (
+    BULK,
+    INTERACTIVE,
+    BandwidthShaper,
+    RangeNotSatisfiable,
+    TransferLedger,
+    parse_ranges,
+)
+
+DRAFT_ID = "aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"
+CONTENT = bytes(range(256)) * 40  # 10240 bytes
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    ledger = TransferLedger()
+    monkeypatch.setattr(media_server, "_ledger", ledger)
+    return ledger
+
+
+@pytest.fixture
+def client(tmp_path, ledger):
+    upload_dir = tmp_path / "drafts" / DRAFT_ID / "upload"
+    upload_dir.mkdir(parents=True)
+    (upload_dir / "video.mp4").write_bytes(CONTENT)
+    settings = Settings(staging_dir=str(tmp_path), api_key="test-secret", authorized_wallets="")
+    test_app = FastAPI()
+    test_app.include_router(router)
+    test_app.dependency_overrides[get_settings] = lambda: settings
+    client = TestClient(test_app)
+    client.headers["X-API-Key"] = "test-secret"
+    return client
+
+
+URL = f"/staging/drafts/{DRAFT_ID}/video.mp4"
+
+
+class TestParseRanges:
+
+    def test_forms(self):
+        assert parse_ranges("bytes=0-99", 1000) == [(0, 99)]
+        assert parse_ranges("bytes=900-", 1000) == [(900, 999)]
+        assert parse_ranges("bytes=-100", 1000) == [(900, 999)]
+        assert parse_ranges("bytes=990-2000", 1000) == [(990, 999)]
+
+    def test_overlapping_ranges_merge(self):
+        assert parse_ranges("bytes=50-99, 0-49, 200-299, 250-260", 1000) == [(0, 99), (200, 299)]
+
+    def test_ignored_and_unsatisfiable(self):
+        assert parse_ranges("items=0-1", 1000) is None
+        assert parse_ranges("bytes=5-1", 1000) is None
+        assert parse_ranges("bytes=a-b", 1000) is None
+        assert parse_ranges("bytes=" + ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(40)), 1000) is None
+        with pytest.raises(RangeNotSatisfiable):
+            parse_ranges("bytes=1000-", 1000)
+
+
+class TestConditionalRequests:
+
+    def test_strong_etag_and_304(self, client):
+        resp = client.get(URL)
+        assert resp.status_code == 200
+        assert resp.content == CONTENT
+        etag = resp.headers["etag"]
+        assert etag.startswith('"')
+        assert resp.headers["accept-ranges"] == "bytes"
+
+        resp = client.get(URL, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        resp = client.get(URL, headers={"If-Modified-Since": resp.headers["last-modified"]})
+        assert resp.status_code == 304
+
+    def test_if_match_mismatch_is_412(self, client):
+        assert client.get(URL, headers={"If-Match": '"stale"'}).status_code == 412
+
+    def test_if_range_for_old_version_sends_whole_file(self, client):
+        etag = client.head(URL).headers["etag"]
+        resp = client.get(URL, headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert resp.status_code == 206
+        resp = client.get(URL, headers={"Range": "bytes=0-9", "If-Range": '"older"'})
+        assert resp.status_code == 200
+        assert len(resp.content) == len(CONTENT)
+
+
+class TestRanges:
+
+    def test_single_range(self, client):
+        resp = client.get(URL, headers={"Range": "bytes=100-199"})
+        assert resp.status_code == 206
+        assert resp.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}"
+        assert resp.content == CONTENT[100:200]
+
+    def test_multiple_ranges(self, client):
+        resp = client.get(URL, headers={"Range": "bytes=0-9, 5000-5009, -10"})
+        assert resp.status_code == 206
+        content_type = resp.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1]
+        assert int(resp.headers["content-length"]) == len(resp.content)
+
+        parts = resp.content.split(f"--{boundary}".encode())
+        assert parts[-1] == b"--\r\n"
+        bodies = [part.split(b"\r\n\r\n", 1)[1][:-2] for part in parts[1:-1]]
+        assert bodies == [CONTENT[0:10], CONTENT[5000:5010], CONTENT[-10:]]
+        assert b"content-range: bytes 5000-5009/10240" in parts[2]
+
+    def test_unsatisfiable(self, client):
+        resp = client.get(URL, headers={"Range": "bytes=20000-"})
+        assert resp.status_code == 416
+        assert resp.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    def test_head_sends_no_body(self, client):
+        resp = client.head(URL, headers={"Range": "bytes=0-9"})
+        assert resp.status_code == 206
+        assert resp.headers["content-length"] == "10"
+        assert resp.content == b""
+
+
+class TestAccountingAndShaping:
+
+    def test_transfers_accounted_per_draft(self, client, ledger):
+        client.get(URL)
+        client.get(URL, headers={"Range": "bytes=0-99"})
+        etag = client.head(URL).headers["etag"]
+        client.get(URL, headers={"If-None-Match": etag})
+
+        entry = ledger.get(DRAFT_ID)
+        assert entry.requests == 4
+        assert entry.bytes_sent == len(CONTENT) + 100
+        assert entry.partial == 1 and entry.not_modified == 1
+        assert entry.interactive_bytes == entry.bytes_sent
+
+        body = client.get(f"/staging/transfers?draft_id={DRAFT_ID}").json()
+        assert body["requests"] == 4
+        assert client.get("/staging/transfers?draft_id=unknown").status_code == 404
+
+    def test_reads_run_on_the_serve_pool(self, client):
+        workers.stop_worker_pools()
+        try:
+            assert client.get(URL).content == CONTENT
+            status = workers.worker_pools_status()
+            assert status["serve"]["operations"]["pread"]["calls"] == 1
+            assert "io" not in status
+        finally:
+            workers.stop_worker_pools()
+
+    @pytest.mark.asyncio
+    async def test_bulk_waits_for_interactive(self):
+        rate = 1_000_000  # bytes/s; bucket holds 262144 bytes
+        shaper = BandwidthShaper(max_bytes_per_second=rate)
+
+        # Interactive never waits, even past the budget
+        start = time.monotonic()
+        for _ in range(4):
+            await shaper.acquire(100_000, INTERACTIVE)
+        assert time.monotonic() - start < 0.05
+
+        # Bulk has to wait for the interactive debt to be repaid first
+        start = time.monotonic()
+        await shaper.acquire(100_000, BULK, "coconut")
+        assert time.monotonic() - start >= 0.2
+        assert shaper.status()["bulk_wait_seconds"] >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_bulk_client_cap(self):
+        shaper = BandwidthShaper(bulk_client_bytes_per_second=1_000_000)
+        await shaper.acquire(262_144, BULK, "a")  # Uses the burst allowance
+        start = time.monotonic()
+        await shaper.acquire(100_000, BULK, "b")  # Another client: its own bucket
+        assert time.monotonic() - start < 0.05
+        await shaper.acquire(100_000, BULK, "a")
+        assert time.monotonic() - start >= 0.08
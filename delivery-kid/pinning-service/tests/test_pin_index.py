@@ -0,0 +1,155 @@
+"""Tests for app.services.pin_index — the cached /local-pins listing."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import require_wallet_auth
+from app.config import Settings
+from app.routes.albums import router
+from app.services import ipfs, pin_index
+from app.services.pin_index import PinIndex
+
+
+class FakeKubo:
+    """pin/ls --stream and pin/rm against an in-memory pin set."""
+
+    def __init__(self, cids):
+        self.cids = list(cids)
+        self.listings = 0
+        self.fail = False
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/pin/ls"):
+            assert request.url.params["stream"] == "true"
+            self.listings += 1
+            if self.fail:
+                return httpx.Response(500, text="kubo down")
+            lines = "".join(json.dumps({"Cid": c, "Type": "recursive"}) + "\n" for c in self.cids)
+            return httpx.Response(200, content=lines.encode())
+        if path.endswith("/pin/rm"):
+            self.cids.remove(request.url.params["arg"])
+            return httpx.Response(200, json={"Pins": [request.url.params["arg"]]})
+        return httpx.Response(404)
+
+
+@pytest.fixture
+def kubo():
+    kubo = FakeKubo(["bafy-b", "bafy-a"])
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(kubo.handler)
+    with patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw)):
+        yield kubo
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = PinIndex()
+    monkeypatch.setattr(pin_index, "_index", index)
+    return index
+
+
+@pytest.fixture
+def client(kubo, index, monkeypatch):
+    monkeypatch.setattr(ipfs, "get_settings", lambda: Settings(pinata_jwt=""))
+    test_app = FastAPI()
+    test_app.include_router(router)
+    test_app.dependency_overrides[require_wallet_auth] = lambda: "0xabc"
+    return TestClient(test_app)
+
+
+class TestLocalPins:
+
+    def test_listing_is_sorted_and_compatible(self, client, kubo):
+        resp = client.get("/local-pins")
+        assert resp.status_code == 200
+        assert resp.json() == {
+            "pins": [{"cid": "bafy-a"}, {"cid": "bafy-b"}],
+            "count": 2,
+            "node": "delivery-kid",
+        }
+        assert resp.headers["etag"].startswith('"')
+
+    def test_repeat_polls_are_cached_and_304(self, client, kubo, index):
+        etag = client.get("/local-pins").headers["etag"]
+        for _ in range(3):
+            resp = client.get("/local-pins", headers={"If-None-Match": etag})
+            assert resp.status_code == 304
+            assert resp.content == b""
+            assert resp.headers["etag"] == etag
+        assert kubo.listings == 1
+        assert index.hits == 3
+
+    def test_our_unpin_invalidates(self, client, kubo):
+        etag = client.get("/local-pins").headers["etag"]
+        assert client.delete("/unpin/bafy-a").status_code == 200
+
+        resp = client.get("/local-pins", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.json()["pins"] == [{"cid": "bafy-b"}]
+        assert kubo.listings == 2
+
+    def test_unchanged_rebuild_keeps_etag(self, client, kubo, index):
+        etag = client.get("/local-pins").headers["etag"]
+        index.invalidate()
+        resp = client.get("/local-pins", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert kubo.listings == 2
+
+    def test_kubo_failure_serves_last_listing(self, client, kubo, index):
+        etag = client.get("/local-pins").headers["etag"]
+        kubo.fail = True
+        index.invalidate()
+        resp = client.get("/local-pins")
+        assert resp.status_code == 200
+        assert resp.headers["etag"] == etag
+        # Not retried on every poll while kubo is down
+        client.get("/local-pins")
+        assert kubo.listings == 2
+        assert index.failures == 1
+
+    def test_kubo_failure_without_listing(self, client, kubo, index):
+        kubo.fail = True
+        assert client.get("/local-pins").json()["count"] == 0
+        # Not retried on every poll either, though there is nothing cached
+        assert client.get("/local-pins").json()["count"] == 0
+        assert kubo.listings == 1
+        assert index.failures == 1
+
+
+class TestRefresher:
+
+    @pytest.mark.asyncio
+    async def test_invalidation_wakes_refresher(self, kubo, index):
+        task = asyncio.create_task(index.run())
+        try:
+            await asyncio.sleep(0.05)
+            assert kubo.listings == 1
+            kubo.cids.append("bafy-c")
+            index.invalidate()
+            await asyncio.sleep(0.05)
+            assert kubo.listings == 2
+            snapshot = await index.get()
+            assert snapshot.count == 3
+            assert kubo.listings == 2
+        finally:
+            task.cancel()
+
+
+class TestIterLocalPins:
+
+    @pytest.mark.asyncio
+    async def test_error_line_raises(self):
+        lines = json.dumps({"Cid": "bafy-a"}) + "\n" + json.dumps({"Message": "context canceled", "Type": "error"}) + "\n"
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=lines.encode()))
+        real_client = httpx.AsyncClient
+        with patch("httpx.AsyncClient", lambda **kw: real_client(transport=transport, **kw)):
+            with pytest.raises(RuntimeError, match="context canceled"):
+                [cid async for cid in ipfs.iter_local_pins()]
+            assert await ipfs.get_local_pins() == []
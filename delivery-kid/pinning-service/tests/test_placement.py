@@ -0,0 +1,49 @@
+"""Tests for app.services.placement — link-or-copy file placement."""
+
+import os
+import shutil
+
+from app.services.placement import place_file, place_tree
+
+
+class TestPlaceFile:
+
+    def test_links_on_same_filesystem(self, tmp_path):
+        src = tmp_path / "upload.mp4"
+        src.write_bytes(b"video")
+        dest = tmp_path / "output.mp4"
+
+        assert place_file(src, dest) == "link"
+        assert os.path.samefile(src, dest)
+
+    def test_replaces_existing_link_without_writing_through(self, tmp_path):
+        src = tmp_path / "a"
+        src.write_bytes(b"new")
+        shared = tmp_path / "cached"
+        shared.write_bytes(b"old")
+        dest = tmp_path / "dest"
+        os.link(shared, dest)
+
+        place_file(src, dest)
+        assert dest.read_bytes() == b"new"
+        assert shared.read_bytes() == b"old"
+
+    def test_copies_when_link_fails(self, tmp_path, monkeypatch):
+        src = tmp_path / "a"
+        src.write_bytes(b"data")
+
+        def no_links(*args):
+            raise OSError(18, "Invalid cross-device link")
+
+        monkeypatch.setattr(os, "link", no_links)
+        assert place_file(src, tmp_path / "b") == "copy"
+        assert (tmp_path / "b").read_bytes() == b"data"
+
+    def test_tree(self, tmp_path):
+        src = tmp_path / "src"
+        (src / "720p").mkdir(parents=True)
+        (src / "720p" / "seg.ts").write_bytes(b"ts")
+        place_tree(src, tmp_path / "dest")
+        assert os.path.samefile(src / "720p" / "seg.ts", tmp_path / "dest" / "720p" / "seg.ts")
+        shutil.rmtree(src)
+        assert (tmp_path / "dest" / "720p" / "seg.ts").read_bytes() == b"ts"
@@ -1,11 +1,16 @@
 """Tests for the staging file serving endpoint."""
 
+import hashlib
+import hmac
+import json
+import time
 from pathlib import Path
 
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+from app.auth import create_preview_token
 from app.config import Settings, get_settings
 from app.routes.staging import router
 
@@ -124,3 +129,76 @@ class TestStagingEndpoint:
             f"?token=badtoken&user=TestUser&timestamp=1234567890000",
         )
         assert resp.status_code == 401
+
+
+class TestLocalPreviewEndpoint:
+
+    def test_serves_preview_asset(self, staging_dir):
+        tmp_path, draft_id = staging_dir
+        preview_dir = tmp_path / "drafts" / draft_id / "preview"
+        preview_dir.mkdir()
+        (preview_dir / "storyboard.vtt").write_text("WEBVTT\n")
+
+        client = make_client(make_settings(str(tmp_path)))
+        resp = client.get(f"/staging/drafts/{draft_id}/preview/storyboard.vtt", headers=_auth_headers())
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/vtt")
+
+    def test_preview_does_not_expose_upload_dir(self, staging_dir):
+        tmp_path, draft_id = staging_dir
+        client = make_client(make_settings(str(tmp_path)))
+        resp = client.get(f"/staging/drafts/{draft_id}/preview/test-video.mp4", headers=_auth_headers())
+        assert resp.status_code == 404
+
+    def test_preview_requires_auth(self, staging_dir):
+        tmp_path, draft_id = staging_dir
+        client = make_client(make_settings(str(tmp_path)))
+        resp = client.get(f"/staging/drafts/{draft_id}/preview/poster.jpg")
+        assert resp.status_code == 401
+
+
+class TestPreviewToken:
+
+    def _url(self, draft_id, token, filename="test-video.mp4"):
+        return f"/staging/drafts/{draft_id}/{filename}?preview_token={token}"
+
+    def test_signed_token_needs_no_draft_state(self, staging_dir):
+        tmp_path, draft_id = staging_dir
+        client = make_client(make_settings(str(tmp_path)))
+        token = create_preview_token("test-secret", draft_id, "upload/test-video.mp4", int(time.time()) + 60)
+        # The fixture draft has no draft.json at all
+        resp = client.get(self._url(draft_id, token), headers={"Range": "bytes=0-99"})
+        assert resp.status_code == 206
+        assert len(resp.content) == 100
+
+    def test_signed_token_is_bound_to_file_and_expiry(self, staging_dir):
+        tmp_path, draft_id = staging_dir
+        (tmp_path / "drafts" / draft_id / "upload" / "other.mp4").write_bytes(b"x")
+        client = make_client(make_settings(str(tmp_path)))
+        future = int(time.time()) + 60
+        token = create_preview_token("test-secret", draft_id, "upload/test-video.mp4", future)
+
+        assert client.get(self._url(draft_id, token, "other.mp4")).status_code == 401
+        other_draft = create_preview_token("test-secret", "another-draft", "upload/test-video.mp4", future)
+        assert client.get(self._url(draft_id, other_draft)).status_code == 401
+        expired = create_preview_token("test-secret", draft_id, "upload/test-video.mp4", int(time.time()) - 1)
+        assert client.get(self._url(draft_id, expired)).status_code == 401
+        forged = create_preview_token("wrong-key", draft_id, "upload/test-video.mp4", future)
+        assert client.get(self._url(draft_id, forged)).status_code == 401
+        extended = token.replace(str(future), str(future + 3600))
+        assert client.get(self._url(draft_id, extended)).status_code == 401
+
+    def test_signed_token_uses_a_derived_key(self, staging_dir):
+        _, draft_id = staging_dir
+        expires = int(time.time()) + 60
+        token = create_preview_token("test-secret", draft_id, "upload/test-video.mp4", expires)
+        message = f"preview:{draft_id}:upload/test-video.mp4:{expires}".encode()
+        direct = hmac.new(b"test-secret", message, hashlib.sha256).hexdigest()
+        assert not token.endswith(direct)
+
+    def test_legacy_draft_token_still_accepted(self, staging_dir):
+        tmp_path, draft_id = staging_dir
+        (tmp_path / "drafts" / draft_id / "draft.json").write_text(json.dumps({"preview_token": "legacy-token"}))
+        client = make_client(make_settings(str(tmp_path)))
+        assert client.get(self._url(draft_id, "legacy-token")).status_code == 200
+        assert client.get(self._url(draft_id, "guess")).status_code == 401
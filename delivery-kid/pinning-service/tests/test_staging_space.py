@@ -0,0 +1,232 @@
+"""Tests for the staging space budget in app.services.cleanup."""
+
+import asyncio
+import json
+import os
+import io
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.config import Settings
+from app.routes import content, drafts
+from app.services import cleanup
+from app.services.cleanup import StagingFullError, StagingSpace, scan_staging
+
+
+def _draft(staging_dir, draft_id, size, expired=False):
+    draft_dir = staging_dir / "drafts" / draft_id
+    (draft_dir / "upload").mkdir(parents=True)
+    (draft_dir / "upload" / "file.bin").write_bytes(b"x" * size)
+    expires = datetime.now(timezone.utc) + timedelta(hours=-1 if expired else 1)
+    (draft_dir / "draft.json").write_text(json.dumps({"expires_at": expires.isoformat()}))
+    return draft_dir
+
+
+@pytest.fixture(autouse=True)
+def no_transcode_cache(monkeypatch):
+    monkeypatch.setattr(cleanup, "get_transcode_cache", lambda: None)
+
+
+class TestLedger:
+
+    def test_scan_keys_and_hardlinks(self, tmp_path):
+        draft_dir = _draft(tmp_path, "d1", 1000)
+        (draft_dir / "output").mkdir()
+        os.link(draft_dir / "upload" / "file.bin", draft_dir / "output" / "file.bin")
+        (tmp_path / "hls-job1").mkdir()
+        (tmp_path / "hls-job1" / "seg.ts").write_bytes(b"t" * 300)
+
+        totals, _ = scan_staging(tmp_path)
+        assert 1000 < totals["drafts/d1"] < 2000  # hardlinked output counted once
+        assert totals["hls-job1"] == 300
+
+    @pytest.mark.asyncio
+    async def test_outputs_linked_from_the_cache_count_once(self, tmp_path, monkeypatch):
+        entry = tmp_path / "cache" / "transcode" / "k1" / "output"
+        entry.mkdir(parents=True)
+        (entry / "seg.ts").write_bytes(b"t" * 4000)
+        draft_dir = _draft(tmp_path, "zz", 1000)
+        (draft_dir / "output").mkdir()
+        os.link(entry / "seg.ts", draft_dir / "output" / "seg.ts")  # Restored from the cache
+        (draft_dir / "output" / "new.bin").write_bytes(b"n" * 50)
+
+        totals, _ = scan_staging(tmp_path)
+        assert totals["cache"] == 4000
+        assert totals["drafts/zz"] < 2000
+
+        space = StagingSpace(tmp_path, max_bytes=0)
+        monkeypatch.setattr(cleanup, "_space", space)
+        await cleanup.account_staging_tree(draft_dir / "output")
+        assert space.ledger == {"drafts/zz": 50}
+        await cleanup.remeasure_staging(draft_dir)
+        assert space.ledger["drafts/zz"] == totals["drafts/zz"]
+
+    def test_settled_directories_reuse_cached_totals(self, tmp_path):
+        (tmp_path / "originals").mkdir()
+        (tmp_path / "originals" / "a").write_bytes(b"a" * 100)
+        old = 1_000_000
+        os.utime(tmp_path / "originals", (old, old))
+
+        totals, cache = scan_staging(tmp_path)
+        assert totals["originals"] == 100
+
+        # Grown in place without touching the directory: the cached total
+        # stands until the directory changes (reconcile is eventual)
+        (tmp_path / "originals" / "a").write_bytes(b"a" * 500)
+        os.utime(tmp_path / "originals", (old, old))
+        assert scan_staging(tmp_path, cache)[0]["originals"] == 100
+        (tmp_path / "originals" / "b").write_bytes(b"b")
+        assert scan_staging(tmp_path, cache)[0]["originals"] == 501
+
+    @pytest.mark.asyncio
+    async def test_incremental_accounting(self, tmp_path):
+        (tmp_path / "seeding").mkdir()
+        (tmp_path / "seeding" / "album.flac").write_bytes(b"s" * 5000)
+        space = StagingSpace(tmp_path, max_bytes=10_000, exclude=(tmp_path / "seeding",))
+        await space.reconcile()
+
+        space.account(tmp_path / "drafts" / "d1" / "upload", 2000)
+        space.account(tmp_path / "hls-job1", 300)
+        usage = space.usage()
+        assert usage.drafts == {"d1": 2000}
+        assert usage.total_bytes == 2300
+        assert usage.excluded_bytes == 5000
+
+        space.forget(tmp_path / "drafts" / "d1")
+        assert space.headroom() == 10_000 - 300
+
+        # Ledger entries nothing backs on disk are dropped by a reconcile
+        await space.reconcile()
+        assert space.usage().total_bytes == 0
+
+
+class TestRemoval:
+
+    @pytest.mark.asyncio
+    async def test_bookkeeping_stays_on_the_loop(self, tmp_path, monkeypatch):
+        draft_dir = _draft(tmp_path, "d1", 100)
+        space = StagingSpace(tmp_path, max_bytes=0)
+        scheduler = cleanup.ExpiryScheduler(tmp_path)
+        scheduler.load()
+        monkeypatch.setattr(cleanup, "_space", space)
+        monkeypatch.setattr(cleanup, "_expiry", scheduler)
+
+        threads = set()
+        account, forget = space.account, space.forget
+        monkeypatch.setattr(space, "account", lambda *a: (threads.add(threading.get_ident()), account(*a)))
+        monkeypatch.setattr(space, "forget", lambda *a: (threads.add(threading.get_ident()), forget(*a)))
+
+        await cleanup.account_staging_tree(draft_dir)
+        assert space.ledger == {"drafts/d1": 100 + (draft_dir / "draft.json").stat().st_size}
+        await cleanup.remove_draft_dir(draft_dir)
+        assert not draft_dir.exists()
+        assert space.ledger == {}
+        assert len(scheduler) == 0
+        assert threads == {threading.get_ident()}
+
+    @pytest.mark.asyncio
+    async def test_startup_cleanup_reads_the_ledger_on_the_loop(self, tmp_path, monkeypatch):
+        _draft(tmp_path, "old", 100, expired=True)
+        space = StagingSpace(tmp_path, max_bytes=0)
+        await space.reconcile()
+        monkeypatch.setattr(cleanup, "_space", space)
+        threads = set()
+        usage = space.usage
+        monkeypatch.setattr(space, "usage", lambda: (threads.add(threading.get_ident()), usage())[1])
+
+        await cleanup.startup_cleanup(tmp_path)
+        assert not (tmp_path / "drafts" / "old").exists()
+        assert threads == {threading.get_ident()}
+
+
+class TestAdmission:
+
+    @pytest.mark.asyncio
+    async def test_evicts_expired_drafts_before_refusing(self, tmp_path):
+        _draft(tmp_path, "old", 6000, expired=True)
+        _draft(tmp_path, "live", 3000)
+        space = StagingSpace(tmp_path, max_bytes=10_000)
+        await space.reconcile()
+
+        reservation = await space.admit(5000)
+        assert not (tmp_path / "drafts" / "old").exists()
+        assert (tmp_path / "drafts" / "live").exists()
+        assert space.reserved == 5000
+
+        # Live drafts are never evicted; the reservation still counts
+        with pytest.raises(StagingFullError):
+            await space.admit(3000)
+
+        reservation.release()
+        assert space.reserved == 0
+        assert space.headroom() > 3000
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("create", [content.create_content_draft, drafts.create_draft])
+    async def test_upload_of_unknown_size_is_refused(self, tmp_path, create):
+        upload = UploadFile(io.BytesIO(b"x" * 100), filename="track.flac")  # No size
+        with pytest.raises(HTTPException) as exc:
+            await create(files=[upload], wallet_address="0xabc", settings=Settings(staging_dir=str(tmp_path)))
+        assert exc.value.status_code == 411
+        assert not (tmp_path / "drafts").exists()
+
+    @pytest.mark.asyncio
+    async def test_unlimited_budget(self, tmp_path):
+        space = StagingSpace(tmp_path, max_bytes=0)
+        reservation = await space.admit(10 ** 15)
+        assert reservation.nbytes == 0
+        assert space.status()["headroom_gb"] is None
+
+
+class TestExpiryScheduler:
+
+    @pytest.mark.asyncio
+    async def test_removes_exactly_the_due_drafts(self, tmp_path):
+        _draft(tmp_path, "due", 10, expired=True)
+        _draft(tmp_path, "later", 10)
+        orphan = tmp_path / "drafts" / "orphan"
+        orphan.mkdir()
+        os.utime(orphan, (0, 0))  # No draft.json and long untouched
+
+        scheduler = cleanup.ExpiryScheduler(tmp_path)
+        assert scheduler.load() == 3
+        assert await scheduler.remove_due() == 2
+        assert sorted(p.name for p in (tmp_path / "drafts").iterdir()) == ["later"]
+        assert len(scheduler) == 1
+        assert scheduler.next_deadline() > datetime.now(timezone.utc).timestamp()
+
+    @pytest.mark.asyncio
+    async def test_wakes_for_an_earlier_deadline(self, tmp_path):
+        _draft(tmp_path, "later", 10)
+        scheduler = cleanup.ExpiryScheduler(tmp_path)
+        scheduler.load()
+        task = asyncio.create_task(scheduler.run())
+        try:
+            await asyncio.sleep(0.01)
+            soon = _draft(tmp_path, "soon", 10, expired=True)
+            scheduler.schedule("soon", datetime.now(timezone.utc) + timedelta(seconds=0.05))
+            for _ in range(100):
+                if not soon.exists():
+                    break
+                await asyncio.sleep(0.01)
+            assert not soon.exists()
+            assert (tmp_path / "drafts" / "later").exists()
+        finally:
+            task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_cancel_and_reschedule(self, tmp_path, monkeypatch):
+        _draft(tmp_path, "a", 10, expired=True)
+        _draft(tmp_path, "b", 10, expired=True)
+        scheduler = cleanup.ExpiryScheduler(tmp_path)
+        scheduler.load()
+        scheduler.cancel("a")
+        monkeypatch.setattr(cleanup, "is_finalizing", lambda draft_id: draft_id == "b")
+
+        assert await scheduler.remove_due() == 0
+        assert (tmp_path / "drafts" / "a").exists()  # Cancelled
+        assert (tmp_path / "drafts" / "b").exists()  # Finalizing: retried later
+        assert len(scheduler) == 1
@@ -0,0 +1,253 @@
+"""Tests for app.services.transcode — HLS ladder selection and ffmpeg command building."""
+
+from pathlib import Path
+
+import pytest
+
+from app.services.analyze import parse_keyframe_packets
+from app.services.transcode import (
+    build_hls_command,
+    build_hls_copy_command,
+    build_proxy_command,
+    build_storyboard_command,
+    can_stream_copy,
+    is_source_only_ladder,
+    poster_time,
+    select_ladder,
+    snap_to_keyframe,
+    storyboard_interval,
+    storyboard_tile_size,
+    storyboard_vtt,
+    video_bitrate_kbps,
+)
+
+
+class TestSelectLadder:
+
+    def test_default_ladder(self):
+        assert select_ladder(None) == [720, 480]
+
+    def test_sorted_and_deduplicated(self):
+        assert select_ladder([480, 1080, 720, 480]) == [1080, 720, 480]
+
+    def test_drops_rungs_above_source(self):
+        assert select_ladder([1080, 720, 480], source_height=720) == [720, 480]
+
+    def test_falls_back_to_source_height(self):
+        """A source smaller than every rung gets one rendition at its own height."""
+        assert select_ladder([1080, 720], source_height=361) == [360]
+
+
+class TestBuildHlsCommand:
+
+    def _cmd(self, **kwargs):
+        defaults = dict(
+            input_path=Path("/in/video.mp4"),
+            output_dir=Path("/out"),
+            qualities=[1080, 720, 480],
+        )
+        defaults.update(kwargs)
+        return build_hls_command(**defaults)
+
+    def test_single_decode_split(self):
+        cmd = self._cmd()
+        assert cmd.count("-i") == 1
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        assert graph.startswith("[0:v]split=3[s0][s1][s2]")
+        assert "[s0]scale=-2:1080[v0]" in graph
+        assert "[s2]scale=-2:480[v2]" in graph
+
+    def test_master_playlist_and_stream_map(self):
+        cmd = self._cmd()
+        assert cmd[cmd.index("-master_pl_name") + 1] == "master.m3u8"
+        assert cmd[cmd.index("-var_stream_map") + 1] == (
+            "v:0,a:0,name:1080p v:1,a:1,name:720p v:2,a:2,name:480p"
+        )
+        assert cmd[-1] == "/out/%v/playlist.m3u8"
+
+    def test_per_rendition_bitrates(self):
+        cmd = self._cmd()
+        assert cmd[cmd.index("-b:v:0") + 1] == f"{video_bitrate_kbps(1080)}k"
+        assert cmd[cmd.index("-b:v:2") + 1] == f"{video_bitrate_kbps(480)}k"
+
+    def test_without_audio(self):
+        cmd = self._cmd(qualities=[720], has_audio=False)
+        assert "0:a:0" not in cmd
+        assert "-c:a" not in cmd
+        assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,name:720p"
+
+    def test_trim_is_relative_to_seek(self):
+        cmd = self._cmd(trim_start=10.0, trim_end=25.0)
+        assert cmd.index("-ss") < cmd.index("-i")
+        assert cmd[cmd.index("-to") + 1] == "15.0"
+
+    def test_ts_layout_is_default(self):
+        cmd = self._cmd()
+        assert "-hls_segment_type" not in cmd
+        assert cmd[cmd.index("-hls_segment_filename") + 1] == "/out/%v/segment_%03d.ts"
+
+    def test_fmp4_layout(self):
+        cmd = self._cmd(layout="fmp4")
+        assert cmd[cmd.index("-hls_segment_type") + 1] == "fmp4"
+        assert cmd[cmd.index("-hls_segment_filename") + 1] == "/out/%v/segment_%03d.m4s"
+
+    def test_fmp4_single_file_layout(self):
+        cmd = self._cmd(layout="fmp4_single")
+        assert cmd[cmd.index("-hls_flags") + 1] == "single_file"
+        assert cmd[cmd.index("-hls_segment_filename") + 1] == "/out/%v/stream.mp4"
+
+    def test_unknown_layout_rejected(self):
+        with pytest.raises(ValueError):
+            self._cmd(layout="dash")
+
+
+class TestStreamCopyTrim:
+
+    def test_can_stream_copy(self):
+        assert can_stream_copy("H.264", "AAC")
+        assert can_stream_copy("H.264", None)
+        assert not can_stream_copy("H.265", "AAC")
+        assert not can_stream_copy("H.264", "OPUS")
+
+    def test_only_a_source_height_ladder_may_be_copied(self):
+        assert not is_source_only_ladder(None, 1080)  # Default ladder: 720p + 480p
+        assert not is_source_only_ladder([1080, 720], 1080)
+        assert is_source_only_ladder([1080], 1080)
+        assert is_source_only_ladder(None, 480)  # 720p dropped, 480p is the source
+        assert is_source_only_ladder([2160], 721)  # Falls back to the (even) source height
+        assert not is_source_only_ladder([720], None)
+
+    def test_snap_within_tolerance(self):
+        keyframes = [0.0, 8.333, 16.667]
+        assert snap_to_keyframe(8.0, keyframes, 1.0) == 8.333
+        assert snap_to_keyframe(12.5, keyframes, 1.0) is None
+        assert snap_to_keyframe(1.0, [], 1.0) is None
+
+    def test_parse_keyframe_packets(self):
+        csv = "0.000000,K__\n0.033333,___\nN/A,K__\n8.333333,K_\n"
+        assert parse_keyframe_packets(csv) == [0.0, 8.333333]
+
+    def test_copy_command(self):
+        cmd = build_hls_copy_command(
+            Path("/in/video.mp4"), Path("/out"), "1080p",
+            trim_start=8.333, trim_end=25.0,
+        )
+        assert cmd[cmd.index("-c") + 1] == "copy"
+        assert "-filter_complex" not in cmd
+        assert cmd[cmd.index("-to") + 1] == str(25.0 - 8.333)
+        assert cmd[cmd.index("-var_stream_map") + 1] == "v:0,a:0,name:1080p"
+
+
+class TestLocalPreview:
+
+    def test_poster_time(self):
+        assert poster_time(None) == 0.0
+        assert poster_time(20) == 2.0
+        assert poster_time(3600) == 10.0
+
+    def test_storyboard_interval_caps_tiles(self):
+        assert storyboard_interval(40) == 1.0
+        assert storyboard_interval(3600) == 36.0
+
+    def test_tile_size_keeps_aspect(self):
+        assert storyboard_tile_size(1920, 1080) == (160, 90)
+        assert storyboard_tile_size(1080, 1920) == (160, 284)
+        assert storyboard_tile_size(None, None) == (160, 90)
+
+    def test_storyboard_command_grid(self):
+        cmd = build_storyboard_command(Path("/in.mp4"), Path("/sb.jpg"), 36.0, (160, 90), 100)
+        assert cmd[cmd.index("-skip_frame") + 1] == "nokey"
+        assert cmd[cmd.index("-vf") + 1] == "fps=1/36.0,scale=160:90,tile=10x10"
+
+    def test_storyboard_vtt_regions(self):
+        vtt = storyboard_vtt("sb.jpg", 25.0, 2.0, (160, 90), 13)
+        lines = vtt.splitlines()
+        assert lines[0] == "WEBVTT"
+        assert "00:00:00.000 --> 00:00:02.000" in lines
+        # 11th tile wraps to the second row
+        assert "sb.jpg#xywh=0,90,160,90" in lines
+        # Last cue is clipped to the duration
+        assert "00:00:24.000 --> 00:00:25.000" in lines
+
+    def test_proxy_command(self):
+        cmd = build_proxy_command(Path("/in.mp4"), Path("/proxy.mp4"), 60)
+        assert cmd[cmd.index("-t") + 1] == "60"
+        assert cmd[cmd.index("-preset") + 1] == "ultrafast"
+        assert "0:a:0" in cmd
+
+        silent = build_proxy_command(Path("/in.mp4"), Path("/proxy.mp4"), None, has_audio=False)
+        assert "-t" not in silent
+        assert "-c:a" not in silent
+
+
+class TestOutputReplacement:
+    """A retry must never write through hardlinks into the transcode cache."""
+
+    @pytest.mark.asyncio
+    async def test_hls_retry_does_not_rewrite_cached_files(self, tmp_path, monkeypatch):
+        from app.services import transcode
+        from app.services.transcode_cache import TranscodeCache
+
+        source = tmp_path / "in.mp4"
+        source.write_bytes(b"video")
+        cache = TranscodeCache(tmp_path / "cache", 1024 * 1024)
+        monkeypatch.setattr(transcode, "get_transcode_cache", lambda: cache)
+        monkeypatch.setattr(transcode.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+
+        async def fake_ffmpeg(cmd):
+            # Like ffmpeg -y: open the output names for writing, in place
+            out = Path(cmd[-1]).parent.parent
+            height = cmd[cmd.index("-var_stream_map") + 1].split("name:")[1].split()[0]
+            (out / "master.m3u8").open("w").write(f"master {height}")
+            (out / height / "segment_000.ts").open("w").write(f"segment {height}")
+            return None
+
+        monkeypatch.setattr(transcode, "_run_ffmpeg", fake_ffmpeg)
+        out = tmp_path / "output" / "hls"
+
+        assert (await transcode.transcode_video_to_hls(source, out, qualities=[720])).success
+        cached = [p for p in cache.root.rglob("master.m3u8")]
+        assert len(cached) == 1 and cached[0].read_text() == "master 720p"
+
+        # Retry with a different ladder: a cache miss that re-encodes into the same dir
+        assert (await transcode.transcode_video_to_hls(source, out, qualities=[480])).success
+        assert cached[0].read_text() == "master 720p"
+        assert sorted(p.name for p in out.iterdir()) == ["480p", "master.m3u8"]
+
+
+class TestHlsCacheKey:
+
+    @pytest.mark.asyncio
+    async def test_encoder_settings_are_part_of_the_key(self, tmp_path, monkeypatch):
+        from app.services import transcode
+        from app.services.transcode_cache import TranscodeCache
+
+        source = tmp_path / "in.mp4"
+        source.write_bytes(b"video")
+        cache = TranscodeCache(tmp_path / "cache", 1024 * 1024)
+        monkeypatch.setattr(transcode, "get_transcode_cache", lambda: cache)
+        monkeypatch.setattr(transcode.shutil, "which", lambda name: "/usr/bin/ffmpeg")
+        encodes = []
+
+        async def fake_ffmpeg(cmd):
+            encodes.append(cmd)
+            out = Path(cmd[-1]).parent.parent
+            (out / "master.m3u8").write_text("master")
+            (out / "720p" / "segment_000.ts").write_text("segment")
+            return None
+
+        monkeypatch.setattr(transcode, "_run_ffmpeg", fake_ffmpeg)
+        out = tmp_path / "output" / "hls"
+
+        for _ in range(2):
+            assert (await transcode.transcode_video_to_hls(source, out, qualities=[720])).success
+        assert len(encodes) == 1  # Second run restored from the cache
+
+        faster = tuple("veryfast" if arg == "medium" else arg for arg in transcode.HLS_VIDEO_ARGS)
+        monkeypatch.setattr(transcode, "HLS_VIDEO_ARGS", faster)
+        assert (await transcode.transcode_video_to_hls(source, out, qualities=[720])).success
+        assert len(encodes) == 2 and "veryfast" in encodes[-1]
+
+        monkeypatch.setattr(transcode, "CACHE_VERSION", transcode.CACHE_VERSION + 1)
+        assert (await transcode.transcode_video_to_hls(source, out, qualities=[720])).success
+        assert len(encodes) == 3
@@ -0,0 +1,88 @@
+"""Tests for app.services.transcode_cache — keys, restore, and LRU eviction."""
+
+import os
+
+from app.services.transcode_cache import TranscodeCache
+
+
+def _cache(tmp_path, max_bytes=1024 * 1024):
+    return TranscodeCache(tmp_path / "cache", max_bytes)
+
+
+class TestKeys:
+
+    def test_key_depends_on_every_param(self):
+        base = TranscodeCache.make_key("abc", codec="libvorbis", quality=6, metadata={"TITLE": "x"})
+        assert base == TranscodeCache.make_key("abc", metadata={"TITLE": "x"}, quality=6, codec="libvorbis")
+        assert base != TranscodeCache.make_key("abc", codec="libvorbis", quality=5, metadata={"TITLE": "x"})
+        assert base != TranscodeCache.make_key("abc", codec="libvorbis", quality=6, metadata={"TITLE": "y"})
+        assert base != TranscodeCache.make_key("abd", codec="libvorbis", quality=6, metadata={"TITLE": "x"})
+
+
+class TestStoreRestore:
+
+    def test_file_roundtrip(self, tmp_path):
+        cache = _cache(tmp_path)
+        out = tmp_path / "track.ogg"
+        out.write_bytes(b"ogg data")
+        cache.store("k1", out)
+
+        dest = tmp_path / "draft" / "ogg" / "track.ogg"
+        assert cache.restore("k1", dest)
+        assert dest.read_bytes() == b"ogg data"
+
+    def test_directory_roundtrip(self, tmp_path):
+        cache = _cache(tmp_path)
+        hls = tmp_path / "hls"
+        (hls / "720p").mkdir(parents=True)
+        (hls / "master.m3u8").write_text("#EXTM3U")
+        (hls / "720p" / "segment_000.ts").write_bytes(b"ts")
+        cache.store("k2", hls)
+
+        dest = tmp_path / "out" / "hls"
+        dest.mkdir(parents=True)
+        assert cache.restore("k2", dest)
+        assert (dest / "720p" / "segment_000.ts").read_bytes() == b"ts"
+
+    def test_miss(self, tmp_path):
+        assert not _cache(tmp_path).restore("nope", tmp_path / "x")
+
+    def test_index_survives_restart(self, tmp_path):
+        out = tmp_path / "a.ogg"
+        out.write_bytes(b"12345")
+        _cache(tmp_path).store("k", out)
+
+        reopened = _cache(tmp_path)
+        assert reopened.total_bytes == 5
+        assert reopened.restore("k", tmp_path / "b.ogg")
+
+
+class TestEviction:
+
+    def test_least_recently_used_goes_first(self, tmp_path):
+        cache = _cache(tmp_path, max_bytes=250)
+        for name in ("old", "mid"):
+            f = tmp_path / f"{name}.ogg"
+            f.write_bytes(b"x" * 100)
+            cache.store(name, f)
+        # Make "old" the least recently used, then touch it via restore
+        os.utime(cache.root / "old" / "meta.json", (1, 1))
+        cache._entries["old"] = (100, 1)
+        cache._entries["mid"] = (100, 2)
+        assert cache.restore("old", tmp_path / "restored.ogg")
+
+        new = tmp_path / "new.ogg"
+        new.write_bytes(b"x" * 100)
+        cache.store("new", new)
+
+        assert not (cache.root / "mid").exists()
+        assert (cache.root / "old").exists()
+        assert (cache.root / "new").exists()
+        assert cache.total_bytes == 200
+
+    def test_oversized_output_not_cached(self, tmp_path):
+        cache = _cache(tmp_path, max_bytes=10)
+        f = tmp_path / "big.ogg"
+        f.write_bytes(b"x" * 11)
+        cache.store("big", f)
+        assert cache.total_bytes == 0
@@ -0,0 +1,86 @@
+"""Tests for app.services.workers — pools for blocking work."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import workers
+from app.services.workers import WorkerPool
+
+
+def _sleep(seconds: float) -> str:
+    time.sleep(seconds)
+    return threading.current_thread().name
+
+
+def _fail() -> None:
+    raise ValueError("disk on fire")
+
+
+class TestWorkerPool:
+
+    @pytest.mark.asyncio
+    async def test_runs_off_the_loop_and_records_wait(self):
+        pool = WorkerPool("test", max_workers=1)
+        try:
+            ticks = 0
+
+            async def heartbeat():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            beat = asyncio.create_task(heartbeat())
+            names = await asyncio.gather(pool.run(_sleep, 0.1), pool.run(_sleep, 0.1))
+            beat.cancel()
+
+            assert all(name.startswith("worker-test") for name in names)
+            assert ticks >= 5  # The loop kept running meanwhile
+            stats = pool.operations["_sleep"]
+            assert stats.calls == 2
+            # One thread: the second call queued behind the first
+            assert stats.wait_max >= 0.05
+            assert stats.run_max >= 0.1
+            assert pool.status()["queued"] == 0 and pool.status()["running"] == 0
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_and_are_counted(self):
+        pool = WorkerPool("test", max_workers=2)
+        try:
+            with pytest.raises(ValueError):
+                await pool.run(_fail)
+            assert pool.status()["operations"]["_fail"]["errors"] == 1
+        finally:
+            pool.shutdown()
+
+
+class TestGlobalPools:
+
+    @pytest.mark.asyncio
+    async def test_init_sizes_and_status(self):
+        workers.init_worker_pools(io_threads=3, cpu_threads=1, serve_threads=2)
+        try:
+            assert await workers.run_io(sum, [1, 2, 3]) == 6
+            assert await workers.run_cpu(max, 4, 9) == 9
+            assert await workers.run_serve(min, 4, 9) == 4
+            status = workers.worker_pools_status()
+            assert status["io"]["threads"] == 3
+            assert status["cpu"]["threads"] == 1
+            assert status["serve"]["threads"] == 2
+            assert status["io"]["operations"]["sum"]["calls"] == 1
+        finally:
+            workers.stop_worker_pools()
+
+    @pytest.mark.asyncio
+    async def test_pools_created_on_demand(self):
+        workers.stop_worker_pools()
+        try:
+            assert await workers.run_io(len, "abc") == 3
+            assert workers.get_worker_pool("io").max_workers == workers.DEFAULT_IO_THREADS
+        finally:
+            workers.stop_worker_pools()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Coconut Download Benchmark
+
+Serves a synthetic HLS ladder (default: 1000 segments across 3 renditions)
+from a local HTTP server with simulated per-request latency, then times
+download_hls_outputs against a one-segment-at-a-time baseline. A third
+pass re-runs the concurrent download into the same directory to measure
+resume (every segment already present).
+
+Run from the pinning-service directory so the app package is importable,
+or let the script find it next to itself.
+
+Usage:
+  ./bench-coconut-download.py                          # 1000 segments, 20ms latency
+  ./bench-coconut-download.py --latency-ms 80          # Simulate a distant CDN
+  ./bench-coconut-download.py --concurrency 4 16 32    # Compare pool sizes
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, asdict
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "pinning-service"))
+
+from app.services.coconut import download_hls_outputs  # noqa: E402
+
+RENDITIONS = [1080, 720, 480]
+
+
+@dataclass
+class RunResult:
+    name: str
+    seconds: float
+    files: int
+    mb: float
+
+
+def make_ladder(root: Path, total_segments: int, segment_kb: int) -> dict:
+    """Write a ladder to disk and return Coconut-style outputs (paths only)."""
+    per_rendition = total_segments // len(RENDITIONS)
+    payload = b"\0" * (segment_kb * 1024)
+    outputs = {"hls_master": {"url": "/master.m3u8"}}
+    master = ["#EXTM3U"]
+
+    for quality in RENDITIONS:
+        rendition_dir = root / f"{quality}p"
+        rendition_dir.mkdir(parents=True)
+        lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:6", "#EXT-X-PLAYLIST-TYPE:VOD"]
+        for i in range(per_rendition):
+            (rendition_dir / f"segment_{i:04d}.ts").write_bytes(payload)
+            lines += ["#EXTINF:6.0,", f"segment_{i:04d}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        (rendition_dir / "playlist.m3u8").write_text("\n".join(lines) + "\n")
+        outputs[f"hls_av1_{quality}p"] = {"url": f"/{quality}p/playlist.m3u8"}
+        master.append(f"{quality}p/playlist.m3u8")
+
+    (root / "master.m3u8").write_text("\n".join(master) + "\n")
+    return outputs
+
+
+class SlowHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def send_head(self):
+        time.sleep(self.latency)
+        return super().send_head()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(root: Path, latency: float) -> ThreadingHTTPServer:
+    handler = type("Handler", (SlowHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def sequential_download(outputs: dict, hls_dir: Path) -> None:
+    """Baseline: the previous implementation — one segment at a time, whole body in memory."""
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        for key, output in outputs.items():
+            url = output["url"]
+            if key == "hls_master":
+                local_path = hls_dir / "master.m3u8"
+            else:
+                local_path = hls_dir / f"{key.replace('hls_av1_', '')}" / "playlist.m3u8"
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            resp = await client.get(url)
+            local_path.write_text(resp.text)
+            if key == "hls_master":
+                continue
+            base_url = url.rsplit("/", 1)[0]
+            for line in resp.text.splitlines():
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    seg = await client.get(f"{base_url}/{line}")
+                    (local_path.parent / line).write_bytes(seg.content)
+
+
+def measure(name: str, hls_dir: Path, seconds: float) -> RunResult:
+    files = [p for p in hls_dir.rglob("*") if p.is_file()]
+    return RunResult(
+        name=name,
+        seconds=round(seconds, 2),
+        files=len(files),
+        mb=round(sum(p.stat().st_size for p in files) / 1e6, 1),
+    )
+
+
+async def main_async(args) -> list[RunResult]:
+    work_dir = Path(tempfile.mkdtemp(prefix="bench-coconut-"))
+    server = None
+    try:
+        origin = work_dir / "origin"
+        outputs = make_ladder(origin, args.segments, args.segment_kb)
+        server = start_server(origin, args.latency_ms / 1000)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        outputs = {k: {"url": base + v["url"]} for k, v in outputs.items()}
+
+        results = []
+        if not args.skip_baseline:
+            print("Running sequential baseline...", file=sys.stderr)
+            dest = work_dir / "sequential"
+            start = time.monotonic()
+            await sequential_download(outputs, dest)
+            results.append(measure("sequential", dest, time.monotonic() - start))
+
+        for concurrency in args.concurrency:
+            print(f"Running concurrent download (concurrency={concurrency})...", file=sys.stderr)
+            dest = work_dir / f"concurrent-{concurrency}"
+            start = time.monotonic()
+            stats = await download_hls_outputs(outputs, dest, concurrency=concurrency)
+            results.append(measure(f"concurrent x{concurrency}", dest, time.monotonic() - start))
+            if stats.failed:
+                print(f"  {stats.failed} segments failed", file=sys.stderr)
+
+            start = time.monotonic()
+            stats = await download_hls_outputs(outputs, dest, concurrency=concurrency)
+            results.append(measure(f"resume x{concurrency}", dest, time.monotonic() - start))
+            if stats.downloaded:
+                print(f"  resume re-downloaded {stats.downloaded} segments", file=sys.stderr)
+
+        return results
+    finally:
+        if server:
+            server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Coconut HLS output downloads")
+    parser.add_argument("--segments", type=int, default=1000, help="Total segments across the ladder")
+    parser.add_argument("--segment-kb", type=int, default=64, help="Size of each segment")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Simulated per-request latency")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8])
+    parser.add_argument("--skip-baseline", action="store_true", help="Don't run the sequential baseline")
+    parser.add_argument("--json", action="store_true", help="Output JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+        return
+
+    print(f"{'run':<16} {'seconds':>8} {'files':>6} {'MB':>7}")
+    for r in results:
+        print(f"{r.name:<16} {r.seconds:>8.2f} {r.files:>6} {r.mb:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+HLS Layout Benchmark
+
+Transcodes one source video with each local HLS layout (ts, fmp4,
+fmp4_single) and measures what each costs on the IPFS side: file count,
+time for kubo to add the directory, and the resulting DAG size/block count.
+
+Adds are done with pin=false, so nothing is kept after the next GC.
+
+Requires ffmpeg on PATH and a reachable kubo API. Run from the
+pinning-service directory so the app package is importable, or let the
+script find it next to itself.
+
+Usage:
+  ./bench-hls-layout.py                          # 2-minute synthetic source
+  ./bench-hls-layout.py --source show.mp4        # Real source
+  ./bench-hls-layout.py --duration 7200 --json   # 2-hour synthetic, JSON output
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "pinning-service"))
+
+from app.services.transcode import HLS_LAYOUTS, transcode_video_to_hls  # noqa: E402
+
+
+@dataclass
+class LayoutResult:
+    layout: str
+    files: int
+    bytes_on_disk: int
+    transcode_seconds: float
+    ipfs_add_seconds: float
+    dag_size: int
+    dag_blocks: int
+    cid: str
+
+
+def make_synthetic_source(path: Path, duration: int) -> None:
+    """Generate a 1080p test pattern with a sine tone."""
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc2=size=1920x1080:rate=30",
+            "-f", "lavfi", "-i", "sine=frequency=440",
+            "-t", str(duration),
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest",
+            str(path),
+        ],
+        check=True,
+    )
+
+
+async def ipfs_add_directory(api_url: str, directory: Path) -> tuple[str, float]:
+    """Add a directory to kubo without pinning. Returns (cid, seconds)."""
+    files = []
+    for file_path in sorted(directory.rglob("*")):
+        if file_path.is_file():
+            files.append(("file", (str(file_path.relative_to(directory)), open(file_path, "rb"))))
+    try:
+        start = time.monotonic()
+        async with httpx.AsyncClient(timeout=None) as client:
+            response = await client.post(
+                f"{api_url}/api/v0/add",
+                files=files,
+                params={"wrap-with-directory": "true", "pin": "false", "quieter": "true"},
+            )
+            response.raise_for_status()
+        elapsed = time.monotonic() - start
+        cid = json.loads(response.text.strip().split("\n")[-1])["Hash"]
+        return cid, elapsed
+    finally:
+        for _, (_, f) in files:
+            f.close()
+
+
+async def ipfs_dag_stat(api_url: str, cid: str) -> tuple[int, int]:
+    """Return (total size, block count) of a DAG."""
+    async with httpx.AsyncClient(timeout=None) as client:
+        response = await client.post(
+            f"{api_url}/api/v0/dag/stat",
+            params={"arg": cid, "progress": "false"},
+        )
+        response.raise_for_status()
+    # Newer kubo streams progress objects; the last line holds the totals
+    data = json.loads(response.text.strip().split("\n")[-1])
+    if "DagStats" in data:
+        return data["TotalSize"], data["DagStats"][0]["NumBlocks"]
+    return data["Size"], data["NumBlocks"]
+
+
+async def bench_layout(
+    source: Path, work_dir: Path, layout: str, qualities: list[int], api_url: str
+) -> LayoutResult:
+    out_dir = work_dir / layout
+    start = time.monotonic()
+    result = await transcode_video_to_hls(source, out_dir, qualities=qualities, layout=layout)
+    transcode_seconds = time.monotonic() - start
+    if not result.success:
+        raise RuntimeError(f"{layout}: transcode failed: {result.error[-500:]}")
+
+    disk_files = [p for p in out_dir.rglob("*") if p.is_file()]
+    cid, add_seconds = await ipfs_add_directory(api_url, out_dir)
+    dag_size, dag_blocks = await ipfs_dag_stat(api_url, cid)
+
+    return LayoutResult(
+        layout=layout,
+        files=len(disk_files),
+        bytes_on_disk=sum(p.stat().st_size for p in disk_files),
+        transcode_seconds=round(transcode_seconds, 2),
+        ipfs_add_seconds=round(add_seconds, 2),
+        dag_size=dag_size,
+        dag_blocks=dag_blocks,
+        cid=cid,
+    )
+
+
+async def main_async(args) -> list[LayoutResult]:
+    work_dir = Path(tempfile.mkdtemp(prefix="bench-hls-"))
+    try:
+        source = Path(args.source) if args.source else work_dir / "source.mp4"
+        if not args.source:
+            print(f"Generating {args.duration}s synthetic source...", file=sys.stderr)
+            make_synthetic_source(source, args.duration)
+
+        results = []
+        for layout in args.layouts:
+            print(f"Benchmarking {layout}...", file=sys.stderr)
+            results.append(await bench_layout(source, work_dir, layout, args.qualities, args.ipfs_api_url))
+        return results
+    finally:
+        if args.keep:
+            print(f"Output kept in {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HLS segment layouts against kubo")
+    parser.add_argument("--source", help="Source video (default: generate a synthetic one)")
+    parser.add_argument("--duration", type=int, default=120, help="Synthetic source length in seconds")
+    parser.add_argument("--qualities", type=int, nargs="+", default=[1080, 720, 480])
+    parser.add_argument("--layouts", nargs="+", default=list(HLS_LAYOUTS), choices=HLS_LAYOUTS)
+    parser.add_argument("--ipfs-api-url", default="http://localhost:5001")
+    parser.add_argument("--keep", action="store_true", help="Keep transcoded output")
+    parser.add_argument("--json", action="store_true", help="Output JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+        return
+
+    print(f"{'layout':<12} {'files':>6} {'MB':>9} {'encode s':>9} {'add s':>7} {'dag MB':>9} {'blocks':>7}")
+    for r in results:
+        print(
+            f"{r.layout:<12} {r.files:>6} {r.bytes_on_disk / 1e6:>9.1f} {r.transcode_seconds:>9.1f} "
+            f"{r.ipfs_add_seconds:>7.2f} {r.dag_size / 1e6:>9.1f} {r.dag_blocks:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Wallet Auth Benchmark
+
+Times the require_auth dependency for a request carrying X-Signature /
+X-Timestamp headers, the way the preview and polling endpoints see it:
+the same signed timestamp replayed on every request. "uncached" clears
+the recovered-signer cache before each call (a full secp256k1 public-key
+recovery every time, the old behaviour); "cached" is the steady state.
+HMAC-token auth is timed alongside for reference.
+
+Run from the pinning-service directory so the app package is importable,
+or let the script find it next to itself.
+
+Usage:
+  ./bench-wallet-auth.py                 # 2000 requests per case
+  ./bench-wallet-auth.py --requests 500
+  ./bench-wallet-auth.py --json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from starlette.requests import Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "pinning-service"))
+
+from app import auth  # noqa: E402
+from app.config import Settings  # noqa: E402
+
+
+@dataclass
+class RunResult:
+    name: str
+    requests: int
+    us_per_request: float
+    requests_per_second: int
+
+
+def make_request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+async def time_case(name: str, request: Request, settings: Settings, n: int, before_each=None) -> RunResult:
+    # Warm up (and, for the cached case, fill the cache)
+    await auth.require_auth(request, settings)
+    elapsed = 0.0
+    for _ in range(n):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        await auth.require_auth(request, settings)
+        elapsed += time.perf_counter() - start
+    return RunResult(
+        name=name,
+        requests=n,
+        us_per_request=round(elapsed / n * 1e6, 1),
+        requests_per_second=int(n / elapsed),
+    )
+
+
+async def main_async(args) -> list[RunResult]:
+    settings = Settings(api_key="bench-secret", authorized_wallets="")
+    now_ms = int(time.time() * 1000)
+
+    account = Account.create()
+    signed = account.sign_message(encode_defunct(text=auth.create_auth_message(now_ms)))
+    wallet_request = make_request({
+        "X-Signature": "0x" + signed.signature.hex().removeprefix("0x"),
+        "X-Timestamp": str(now_ms),
+    })
+    hmac_request = make_request({
+        "X-Upload-Token": auth.create_upload_token(settings.api_key, "bench", now_ms),
+        "X-Upload-User": "bench",
+        "X-Upload-Timestamp": str(now_ms),
+    })
+
+    print("Timing wallet auth without the signer cache...", file=sys.stderr)
+    results = [await time_case(
+        "wallet-uncached", wallet_request, settings, args.requests, before_each=auth._recovered.clear
+    )]
+    print("Timing wallet auth with the signer cache...", file=sys.stderr)
+    results.append(await time_case("wallet-cached", wallet_request, settings, args.requests))
+    print("Timing HMAC token auth...", file=sys.stderr)
+    results.append(await time_case("hmac-token", hmac_request, settings, args.requests))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request wallet signature auth")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests timed per case")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+        return
+
+    print(f"{'case':<16} {'requests':>8} {'us/req':>9} {'req/s':>9}")
+    for r in results:
+        print(f"{r.name:<16} {r.requests:>8} {r.us_per_request:>9.1f} {r.requests_per_second:>9}")
+
+
+if __name__ == "__main__":
+    main()